@@ -1,5 +1,6 @@
 import streamlit as st
 from PIL import Image
+import io
 import os
 from textblob import TextBlob
 import language_tool_python
@@ -81,12 +82,12 @@ except Exception as e:
 # method for extracting the text
 
 
-def image_to_text(path):
+def image_to_text(read_image):
+    # read_image: binary file-like object (an open file or an in-memory upload)
     if computervision_client is None:
         return "Sample text for testing purposes"
     
     try:
-        read_image = open(path, "rb")
         read_response = computervision_client.read_in_stream(read_image, raw=True)
         read_operation_location = read_response.headers["Operation-Location"]
         operation_id = read_operation_location.split("/")[-1]
@@ -235,9 +236,9 @@ def percentage_of_phonetic_accuraccy(extracted_text: str):
 # '''-------------------------------------------------------------------------------------------------------------------------------------------------------------------------'''
 
 
-def get_feature_array(path: str):
+def get_feature_array(read_image):
     feature_array = []
-    extracted_text = image_to_text(path)
+    extracted_text = image_to_text(read_image)
     feature_array.append(spelling_accuracy(extracted_text))
     feature_array.append(gramatical_accuracy(extracted_text))
     feature_array.append(percentage_of_corrections(extracted_text))
@@ -251,7 +252,8 @@ def generate_csv(folder: str, label: int, csv_name: str):
     arr = []
     for image in os.listdir(folder):
         path = os.path.join(folder, image)
-        feature_array = get_feature_array(path)
+        with open(path, "rb") as read_image:
+            feature_array = get_feature_array(read_image)
         feature_array.append(label)
         # print(feature_array)
         arr.append(feature_array)
@@ -351,17 +353,23 @@ with tab2:
     
     with st.container():
         st.write("---")
-        image = st.file_uploader("Upload the handwriting sample that you want to test", type=["jpg"])
+        # Azure Read takes multi-page PDF and TIFF documents as they are
+        image = st.file_uploader("Upload the handwriting sample that you want to test",
+                                 type=["jpg", "jpeg", "png", "tif", "tiff", "pdf"])
         if image is not None:
             st.write("Please review the image selected")
             st.write(image.name)
-            image_uploaded = Image.open(image)
-            image_uploaded.save("temp.jpg")
-            st.image(image_uploaded, width=224)
+            if image.type in ("image/jpeg", "image/png"):
+                image_uploaded = Image.open(image)
+                st.image(image_uploaded, width=224)
 
         if st.button("Predict", help="click after uploading the correct image"):
+            if image is None:
+                st.warning("Please upload a handwriting sample first")
+                st.stop()
             try:
-                feature_array = get_feature_array("temp.jpg")
+                # The upload stays in this session's memory; each run gets its own buffer
+                feature_array = get_feature_array(io.BytesIO(image.getvalue()))
                 result = score(feature_array)
                 probability = result[1] if result[0] == 0 else result[0]
                 
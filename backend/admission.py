@@ -0,0 +1,220 @@
+"""Admission control for the expensive analysis routes.
+
+At most ADMISSION_MAX_CONCURRENT analyses run at once per process; further
+requests wait in a bounded queue (ADMISSION_QUEUE_SIZE) for at most
+ADMISSION_MAX_WAIT seconds. Interactive requests (a single upload from the
+UI) are admitted before batch jobs, and when the queue is full an
+interactive request takes the place of the most recently queued batch job.
+Anything that cannot be queued, or waits too long, is shed with 429 and a
+Retry-After estimated from recent analysis times, instead of slowing every
+request in the process down together.
+
+Queue depth and running analyses are exported as gauges; shed requests are
+counted in dyslexicheck_admission_shed_total by priority and reason
+(queue_full, evicted, timeout).
+
+A queued request waits in a server thread, so admission only works with
+more threads than ADMISSION_MAX_CONCURRENT + ADMISSION_QUEUE_SIZE: with
+fewer, excess requests wait unseen in the server's backlog instead of being
+shed. gunicorn.conf.py sizes the gthread pool from these settings (or fits
+them into an explicit GUNICORN_THREADS).
+"""
+import asyncio
+import functools
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+
+from flask import current_app, jsonify
+
+from metrics import Counter, Histogram, register_collector
+
+ADMISSION_CONFIG = {
+    'max_concurrent': int(os.environ.get('ADMISSION_MAX_CONCURRENT', 4)),
+    'queue_size': int(os.environ.get('ADMISSION_QUEUE_SIZE', 8)),
+    'max_wait': float(os.environ.get('ADMISSION_MAX_WAIT', 10)),
+    'retry_after': float(os.environ.get('ADMISSION_RETRY_AFTER', 5))  # until analyses have been timed
+}
+
+# Lower value is admitted first
+PRIORITIES = {'interactive': 0, 'batch': 1}
+
+shed = Counter('dyslexicheck_admission_shed_total', "Analysis requests rejected by admission control",
+               labels=('priority', 'reason'))
+queue_wait = Histogram('dyslexicheck_admission_wait_seconds', "Time analysis requests waited for admission",
+                       labels=('priority',))
+
+
+class Rejected(Exception):
+    def __init__(self, reason, retry_after):
+        super().__init__(f"Server busy ({reason}), retry in {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Waiter:
+    def __init__(self, priority, sequence, wake):
+        self.priority = priority
+        self.sequence = sequence
+        self.wake = wake
+        self.state = 'waiting'  # -> admitted | evicted | timeout
+
+    def __lt__(self, other):
+        return (PRIORITIES[self.priority], self.sequence) < (PRIORITIES[other.priority], other.sequence)
+
+
+class AdmissionController:
+    def __init__(self, config=ADMISSION_CONFIG):
+        self.config = config
+        self.active = 0
+        self.waiting = []  # heap of Waiters
+        self.sequence = itertools.count()
+        self.service_seconds = None  # moving average of admitted analyses
+        self.lock = threading.Lock()
+
+    def retry_after(self):
+        """Seconds until a slot is likely to be free for a request arriving now"""
+        if self.service_seconds is None:
+            return int(self.config['retry_after'])
+        rounds = (len(self.waiting) + 1) / self.config['max_concurrent']
+        return max(1, math.ceil(self.service_seconds * rounds))
+
+    def enqueue(self, priority, wake):
+        """A Waiter that is admitted right away or queued; raises Rejected if it can be neither"""
+        with self.lock:
+            waiter = Waiter(priority, next(self.sequence), wake)
+            if self.active < self.config['max_concurrent'] and not self.waiting:
+                self.active += 1
+                waiter.state = 'admitted'
+                return waiter
+            if len(self.waiting) >= self.config['queue_size']:
+                # Make room by evicting the most recently queued request of a lower priority, if any
+                victim = max(self.waiting, default=None)
+                if victim is None or not waiter < victim:
+                    shed.inc(priority, 'queue_full')
+                    raise Rejected('queue full', self.retry_after())
+                self.waiting.remove(victim)
+                heapq.heapify(self.waiting)
+                victim.state = 'evicted'
+                victim.wake()
+            heapq.heappush(self.waiting, waiter)
+            return waiter
+
+    def abandon(self, waiter):
+        """Called when a queued waiter gave up; returns True if it was admitted in the meantime"""
+        with self.lock:
+            if waiter.state == 'admitted':
+                return True
+            if waiter.state == 'waiting':
+                self.waiting.remove(waiter)
+                heapq.heapify(self.waiting)
+                waiter.state = 'timeout'
+            return False
+
+    def release(self, seconds):
+        with self.lock:
+            self.service_seconds = seconds if self.service_seconds is None else \
+                0.8 * self.service_seconds + 0.2 * seconds
+            if self.waiting:
+                waiter = heapq.heappop(self.waiting)
+                waiter.state = 'admitted'
+                waiter.wake()
+            else:
+                self.active -= 1
+
+    def rejection(self, waiter):
+        reason = {'evicted': 'evicted', 'timeout': 'timeout'}[waiter.state]
+        shed.inc(waiter.priority, reason)
+        return Rejected('evicted by a higher priority request' if reason == 'evicted' else 'queue wait timed out',
+                        self.retry_after())
+
+    def acquire(self, priority):
+        """Block until admitted (returns the admission time) or raise Rejected"""
+        start = time.monotonic()
+        event = threading.Event()
+        waiter = self.enqueue(priority, event.set)
+        if waiter.state != 'admitted':
+            event.wait(self.config['max_wait'])
+            if not self.abandon(waiter):
+                raise self.rejection(waiter)
+        queue_wait.observe(time.monotonic() - start, priority)
+        return time.monotonic()
+
+    async def acquire_async(self, priority):
+        """acquire() for coroutines: waits on the event loop instead of blocking a thread"""
+        start = time.monotonic()
+        loop = asyncio.get_running_loop()
+        admitted = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: admitted.done() or admitted.set_result(None))
+
+        waiter = self.enqueue(priority, wake)
+        if waiter.state != 'admitted':
+            try:
+                await asyncio.wait_for(asyncio.shield(admitted), self.config['max_wait'])
+            except asyncio.TimeoutError:
+                pass
+            if not self.abandon(waiter):
+                raise self.rejection(waiter)
+        queue_wait.observe(time.monotonic() - start, priority)
+        return time.monotonic()
+
+
+controller = AdmissionController()
+
+
+def rejected_response(e):
+    response = jsonify({'error': str(e)})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
+
+def admission_controlled(priority):
+    """Flask view decorator: run the view only once admitted, else answer 429 with Retry-After
+
+    `priority` is a PRIORITIES key, or a function returning one for the
+    current request. The slot is held until a streamed response has been
+    sent completely.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                admitted_at = controller.acquire(priority() if callable(priority) else priority)
+            except Rejected as e:
+                return rejected_response(e)
+
+            def release():
+                controller.release(time.monotonic() - admitted_at)
+
+            try:
+                response = current_app.make_response(view(*args, **kwargs))
+            except BaseException:
+                release()
+                raise
+            if response.is_streamed:
+                response.call_on_close(release)
+            else:
+                release()
+            return response
+        return wrapper
+    return decorator
+
+
+@register_collector
+def collect_admission():
+    with controller.lock:
+        active = controller.active
+        depth = {priority: 0 for priority in PRIORITIES}
+        for waiter in controller.waiting:
+            depth[waiter.priority] += 1
+    return [
+        ('dyslexicheck_admission_active', 'gauge', "Analyses running", [({}, active)]),
+        ('dyslexicheck_admission_queue_depth', 'gauge', "Analysis requests waiting for admission",
+         [({'priority': priority}, count) for priority, count in depth.items()])
+    ]
@@ -1,5 +1,11 @@
-from flask import Blueprint, request, jsonify
-from database import create_user, get_user_history, get_all_results, get_user_by_name
+import csv
+import io
+import itertools
+
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from database import (create_user, create_users_bulk, get_user_history, get_all_results,
+                      get_user_by_name, get_user_cache_stats, get_replica_status, BULK_IMPORT_CONFIG)
+from serialization import json_response
 
 # Create Blueprint for user/admin routes
 api_bp = Blueprint('api', __name__, url_prefix='/api')
@@ -57,12 +63,102 @@ def create_new_user():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def read_roster():
+    """Read a roster from a JSON array, a CSV body or an uploaded CSV file"""
+    if 'file' in request.files:
+        text = request.files['file'].read().decode('utf-8-sig')
+        return list(csv.DictReader(io.StringIO(text)))
+    if request.mimetype in ('text/csv', 'application/csv'):
+        return list(csv.DictReader(io.StringIO(request.get_data(as_text=True))))
+    
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('users')
+    return data
+
+def parse_age(value):
+    """Age from a JSON or CSV roster cell: an int, None if missing, or raises ValueError
+
+    Only whole numbers count: 9.7 is not rounded or truncated, and JSON true is not 1.
+    """
+    if isinstance(value, str):
+        value = value.strip()
+        if not value:
+            return None
+        if not value.lstrip('+-').isdigit():
+            raise ValueError(value)
+        return int(value)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(value)
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError(value)
+    return int(value)
+
+def validate_roster(rows):
+    """Normalise roster rows, returning (users, errors)"""
+    users = []
+    errors = []
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors.append({'row': index, 'error': 'Row must be an object'})
+            continue
+        
+        name = str(row.get('name') or '').strip()
+        grade = row.get('grade') or None
+        try:
+            age = parse_age(row.get('age'))
+        except ValueError:
+            errors.append({'row': index, 'error': 'Age must be a whole number'})
+            continue
+        
+        if not name or age is None:
+            errors.append({'row': index, 'error': 'Name and age are required'})
+        elif len(name) > 255:
+            errors.append({'row': index, 'error': 'Name is too long'})
+        elif age <= 0:
+            errors.append({'row': index, 'error': 'Age must be a positive number'})
+        else:
+            users.append({'name': name, 'age': age, 'grade': grade})
+    return users, errors
+
+@api_bp.route('/users/bulk', methods=['POST'])
+def create_users_from_roster():
+    """Create many users at once from a classroom roster"""
+    try:
+        rows = read_roster()
+        if not isinstance(rows, list) or not rows:
+            return jsonify({'error': 'Expected a non-empty JSON array or CSV roster'}), 400
+        if len(rows) > BULK_IMPORT_CONFIG['max_rows']:
+            return jsonify({'error': f"Roster exceeds {BULK_IMPORT_CONFIG['max_rows']} rows"}), 413
+        
+        users, errors = validate_roster(rows)
+        if errors:
+            return jsonify({'error': 'Invalid roster', 'invalid_rows': errors}), 400
+        
+        user_ids = create_users_bulk(users)
+        
+        if user_ids:
+            return jsonify({
+                'success': True,
+                'created': len(user_ids),
+                'users': [{'row': i, 'name': u['name'], 'user_id': user_id}
+                          for i, (u, user_id) in enumerate(zip(users, user_ids))],
+                'message': 'Users created successfully'
+            })
+        else:
+            return jsonify({'error': 'Failed to create users'}), 500
+            
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @api_bp.route('/users/<int:user_id>/history', methods=['GET'])
 def get_history(user_id):
     """Get test history for a user"""
     try:
-        history = get_user_history(user_id)
-        return jsonify({
+        history = get_user_history(user_id, raw_details=True)
+        return json_response({
             'user_id': user_id,
             'test_count': len(history),
             'history': history
@@ -74,19 +170,49 @@ def get_history(user_id):
 def get_results():
     """Get all test results (admin endpoint)"""
     try:
-        results = get_all_results()
-        return jsonify({
+        results = get_all_results(raw_details=True)
+        return json_response({
             'total_results': len(results),
             'results': results
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@api_bp.route('/results/export', methods=['GET'])
+def export_all_results():
+    """Stream all test results as a Parquet or Arrow IPC file (admin/analytics endpoint)"""
+    # pyarrow takes a while to import, only load it for exports
+    from export_results import EXPORT_FORMATS, check_export_format, stream_results
+
+    fmt = request.args.get('format', default='parquet')
+    try:
+        check_export_format(fmt)
+    except ValueError as e:
+        return jsonify({'error': str(e), 'formats': list(EXPORT_FORMATS)}), 400
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 501
+    
+    # Run up to the first chunk here, so an unreachable database is a 500 rather than a
+    # 200 with an empty file; later failures cut the response off (see stream_results)
+    chunks = stream_results(fmt)
+    try:
+        first = next(chunks)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    mimetype = 'application/vnd.apache.parquet' if fmt == 'parquet' else 'application/vnd.apache.arrow.stream'
+    extension = 'parquet' if fmt == 'parquet' else 'arrows'
+    return Response(
+        stream_with_context(itertools.chain([first], chunks)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=test_results.{extension}'}
+    )
+
 @api_bp.route('/stats', methods=['GET'])
 def get_stats():
     """Get overall statistics"""
     try:
-        results = get_all_results()
+        results = get_all_results(raw_details=True)
         
         if not results:
             return jsonify({
@@ -114,3 +240,13 @@ def get_stats():
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Get hit-rate metrics for the login lookup cache"""
+    return jsonify({'user_cache': get_user_cache_stats()})
+
+@api_bp.route('/db/status', methods=['GET'])
+def get_db_status():
+    """Get read routing state for the primary / read replica setup"""
+    return jsonify(get_replica_status())
@@ -1,236 +1,210 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Request, Response, abort, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
+import csv
+import hashlib
 import os
-from PIL import Image
-from textblob import TextBlob
-import language_tool_python
-import requests
-import pandas as pd
 import random
-import speech_recognition as sr
-import pyttsx3
 import time
-import eng_to_ipa as ipa
 import tempfile
-
-from azure.cognitiveservices.vision.computervision import ComputerVisionClient
-from azure.cognitiveservices.vision.computervision.models import OperationStatusCodes
-from msrest.authentication import CognitiveServicesCredentials
-
-from abydos.phonetic import Soundex, Metaphone, Caverphone, NYSIIS
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import budget
+import engines
+import metrics
+import recorder
+from admission import admission_controlled
+from api_routes import api_bp
+from job_routes import jobs_bp
+from budget import BudgetExceeded
+from documents import DocumentError, iter_pages, map_pages
+from engines import engine
+from profiler import PROFILER_CONFIG, profiled
+from ocr_client import read_text
+from pipeline import run_stages
+from tiling import read_texts
+from preprocess import preprocess_image
+from serialization import dumps
+from singleflight import SingleFlight
+from features import (DEGRADED_FEATURES, load_ipa, check_pronounciation, dictation_accuracy, spelling_accuracy,
+                      gramatical_accuracy, percentage_of_corrections, percentage_of_phonetic_accuraccy, score,
+                      score_batch)
+
+UPLOAD_CONFIG = {
+    'max_bytes': int(os.environ.get('UPLOAD_MAX_BYTES', 10 * 1024 * 1024)),
+    'batch_max_files': int(os.environ.get('BATCH_MAX_FILES', 50)),
+    'batch_max_texts': int(os.environ.get('BATCH_MAX_TEXTS', 200))
+}
+
+class UploadRequest(Request):
+    """Keeps uploaded files in memory (spooled up to the upload cap) instead of temporary files on disk"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=UPLOAD_CONFIG['max_bytes'], mode='rb+')
 
 app = Flask(__name__, static_folder='../frontend/build')
+app.request_class = UploadRequest
+# Larger bodies are rejected with 413 from the Content-Length header, before the form is parsed
+app.config['MAX_CONTENT_LENGTH'] = UPLOAD_CONFIG['max_bytes']
 CORS(app, resources={r"/*": {"origins": "*"}})  # Enable CORS for all routes with explicit configuration
-
-# image to text API authentication (read from env for safety)
-subscription_key_imagetotext = os.environ.get('AZURE_COMPUTERVISION_KEY', '1780f5636509411da43040b70b5d2e22')
-endpoint_imagetotext = os.environ.get('AZURE_COMPUTERVISION_ENDPOINT', 'https://prana-------------v.cognitiveservices.azure.com/')
-try:
-    computervision_client = ComputerVisionClient(
-        endpoint_imagetotext, CognitiveServicesCredentials(subscription_key_imagetotext))
-except Exception as e:
-    print(f"Warning: Could not initialize Computer Vision client: {e}")
-    computervision_client = None
-
-# text correction API authentication (read from env for safety)
-api_key_textcorrection = os.environ.get('BING_SPELLCHECK_KEY', '7aba4995897b4dcaa86c34ddb82a1ecf')
-endpoint_textcorrection = os.environ.get('BING_SPELLCHECK_ENDPOINT', 'https://api.bing.microsoft.com/v7.0/SpellCheck')
-
-# Initialize language tool with error handling
-try:
-    my_tool = language_tool_python.LanguageTool('en-US')
-except Exception as e:
-    print(f"Warning: Could not initialize LanguageTool: {e}")
-    my_tool = None
-
-def levenshtein(s1, s2):
-    if len(s1) < len(s2):
-        return levenshtein(s2, s1)
-
-    # len(s1) >= len(s2)
-    if len(s2) == 0:
-        return len(s1)
-
-    previous_row = range(len(s2) + 1)
-    for i, c1 in enumerate(s1):
-        current_row = [i + 1]
-        for j, c2 in enumerate(s2):
-            # j+1 instead of j since previous_row and current_row are one character longer
-            insertions = previous_row[j + 1] + 1
-            deletions = current_row[j] + 1       # than s2
-            substitutions = previous_row[j] + (c1 != c2)
-            current_row.append(min(insertions, deletions, substitutions))
-        previous_row = current_row
-
-    return previous_row[-1]
-
-# method for extracting the text
-def image_to_text(path):
-    read_image = open(path, "rb")
-    read_response = computervision_client.read_in_stream(read_image, raw=True)
-    read_operation_location = read_response.headers["Operation-Location"]
-    operation_id = read_operation_location.split("/")[-1]
-
-    while True:
-        read_result = computervision_client.get_read_result(operation_id)
-        if read_result.status.lower() not in ['notstarted', 'running']:
-            break
-        time.sleep(5)
-
-    text = []
-    if read_result.status == OperationStatusCodes.succeeded:
-        for text_result in read_result.analyze_result.read_results:
-            for line in text_result.lines:
-                text.append(line.text)
-
-    return " ".join(text)
-
-# method for finding the spelling accuracy
-def spelling_accuracy(extracted_text):
-    spell_corrected = TextBlob(extracted_text).correct()
-    return ((len(extracted_text) - (levenshtein(extracted_text, str(spell_corrected))))/(len(extracted_text)+1))*100
-
-# method for gramatical accuracy
-def gramatical_accuracy(extracted_text):
-    spell_corrected = TextBlob(extracted_text).correct()
-    if my_tool is not None:
-        correct_text = my_tool.correct(str(spell_corrected))
-    else:
-        # Fallback: use TextBlob for basic grammar correction
-        correct_text = str(spell_corrected)
-    extracted_text_set = set(str(spell_corrected).split(" "))
-    correct_text_set = set(correct_text.split(" "))
-    n = max(len(extracted_text_set - correct_text_set),
-            len(correct_text_set - extracted_text_set))
-    return ((len(str(spell_corrected)) - n)/(len(str(spell_corrected))+1))*100
-
-# percentage of corrections
-def percentage_of_corrections(extracted_text):
-    data = {'text': extracted_text}
-    params = {
-        'mkt': 'en-us',
-        'mode': 'proof'
-    }
-    headers = {
-        'Content-Type': 'application/x-www-form-urlencoded',
-        'Ocp-Apim-Subscription-Key': api_key_textcorrection,
-    }
-    response = requests.post(endpoint_textcorrection,
-                             headers=headers, params=params, data=data)
-    json_response = response.json()
-    return len(json_response['flaggedTokens'])/len(extracted_text.split(" "))*100
-
-# percentage of phonetic accuracy
-def percentage_of_phonetic_accuraccy(extracted_text):
-    soundex = Soundex()
-    metaphone = Metaphone()
-    caverphone = Caverphone()
-    nysiis = NYSIIS()
-    spell_corrected = TextBlob(extracted_text).correct()
-
-    extracted_text_list = extracted_text.split(" ")
-    extracted_phonetics_soundex = [soundex.encode(
-        string) for string in extracted_text_list]
-    extracted_phonetics_metaphone = [metaphone.encode(
-        string) for string in extracted_text_list]
-    extracted_phonetics_caverphone = [caverphone.encode(
-        string) for string in extracted_text_list]
-    extracted_phonetics_nysiis = [nysiis.encode(
-        string) for string in extracted_text_list]
-
-    extracted_soundex_string = " ".join(extracted_phonetics_soundex)
-    extracted_metaphone_string = " ".join(extracted_phonetics_metaphone)
-    extracted_caverphone_string = " ".join(extracted_phonetics_caverphone)
-    extracted_nysiis_string = " ".join(extracted_phonetics_nysiis)
-
-    spell_corrected_list = str(spell_corrected).split(" ")
-    spell_corrected_phonetics_soundex = [
-        soundex.encode(string) for string in spell_corrected_list]
-    spell_corrected_phonetics_metaphone = [
-        metaphone.encode(string) for string in spell_corrected_list]
-    spell_corrected_phonetics_caverphone = [
-        caverphone.encode(string) for string in spell_corrected_list]
-    spell_corrected_phonetics_nysiis = [nysiis.encode(
-        string) for string in spell_corrected_list]
-
-    spell_corrected_soundex_string = " ".join(
-        spell_corrected_phonetics_soundex)
-    spell_corrected_metaphone_string = " ".join(
-        spell_corrected_phonetics_metaphone)
-    spell_corrected_caverphone_string = " ".join(
-        spell_corrected_phonetics_caverphone)
-    spell_corrected_nysiis_string = " ".join(spell_corrected_phonetics_nysiis)
-
-    soundex_score = (len(extracted_soundex_string)-(levenshtein(extracted_soundex_string,
-                     spell_corrected_soundex_string)))/(len(extracted_soundex_string)+1)
-    metaphone_score = (len(extracted_metaphone_string)-(levenshtein(extracted_metaphone_string,
-                       spell_corrected_metaphone_string)))/(len(extracted_metaphone_string)+1)
-    caverphone_score = (len(extracted_caverphone_string)-(levenshtein(extracted_caverphone_string,
-                        spell_corrected_caverphone_string)))/(len(extracted_caverphone_string)+1)
-    nysiis_score = (len(extracted_nysiis_string)-(levenshtein(extracted_nysiis_string,
-                    spell_corrected_nysiis_string)))/(len(extracted_nysiis_string)+1)
-    
-    return ((0.5*caverphone_score + 0.2*soundex_score + 0.2*metaphone_score + 0.1 * nysiis_score))*100
-
-def get_feature_array(path):
-    feature_array = []
-    extracted_text = image_to_text(path)
-    feature_array.append(spelling_accuracy(extracted_text))
-    feature_array.append(gramatical_accuracy(extracted_text))
-    feature_array.append(percentage_of_corrections(extracted_text))
-    feature_array.append(percentage_of_phonetic_accuraccy(extracted_text))
-    return feature_array, extracted_text
-
-def score(input):
-    if input[0] <= 96.40350723266602:
-        var0 = [0.0, 1.0]
-    else:
-        if input[1] <= 99.1046028137207:
-            var0 = [0.0, 1.0]
-        else:
-            if input[2] <= 2.408450722694397:
-                if input[2] <= 1.7936508059501648:
-                    var0 = [1.0, 0.0]
-                else:
-                    var0 = [0.0, 1.0]
-            else:
-                var0 = [1.0, 0.0]
-    return var0
-
-def get_10_word_array(level):
+app.register_blueprint(api_bp)  # user/admin routes (/api/login, /api/users, ...)
+app.register_blueprint(jobs_bp)  # queued analyses (/api/jobs, see jobs.py and worker.py)
+
+@app.before_request
+def start_request_timer():
+    request.environ['dyslexicheck.start'] = time.perf_counter()
+    recorder.start()
+
+@app.after_request
+def record_request_latency(response):
+    start = request.environ.get('dyslexicheck.start')
+    if start is not None:
+        # Label by URL rule, not path, to keep the number of series bounded
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        elapsed = time.perf_counter() - start
+        metrics.request_seconds.observe(elapsed, request.method, route, str(response.status_code))
+        recorder.finish(response.status_code, elapsed)
+    return response
+
+@engine('vocabulary')
+def load_vocabulary():
     # Use absolute paths to data files
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     data_dir = os.path.join(base_dir, "data")
-    
+    vocabulary = {}
+    for level, name in ((1, "intermediate_voc.csv"), (2, "elementary_voc.csv")):
+        file_path = os.path.join(data_dir, name)
+        print(f"Loading file: {file_path}")
+        # First row is a header; the words are in one column or one row depending on the file
+        with open(file_path, newline='', encoding='utf-8-sig') as f:
+            rows = list(csv.reader(f))[1:]
+        vocabulary[level] = [word for row in rows for word in row if word]
+    return vocabulary
+
+# Load WARMUP_ENGINES in the background; everything else loads on first use
+engines.start_warm_up()
+
+# method for extracting the text (from the image bytes)
+def image_to_text(data):
+    return read_text(data)
+
+def text_features(extracted_text):
+    """(feature_array, degraded stages) for the text
+
+    The four features only need the text: they run concurrently (Bing and
+    LanguageTool calls overlap); a feature that fails or runs out of the
+    request's latency budget gets its DEGRADED_FEATURES value.
+    """
+    results, degraded = run_stages({
+        'spelling_accuracy': (spelling_accuracy, (extracted_text,)),
+        'grammatical_accuracy': (gramatical_accuracy, (extracted_text,)),
+        'percentage_of_corrections': (percentage_of_corrections, (extracted_text,)),
+        'phonetic_accuracy': (percentage_of_phonetic_accuraccy, (extracted_text,))
+    }, degraded_values=DEGRADED_FEATURES)
+    return [results['spelling_accuracy'], results['grammatical_accuracy'],
+            results['percentage_of_corrections'], results['phonetic_accuracy']], degraded
+
+# Concurrent analyses of the same image bytes share one computation
+analyses = SingleFlight('analysis')
+
+def shareable_analysis(future):
+    """Whether a finished analysis may be handed to the requests that waited for it
+
+    Not when it ran out of the first request's latency budget or came back
+    with degraded features: a waiting request may have more time left, so it
+    runs its own analysis instead.
+    """
+    if future.cancelled():
+        return False
+    if future.exception() is not None:
+        return not isinstance(future.exception(), BudgetExceeded)
+    return not future.result()[2]
+
+def get_feature_array(data):
+    """Shared by concurrent requests for the same image bytes, each waiting at most its own budget"""
     try:
-        if (level == 1):
-            file_path = os.path.join(data_dir, "intermediate_voc.csv")
-            print(f"Loading file: {file_path}")
-            voc = pd.read_csv(file_path)
-            arr = voc.squeeze().to_numpy()
-            selected_list = random.sample(list(arr), 10)
-            return selected_list
-        elif(level == 2):
-            file_path = os.path.join(data_dir, "elementary_voc.csv")
-            print(f"Loading file: {file_path}")
-            voc = pd.read_csv(file_path)
-            arr = voc.squeeze().to_numpy()
-            selected_list = random.sample(list(arr), 10) 
-            return selected_list
+        return analyses.do(hashlib.sha256(data).hexdigest(), compute_feature_array, data,
+                           timeout=budget.remaining(), shareable=shareable_analysis)
+    except FutureTimeoutError:
+        raise BudgetExceeded('analysis')
+
+def compute_feature_array(data):
+    with metrics.stage_timer('preprocess'):
+        data = preprocess_image(data)
+    with metrics.stage_timer('ocr'):
+        extracted_text = image_to_text(data)
+    feature_array, degraded = text_features(extracted_text)
+    return feature_array, extracted_text, degraded
+
+def feature_result(feature_array, extracted_text, degraded=(), result=None):
+    return {
+        'extracted_text': extracted_text,
+        'spelling_accuracy': feature_array[0],
+        'grammatical_accuracy': feature_array[1],
+        'percentage_of_corrections': feature_array[2],
+        'phonetic_accuracy': feature_array[3],
+        'result': score(feature_array)[0] == 1 if result is None else result,
+        'degraded': sorted(degraded)
+    }
+
+def analyze_texts(texts):
+    """feature_result for each text, in order
+
+    Distinct texts are analysed once each, concurrently (see
+    documents.map_pages), and scored together with score_batch.
+    """
+    unique = list(dict.fromkeys(texts))
+    features = [None] * len(unique)
+    for index, result in map_pages(text_features, unique):
+        features[index] = result
+    predictions = score_batch([feature_array for feature_array, _ in features])[:, 0] == 1
+    results = {text: feature_result(feature_array, text, degraded, bool(prediction))
+               for text, (feature_array, degraded), prediction in zip(unique, features, predictions)}
+    return [dict(results[text]) for text in texts]
+
+def analyze_document(page_count, pages):
+    """Yield a 'page' event per page (in the order they finish), then the 'document' result
+
+    Pages are OCRed and scored concurrently (see documents.map_pages); the
+    document result scores the text of all pages together.
+    """
+    results = [None] * page_count
+    for index, (feature_array, extracted_text, degraded) in map_pages(get_feature_array, pages):
+        results[index] = feature_result(feature_array, extracted_text, degraded)
+        yield dict(results[index], event='page', page=index + 1, pages=page_count)
+    if page_count == 1:
+        document = results[0]
+    else:
+        extracted_text = " ".join(result['extracted_text'] for result in results if result['extracted_text'])
+        feature_array, degraded = text_features(extracted_text)
+        document = feature_result(feature_array, extracted_text, degraded)
+    yield dict(document, event='document', pages=page_count)
+
+def document_result(page_count, pages):
+    """The analyze-image response for a document: its result, plus the page results if it has several"""
+    page_results = []
+    for event in analyze_document(page_count, pages):
+        if event.pop('event') == 'page':
+            page_results.append(event)
         else:
-            return []
-    except Exception as e:
-        print(f"Error loading vocabulary file: {e}")
+            document = event
+    document.pop('pages')
+    if page_count > 1:
+        document['pages'] = sorted(page_results, key=lambda page: page['page'])
+    return document
+
+def get_10_word_array(level):
+    if level not in (1, 2):
+        return []
+    vocabulary = load_vocabulary.get()
+    if vocabulary is None:
         # Return some default words if files can't be loaded
         return ["apple", "banana", "cat", "dog", "elephant", "fish", "giraffe", "house", "ice", "jacket"]
-
-def check_pronounciation(str1, str2):
-    s1 = ipa.convert(str1)
-    s2 = ipa.convert(str2)
-    return levenshtein(s1, s2)
+    return random.sample(vocabulary[level], 10)
 
 # API Routes
 @app.route('/api/analyze-image', methods=['POST'])
+@admission_controlled('interactive')
+@profiled
 def analyze_image():
     if 'file' not in request.files:
         return jsonify({'error': 'No file part'}), 400
@@ -239,31 +213,122 @@ def analyze_image():
     if file.filename == '':
         return jsonify({'error': 'No selected file'}), 400
     
-    # Save the uploaded file temporarily
-    temp_file = tempfile.NamedTemporaryFile(delete=False)
-    file.save(temp_file.name)
-    temp_file.close()
-    
     try:
-        # Extract text from image and analyze
-        feature_array, extracted_text = get_feature_array(temp_file.name)
-        result = score(feature_array)
-        
+        page_count, pages = iter_pages(file.read())
+    except DocumentError as e:
+        return jsonify({'error': str(e)}), 400
+    finally:
+        file.close()
+
+    try:
+        # Extract text from each page and analyze (the upload is already in memory)
+        with budget.deadline(budget.request_budget(request.headers.get('X-Latency-Budget'))):
+            document = document_result(page_count, pages)
+        recorder.capture('analyze-image', {'text': document['extracted_text']})
+
         # Return results
-        return jsonify({
-            'extracted_text': extracted_text,
-            'spelling_accuracy': feature_array[0],
-            'grammatical_accuracy': feature_array[1],
-            'percentage_of_corrections': feature_array[2],
-            'phonetic_accuracy': feature_array[3],
-            'result': result[0] == 1
-        })
+        return jsonify(document)
+    except BudgetExceeded as e:
+        return jsonify({'error': str(e)}), 504
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+@app.route('/api/analyze-document', methods=['POST'])
+@admission_controlled('interactive')
+def analyze_document_stream():
+    """Like analyze-image, but streams one JSON line per page as it is done (application/x-ndjson)"""
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file part'}), 400
+
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': 'No selected file'}), 400
+
+    try:
+        page_count, pages = iter_pages(file.read())
+    except DocumentError as e:
+        return jsonify({'error': str(e)}), 400
     finally:
-        # Clean up the temporary file
-        if os.path.exists(temp_file.name):
-            os.unlink(temp_file.name)
+        file.close()
+
+    seconds = budget.request_budget(request.headers.get('X-Latency-Budget'))
+
+    def generate():
+        yield dumps({'event': 'started', 'pages': page_count}) + b'\n'
+        try:
+            with budget.deadline(seconds):
+                for event in analyze_document(page_count, pages):
+                    yield dumps(event) + b'\n'
+        except Exception as e:
+            yield dumps({'event': 'error', 'error': str(e)}) + b'\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/api/analyze-images', methods=['POST'])
+@admission_controlled('batch')
+@profiled
+def analyze_images():
+    """Batch version of analyze-image for several single-page samples (form field 'files')
+
+    With OCR_TILING=1 small samples are OCRed together, see tiling.py.
+    """
+    files = [file for file in request.files.getlist('files') if file.filename]
+    if not files:
+        return jsonify({'error': 'No files'}), 400
+    if len(files) > UPLOAD_CONFIG['batch_max_files']:
+        return jsonify({'error': f"At most {UPLOAD_CONFIG['batch_max_files']} files per batch"}), 400
+
+    names = [file.filename for file in files]
+    images = []
+    for file in files:
+        images.append(file.read())
+        file.close()
+
+    try:
+        with metrics.stage_timer('ocr'):
+            texts = read_texts(images)
+        results = analyze_texts(texts)
+        for result, name in zip(results, names):
+            result['filename'] = name
+        return jsonify({'results': results})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def text_priority():
+    data = request.get_json(silent=True)
+    return 'batch' if isinstance(data, dict) and 'texts' in data else 'interactive'
+
+@app.route('/api/analyze-text', methods=['POST'])
+@admission_controlled(text_priority)
+@profiled
+def analyze_text():
+    """Features and result for text that has already been OCRed, without the image
+
+    {"text": "..."} returns one result like analyze-image (within the
+    request's latency budget); {"texts": [...]} returns {"results": [...]}
+    in the same order, like analyze-images.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or ('text' in data) == ('texts' in data):
+        return jsonify({'error': "Expected a JSON object with 'text' or 'texts'"}), 400
+    texts = data['texts'] if 'texts' in data else [data['text']]
+    if not isinstance(texts, list) or not texts or not all(isinstance(text, str) for text in texts):
+        return jsonify({'error': 'Texts must be a non-empty list of strings'}), 400
+    if len(texts) > UPLOAD_CONFIG['batch_max_texts']:
+        return jsonify({'error': f"At most {UPLOAD_CONFIG['batch_max_texts']} texts per batch"}), 400
+
+    try:
+        if 'texts' in data:
+            return jsonify({'results': analyze_texts(texts)})
+        with budget.deadline(budget.request_budget(request.headers.get('X-Latency-Budget'))):
+            result = analyze_texts(texts)[0]
+        # Replayable like an analyze-image recording, whose payload is the OCR text too
+        recorder.capture('analyze-image', {'text': result['extracted_text']})
+        return jsonify(result)
+    except BudgetExceeded as e:
+        return jsonify({'error': str(e)}), 504
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 @app.route('/api/get-words', methods=['GET'])
 def get_words():
@@ -272,6 +337,7 @@ def get_words():
     return jsonify({'words': words})
 
 @app.route('/api/check-pronunciation', methods=['POST'])
+@profiled
 def check_pronunciation_api():
     data = request.json
     if not data or 'original' not in data or 'pronounced' not in data:
@@ -279,9 +345,11 @@ def check_pronunciation_api():
     
     original = data['original']
     pronounced = data['pronounced']
+    recorder.capture('check-pronunciation', {'original': original, 'pronounced': pronounced})
     
     inaccuracy = check_pronounciation(original, pronounced) / len(original)
     
+    ipa = load_ipa.get()
     return jsonify({
         'inaccuracy': inaccuracy,
         'original_ipa': ipa.convert(original),
@@ -289,6 +357,7 @@ def check_pronunciation_api():
     })
 
 @app.route('/api/check-dictation', methods=['POST'])
+@profiled
 def check_dictation():
     data = request.json
     if not data or 'words' not in data or 'user_input' not in data:
@@ -297,22 +366,35 @@ def check_dictation():
     words = data['words']
     user_input = data['user_input']
     
-    # Calculate accuracy
-    accuracy = []
-    for i in range(min(len(words), len(user_input))):
-        if i < len(user_input):
-            word_accuracy = 1 - (levenshtein(words[i], user_input[i]) / max(len(words[i]), 1))
-            accuracy.append(word_accuracy)
-    
-    # Fill remaining with zeros if user provided fewer words
-    while len(accuracy) < len(words):
-        accuracy.append(0)
+    recorder.capture('check-dictation', {'words': words, 'user_input': user_input})
+    accuracy = dictation_accuracy(words, user_input)
     
     return jsonify({
         'accuracy': accuracy,
         'overall_accuracy': sum(accuracy) / len(accuracy) if accuracy else 0
     })
 
+@app.errorhandler(413)
+def upload_too_large(e):
+    return jsonify({'error': f"Upload larger than {UPLOAD_CONFIG['max_bytes']} bytes"}), 413
+
+@app.route('/api/ready', methods=['GET'])
+def readiness():
+    ready, statuses = engines.readiness()
+    return jsonify({'ready': ready, 'engines': statuses}), 200 if ready else 503
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/debug/profiles/<name>', methods=['GET'])
+def get_profile(name):
+    if not PROFILER_CONFIG['enabled']:
+        abort(404)
+    if PROFILER_CONFIG['token'] and request.headers.get('X-Profile-Token') != PROFILER_CONFIG['token']:
+        abort(403)
+    return send_from_directory(PROFILER_CONFIG['output_dir'], name, as_attachment=True)
+
 # Serve React App
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
@@ -323,4 +405,5 @@ def serve(path):
         return send_from_directory(app.static_folder, 'index.html')
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    # Development server; production runs gunicorn with gunicorn.conf.py (see wsgi.py)
+    app.run(debug=True, port=int(os.environ.get('PORT', 5000)))
\ No newline at end of file
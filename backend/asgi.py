@@ -0,0 +1,425 @@
+"""ASGI variant of the analysis API for I/O-bound concurrency.
+
+    cd backend && uvicorn asgi:app --port 5000
+
+The analysis routes of app.py are reimplemented as async Starlette
+endpoints with the same request and response shapes. Azure Read (submit +
+polling) and Bing Spell Check go through http_client.request_async(), one
+shared async HTTP client with the same circuit breakers, retries, hedging
+and fallbacks (Tesseract, the local word list) as the Flask app, so a
+request waiting on them costs a coroutine instead of a worker thread.
+The CPU-bound feature functions (TextBlob, LanguageTool, abydos, IPA) run
+on a thread pool of ASGI_EXECUTOR_WORKERS threads. Everything else
+(user/admin routes, /metrics, the React app) is passed on to the Flask app.
+
+The profiler and request recorder hooks are Flask-only and do not apply
+to the async routes. Admission control (admission.py) is shared: both
+apps take slots from the same per-process controller.
+"""
+import asyncio
+import contextvars
+import functools
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.wsgi import WSGIMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+import budget
+import engines
+import http_client
+import metrics
+import preprocess
+from app import app as flask_app
+from admission import Rejected, controller
+from app import UPLOAD_CONFIG, feature_result, get_10_word_array, shareable_analysis
+from budget import BudgetExceeded
+from documents import DOCUMENT_CONFIG, DocumentError, iter_pages
+from features import (DEGRADED_FEATURES, load_ipa, check_pronounciation, dictation_accuracy, spelling_accuracy,
+                      gramatical_accuracy, percentage_of_corrections_async, percentage_of_phonetic_accuraccy)
+from ocr_client import read_text_async
+from pipeline import PIPELINE_CONFIG
+from serialization import dumps
+from singleflight import AsyncSingleFlight
+
+ASGI_CONFIG = {
+    'executor_workers': int(os.environ.get('ASGI_EXECUTOR_WORKERS', 4)),
+    'max_connections': int(os.environ.get('ASGI_MAX_CONNECTIONS', 200))
+}
+
+executor = ThreadPoolExecutor(max_workers=ASGI_CONFIG['executor_workers'], thread_name_prefix='features')
+
+
+async def run_cpu(func, *args):
+    """Run func on the feature executor, keeping the request's stage trace (contextvars)"""
+    context = contextvars.copy_context()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(context.run, func, *args))
+
+
+async def timed_cpu(stage, func, *args):
+    with metrics.stage_timer(stage):
+        return await run_cpu(func, *args)
+
+
+async def image_to_text(data):
+    return await read_text_async(data)
+
+
+async def percentage_of_corrections(extracted_text):
+    return await percentage_of_corrections_async(extracted_text)
+
+
+async def timed_corrections(extracted_text):
+    with metrics.stage_timer('percentage_of_corrections'):
+        return await percentage_of_corrections(extracted_text)
+
+
+async def degradable(stage, coroutine, timeout):
+    """(value, degraded): the stage's result, or its DEGRADED_FEATURES value if it fails or overruns"""
+    try:
+        return await asyncio.wait_for(coroutine, timeout), False
+    except asyncio.TimeoutError:
+        metrics.stage_timeouts.inc(stage)
+        metrics.stage_degraded.inc(stage, 'timeout')
+    except Exception as e:
+        print(f"Error in {stage}, using its degraded value: {e}")
+        metrics.stage_degraded.inc(stage, 'error')
+    return DEGRADED_FEATURES[stage], True
+
+
+async def text_features(extracted_text):
+    """(feature_array, degraded stages), like app.text_features"""
+    # The Bing call is in flight while the CPU-bound features run on the executor
+    stages = {
+        'spelling_accuracy': timed_cpu('spelling_accuracy', spelling_accuracy, extracted_text),
+        'grammatical_accuracy': timed_cpu('grammatical_accuracy', gramatical_accuracy, extracted_text),
+        'percentage_of_corrections': timed_corrections(extracted_text),
+        'phonetic_accuracy': timed_cpu('phonetic_accuracy', percentage_of_phonetic_accuraccy, extracted_text)
+    }
+    left = budget.remaining()
+    timeout = PIPELINE_CONFIG['stage_timeout'] if left is None else min(PIPELINE_CONFIG['stage_timeout'], left)
+    outcomes = await asyncio.gather(*(degradable(stage, coroutine, timeout) for stage, coroutine in stages.items()))
+    return [value for value, _ in outcomes], [stage for stage, (_, degraded) in zip(stages, outcomes) if degraded]
+
+
+analyses = AsyncSingleFlight('analysis')
+
+
+async def get_feature_array(data):
+    """Shared by concurrent requests for the same image bytes, each waiting at most its own budget"""
+    try:
+        return await analyses.do(hashlib.sha256(data).hexdigest(), compute_feature_array, data,
+                                 timeout=budget.remaining(), shareable=shareable_analysis)
+    except asyncio.TimeoutError:
+        raise BudgetExceeded('analysis')
+
+
+async def compute_feature_array(data):
+    with metrics.stage_timer('preprocess'):
+        data = await run_cpu(preprocess.preprocess_image, data)
+    with metrics.stage_timer('ocr'):
+        extracted_text = await image_to_text(data)
+    feature_array, degraded = await text_features(extracted_text)
+    return feature_array, extracted_text, degraded
+
+
+async def analyze_document(page_count, pages):
+    """Async version of app.analyze_document: 'page' events as pages finish, then the 'document' result
+
+    Pages are split off lazily on the executor and analysed as concurrent
+    tasks, at most DOCUMENT_PAGE_CONCURRENCY at a time.
+    """
+    slots = asyncio.Semaphore(DOCUMENT_CONFIG['page_concurrency'])
+    finished = asyncio.Queue()
+    tasks = []
+
+    async def analyze_page(index, page):
+        try:
+            feature_array, extracted_text, degraded = await get_feature_array(page)
+            await finished.put((index, feature_result(feature_array, extracted_text, degraded), None))
+        except Exception as e:
+            await finished.put((index, None, e))
+        finally:
+            slots.release()
+
+    async def split_pages():
+        try:
+            for index in range(page_count):
+                await slots.acquire()
+                page = await run_cpu(next, pages)
+                tasks.append(asyncio.ensure_future(analyze_page(index, page)))
+        except Exception as e:
+            await finished.put((None, None, e))
+
+    results = [None] * page_count
+    splitter = asyncio.ensure_future(split_pages())
+    try:
+        for _ in range(page_count):
+            index, result, error = await finished.get()
+            if error is not None:
+                raise error
+            results[index] = result
+            yield dict(result, event='page', page=index + 1, pages=page_count)
+    finally:
+        splitter.cancel()
+        for task in tasks:
+            task.cancel()
+
+    if page_count == 1:
+        document = results[0]
+    else:
+        extracted_text = " ".join(result['extracted_text'] for result in results if result['extracted_text'])
+        feature_array, degraded = await text_features(extracted_text)
+        document = feature_result(feature_array, extracted_text, degraded)
+    yield dict(document, event='document', pages=page_count)
+
+
+async def read_json(request):
+    """Like Flask's request.json: None unless the body is JSON"""
+    if 'application/json' not in request.headers.get('content-type', ''):
+        return None
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def limit_body(request, max_bytes):
+    """The request, reading its body through a receive channel that raises UploadTooLarge past
+    max_bytes (chunked uploads have no Content-Length to check up front)"""
+    received = 0
+
+    async def receive():
+        nonlocal received
+        message = await request.receive()
+        if message['type'] == 'http.request':
+            received += len(message.get('body', b''))
+            if received > max_bytes:
+                raise UploadTooLarge()
+        return message
+
+    return Request(request.scope, receive)
+
+
+async def read_document(request):
+    """(page_count, pages) for the uploaded file, or the JSONResponse to return instead"""
+    too_large = JSONResponse({'error': f"Upload larger than {UPLOAD_CONFIG['max_bytes']} bytes"}, status_code=413)
+    try:
+        content_length = int(request.headers.get('content-length') or 0)
+    except ValueError:
+        return JSONResponse({'error': 'Invalid Content-Length header'}, status_code=400)
+    if content_length > UPLOAD_CONFIG['max_bytes']:
+        return too_large
+    try:
+        form = await limit_body(request, UPLOAD_CONFIG['max_bytes']).form()
+    except UploadTooLarge:
+        return too_large
+    try:
+        if 'file' not in form:
+            return JSONResponse({'error': 'No file part'}, status_code=400)
+
+        file = form['file']
+        if not getattr(file, 'filename', ''):
+            return JSONResponse({'error': 'No selected file'}, status_code=400)
+
+        data = await file.read()
+    finally:
+        await form.close()
+
+    try:
+        return await run_cpu(iter_pages, data)
+    except DocumentError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+
+
+class ReleasingResponse:
+    """Sends a response, then gives its admission slot back (also when the client disconnects)"""
+
+    def __init__(self, response, admitted_at):
+        self.response = response
+        self.admitted_at = admitted_at
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.response(scope, receive, send)
+        finally:
+            controller.release(time.monotonic() - self.admitted_at)
+
+
+def admission_controlled(priority):
+    """Async counterpart of admission.admission_controlled for Starlette endpoints"""
+    def decorator(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(request):
+            try:
+                admitted_at = await controller.acquire_async(priority)
+            except Rejected as e:
+                return JSONResponse({'error': str(e)}, status_code=429,
+                                    headers={'Retry-After': str(e.retry_after)})
+            try:
+                response = await endpoint(request)
+            except BaseException:
+                controller.release(time.monotonic() - admitted_at)
+                raise
+            return ReleasingResponse(response, admitted_at)
+        return wrapper
+    return decorator
+
+
+@admission_controlled('interactive')
+async def analyze_image(request):
+    document = await read_document(request)
+    if isinstance(document, JSONResponse):
+        return document
+    page_count, pages = document
+
+    try:
+        page_results = []
+        with budget.deadline(budget.request_budget(request.headers.get('x-latency-budget'))):
+            async for event in analyze_document(page_count, pages):
+                if event.pop('event') == 'page':
+                    page_results.append(event)
+                else:
+                    result = event
+        result.pop('pages')
+        if page_count > 1:
+            result['pages'] = sorted(page_results, key=lambda page: page['page'])
+        return JSONResponse(result)
+    except BudgetExceeded as e:
+        return JSONResponse({'error': str(e)}, status_code=504)
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+@admission_controlled('interactive')
+async def analyze_document_stream(request):
+    document = await read_document(request)
+    if isinstance(document, JSONResponse):
+        return document
+    page_count, pages = document
+
+    seconds = budget.request_budget(request.headers.get('x-latency-budget'))
+
+    async def generate():
+        yield dumps({'event': 'started', 'pages': page_count}) + b'\n'
+        try:
+            with budget.deadline(seconds):
+                async for event in analyze_document(page_count, pages):
+                    yield dumps(event) + b'\n'
+        except Exception as e:
+            yield dumps({'event': 'error', 'error': str(e)}) + b'\n'
+
+    return StreamingResponse(generate(), media_type='application/x-ndjson')
+
+
+async def get_words(request):
+    try:
+        level = int(request.query_params.get('level', 1))
+    except ValueError:
+        level = 1
+    words = await run_cpu(get_10_word_array, level)
+    return JSONResponse({'words': words})
+
+
+def pronunciation_result(original, pronounced):
+    ipa = load_ipa.get()
+    return {
+        'inaccuracy': check_pronounciation(original, pronounced) / len(original),
+        'original_ipa': ipa.convert(original),
+        'pronounced_ipa': ipa.convert(pronounced)
+    }
+
+
+async def check_pronunciation_api(request):
+    data = await read_json(request)
+    if not data or 'original' not in data or 'pronounced' not in data:
+        return JSONResponse({'error': 'Missing required fields'}, status_code=400)
+    return JSONResponse(await run_cpu(pronunciation_result, data['original'], data['pronounced']))
+
+
+async def check_dictation(request):
+    data = await read_json(request)
+    if not data or 'words' not in data or 'user_input' not in data:
+        return JSONResponse({'error': 'Missing required fields'}, status_code=400)
+
+    accuracy = dictation_accuracy(data['words'], data['user_input'])
+    return JSONResponse({
+        'accuracy': accuracy,
+        'overall_accuracy': sum(accuracy) / len(accuracy) if accuracy else 0
+    })
+
+
+async def readiness(request):
+    ready, statuses = engines.readiness()
+    return JSONResponse({'ready': ready, 'engines': statuses}, status_code=200 if ready else 503)
+
+
+async def startup():
+    http_client.get_async_client(ASGI_CONFIG['max_connections'])
+
+
+async def shutdown():
+    await http_client.close_async_client()
+    executor.shutdown(wait=False)
+
+
+class Dispatcher:
+    """Send the async routes (and lifespan events) to Starlette, everything else to the Flask app
+
+    Also records request latency for the async routes, like app.py's
+    after_request hook does for the Flask ones.
+    """
+
+    def __init__(self, async_app, paths, fallback):
+        self.async_app = async_app
+        self.paths = paths
+        self.fallback = fallback
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.async_app(scope, receive, send)
+        path = scope.get('path')
+        if path not in self.paths:
+            return await self.fallback(scope, receive, send)
+
+        start = time.perf_counter()
+        status = {}
+
+        async def send_with_status(message):
+            if message['type'] == 'http.response.start':
+                status['code'] = message['status']
+            await send(message)
+
+        try:
+            await self.async_app(scope, receive, send_with_status)
+        finally:
+            metrics.request_seconds.observe(time.perf_counter() - start, scope.get('method', 'GET'), path,
+                                            str(status.get('code', 500)))
+
+
+routes = [
+    Route('/api/analyze-image', analyze_image, methods=['POST']),
+    Route('/api/analyze-document', analyze_document_stream, methods=['POST']),
+    Route('/api/get-words', get_words, methods=['GET']),
+    Route('/api/check-pronunciation', check_pronunciation_api, methods=['POST']),
+    Route('/api/check-dictation', check_dictation, methods=['POST']),
+    Route('/api/ready', readiness, methods=['GET'])
+]
+
+# Same CORS policy as the Flask app (flask_cors handles the mounted routes itself)
+async_app = Starlette(routes=routes, on_startup=[startup], on_shutdown=[shutdown],
+                      middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'],
+                                             allow_headers=['*'])])
+app = Dispatcher(async_app, {route.path for route in routes}, WSGIMiddleware(flask_app))
@@ -0,0 +1,57 @@
+"""Per-request latency budget for the analysis routes.
+
+An analysis request gets ANALYSIS_BUDGET seconds (a client may ask for
+less with the X-Latency-Budget header, up to ANALYSIS_BUDGET_MAX). The
+deadline lives in a context variable, so it follows the request into the
+stage, page and OCR threads (they run in copies of the request context):
+
+- run_stages() gives the feature stages only the time that is left, and a
+  stage that overruns or fails is replaced by its degraded value
+  (features.DEGRADED_FEATURES) and reported in the response's 'degraded'
+  list instead of failing the request;
+- http_client caps its timeouts and retries at the time that is left and
+  fails with BudgetExceeded once it is spent, and Azure Read polling stops.
+"""
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+BUDGET_CONFIG = {
+    'default': float(os.environ.get('ANALYSIS_BUDGET', 20)),
+    'max': float(os.environ.get('ANALYSIS_BUDGET_MAX', 60))
+}
+
+current_deadline = ContextVar('deadline', default=None)
+
+
+class BudgetExceeded(Exception):
+    def __init__(self, what='request'):
+        super().__init__(f"Latency budget exhausted before {what} finished")
+
+
+def request_budget(header_value=None):
+    """Budget in seconds for a request, from its X-Latency-Budget header if valid"""
+    try:
+        requested = float(header_value)
+    except (TypeError, ValueError):
+        return BUDGET_CONFIG['default']
+    return min(requested, BUDGET_CONFIG['max']) if requested > 0 else BUDGET_CONFIG['default']
+
+
+@contextmanager
+def deadline(seconds):
+    """Run the block (and whatever it starts in copied contexts) against a deadline `seconds` from now"""
+    token = current_deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        current_deadline.reset(token)
+
+
+def remaining():
+    """Seconds left in the current budget, or None when there is no deadline"""
+    deadline_at = current_deadline.get()
+    if deadline_at is None:
+        return None
+    return max(0.0, deadline_at - time.monotonic())
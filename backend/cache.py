@@ -0,0 +1,73 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries expire after a fixed time-to-live"""
+
+    def __init__(self, max_size=1024, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """Return (found, value) for key, dropping the entry if it has expired"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def set(self, key, value, ttl=None):
+        """Insert or refresh an entry (for ttl seconds, default self.ttl), evicting the least recently used one when full"""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        """Remove a single entry if present"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Remove all entries (counters are kept)"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """Snapshot of cache size and hit-rate counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
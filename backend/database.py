@@ -2,17 +2,87 @@ import mysql.connector
 from mysql.connector import Error
 from datetime import datetime
 import json
+import os
+import time
 
-# MySQL Configuration
+from cache import TTLCache
+from metrics import register_collector, timed_db
+from serialization import RawJSON
+
+# MySQL Configuration (primary, all writes go here)
 DB_CONFIG = {
-    'host': 'localhost',
-    'user': 'root',
-    'password': '',  # Empty for XAMPP, change if you set a password
-    'database': 'dyslexia_db'
+    'host': os.environ.get('DB_HOST', 'localhost'),
+    'port': int(os.environ.get('DB_PORT', 3306)),
+    'user': os.environ.get('DB_USER', 'root'),
+    'password': os.environ.get('DB_PASSWORD', ''),  # Empty for XAMPP, change if you set a password
+    'database': os.environ.get('DB_NAME', 'dyslexia_db')
 }
 
-def get_connection():
-    """Create database connection"""
+# Optional read replica: read-only queries are routed here when DB_REPLICA_HOST is set
+REPLICA_CONFIG = {
+    'host': os.environ['DB_REPLICA_HOST'],
+    'port': int(os.environ.get('DB_REPLICA_PORT', 3306)),
+    'user': os.environ.get('DB_REPLICA_USER', DB_CONFIG['user']),
+    'password': os.environ.get('DB_REPLICA_PASSWORD', DB_CONFIG['password']),
+    'database': DB_CONFIG['database'],
+    'connection_timeout': 2
+} if os.environ.get('DB_REPLICA_HOST') else None
+
+# Reads fall back to the primary when the replica lags by more than max_lag_seconds
+# (a negative value disables the lag check) or could not be reached in the last
+# retry_interval seconds. Replication lag is re-checked every lag_check_interval seconds.
+READ_ROUTING_CONFIG = {
+    'max_lag_seconds': float(os.environ.get('DB_REPLICA_MAX_LAG', 5)),
+    'lag_check_interval': float(os.environ.get('DB_REPLICA_LAG_CHECK_INTERVAL', 5)),
+    'retry_interval': float(os.environ.get('DB_REPLICA_RETRY_INTERVAL', 30))
+}
+
+replica_state = {
+    'fresh': False,
+    'lag_seconds': None,
+    'checked_at': None,
+    'down_until': 0.0,
+    'reads_routed': 0,
+    'reads_fallback': 0
+}
+
+# Login lookups (name -> latest user record) are served from this cache when possible.
+# The cache is per process: a signup only refreshes the cache of the worker that handled
+# it, so in the other gunicorn workers a new user who reuses an existing name logs in as
+# the older user until the entry expires. USER_CACHE_TTL bounds that window.
+USER_CACHE_CONFIG = {
+    'max_size': int(os.environ.get('USER_CACHE_MAX_SIZE', 1024)),
+    'ttl': float(os.environ.get('USER_CACHE_TTL', 30))
+}
+
+user_cache = TTLCache(**USER_CACHE_CONFIG)
+
+def user_cache_key(name):
+    """Cache key matching how `name = %s` compares names (case-insensitive collation, trailing spaces ignored)"""
+    return name.rstrip(' ').casefold()
+
+def user_cache_ttl(read_only):
+    """TTL for a looked-up user: a replica row may already be max_lag_seconds old, so keep it no longer than that"""
+    max_lag = READ_ROUTING_CONFIG['max_lag_seconds']
+    if read_only and REPLICA_CONFIG is not None and max_lag >= 0:
+        return min(USER_CACHE_CONFIG['ttl'], max_lag)
+    return None
+
+# Roster imports are inserted in chunks of batch_size rows inside one transaction
+BULK_IMPORT_CONFIG = {
+    'max_rows': int(os.environ.get('BULK_IMPORT_MAX_ROWS', 20000)),
+    'batch_size': int(os.environ.get('BULK_IMPORT_BATCH_SIZE', 1000))
+}
+
+def get_connection(read_only=False):
+    """Create database connection (read_only connections may go to the replica)"""
+    if read_only and REPLICA_CONFIG is not None:
+        conn = get_replica_connection()
+        if conn:
+            replica_state['reads_routed'] += 1
+            return conn
+        replica_state['reads_fallback'] += 1
+    
     try:
         conn = mysql.connector.connect(**DB_CONFIG)
         return conn
@@ -20,12 +90,77 @@ def get_connection():
         print(f"Database connection error: {e}")
         return None
 
+def get_replication_lag(conn):
+    """Seconds the replica is behind the primary, or None if replication is not running"""
+    cursor = conn.cursor(dictionary=True)
+    try:
+        try:
+            cursor.execute("SHOW REPLICA STATUS")
+        except Error:
+            # MySQL < 8.0.22 / MariaDB
+            cursor.execute("SHOW SLAVE STATUS")
+        status = cursor.fetchone()
+        cursor.fetchall()
+        if not status:
+            return None
+        lag = status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+        return float(lag) if lag is not None else None
+    finally:
+        cursor.close()
+
+def get_replica_connection():
+    """Connect to the read replica if it is reachable and within the staleness tolerance"""
+    now = time.monotonic()
+    if now < replica_state['down_until']:
+        return None
+    
+    check_due = (replica_state['checked_at'] is None or
+                 now - replica_state['checked_at'] >= READ_ROUTING_CONFIG['lag_check_interval'])
+    if not check_due and not replica_state['fresh']:
+        return None
+    
+    try:
+        conn = mysql.connector.connect(**REPLICA_CONFIG)
+    except Error as e:
+        print(f"Read replica unavailable, using primary: {e}")
+        replica_state['down_until'] = now + READ_ROUTING_CONFIG['retry_interval']
+        replica_state['fresh'] = False
+        return None
+    
+    if check_due:
+        max_lag = READ_ROUTING_CONFIG['max_lag_seconds']
+        try:
+            lag = get_replication_lag(conn) if max_lag >= 0 else None
+        except Error as e:
+            print(f"Could not read replication status: {e}")
+            lag = None
+        replica_state['lag_seconds'] = lag
+        replica_state['checked_at'] = now
+        replica_state['fresh'] = max_lag < 0 or (lag is not None and lag <= max_lag)
+    
+    if not replica_state['fresh']:
+        conn.close()
+        return None
+    return conn
+
+def get_replica_status():
+    """Get read routing state (replica freshness and routed/fallback read counts)"""
+    return {
+        'replica_configured': REPLICA_CONFIG is not None,
+        'replica_fresh': replica_state['fresh'],
+        'lag_seconds': replica_state['lag_seconds'],
+        'max_lag_seconds': READ_ROUTING_CONFIG['max_lag_seconds'],
+        'reads_routed': replica_state['reads_routed'],
+        'reads_fallback': replica_state['reads_fallback']
+    }
+
 def init_database():
     """Initialize database and create tables"""
     try:
         # Connect without database first
         conn = mysql.connector.connect(
             host=DB_CONFIG['host'],
+            port=DB_CONFIG['port'],
             user=DB_CONFIG['user'],
             password=DB_CONFIG['password']
         )
@@ -73,6 +208,13 @@ def init_database():
             cursor.close()
             conn.close()
 
+def parse_details(details, raw=False):
+    """Decode a `details` JSON column, or wrap it for pass-through serialization"""
+    if raw:
+        return RawJSON(details)
+    return json.loads(details)
+
+@timed_db
 def save_test_result(user_id, test_type, score, prediction, confidence, details):
     """Save test result to database"""
     conn = get_connection()
@@ -98,7 +240,20 @@ def save_test_result(user_id, test_type, score, prediction, confidence, details)
 
 def get_user_by_name(name):
     """Get user by name for login"""
-    conn = get_connection()
+    found, user = user_cache.get(user_cache_key(name))
+    if found:
+        return dict(user)
+
+    user = fetch_user_by_name(name, read_only=True)
+    if user is None and REPLICA_CONFIG is not None:
+        # A user created moments ago may not have reached the replica yet
+        user = fetch_user_by_name(name)
+    return user
+
+@timed_db
+def fetch_user_by_name(name, read_only=False):
+    """Query the latest user with this name and cache it"""
+    conn = get_connection(read_only=read_only)
     if not conn:
         return None
     
@@ -107,6 +262,9 @@ def get_user_by_name(name):
         query = "SELECT * FROM users WHERE name = %s ORDER BY created_at DESC LIMIT 1"
         cursor.execute(query, (name,))
         user = cursor.fetchone()
+        # Only found users are cached so a later signup is never hidden by a cached miss
+        if user:
+            user_cache.set(user_cache_key(name), dict(user), ttl=user_cache_ttl(read_only))
         return user
     except Error as e:
         print(f"Error fetching user by name: {e}")
@@ -116,9 +274,10 @@ def get_user_by_name(name):
             cursor.close()
             conn.close()
 
-def get_user_history(user_id):
-    """Get all test results for a user"""
-    conn = get_connection()
+@timed_db
+def get_user_history(user_id, raw_details=False):
+    """Get all test results for a user (raw_details keeps `details` as unparsed JSON)"""
+    conn = get_connection(read_only=True)
     if not conn:
         return []
     
@@ -135,7 +294,7 @@ def get_user_history(user_id):
         # Parse JSON details
         for result in results:
             if result['details']:
-                result['details'] = json.loads(result['details'])
+                result['details'] = parse_details(result['details'], raw_details)
         
         return results
     except Error as e:
@@ -146,6 +305,7 @@ def get_user_history(user_id):
             cursor.close()
             conn.close()
 
+@timed_db
 def create_user(name, age, grade):
     """Create new user"""
     conn = get_connection()
@@ -157,6 +317,9 @@ def create_user(name, age, grade):
         query = "INSERT INTO users (name, age, grade) VALUES (%s, %s, %s)"
         cursor.execute(query, (name, age, grade))
         conn.commit()
+        # The new row is now the latest user with this name: drop the cached older one, the
+        # next login reads the row as MySQL stored it (types converted by the columns)
+        user_cache.invalidate(user_cache_key(name))
         return cursor.lastrowid
     except Error as e:
         print(f"Error creating user: {e}")
@@ -166,9 +329,71 @@ def create_user(name, age, grade):
             cursor.close()
             conn.close()
 
-def get_all_results():
-    """Get all test results (for admin/analytics)"""
+@timed_db
+def create_users_bulk(users):
+    """Create many users in one transaction, returning their ids in input order"""
     conn = get_connection()
+    if not conn:
+        return None
+    
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT @@auto_increment_increment")
+        increment = cursor.fetchone()[0]
+        query = "INSERT INTO users (name, age, grade) VALUES (%s, %s, %s)"
+        batch_size = BULK_IMPORT_CONFIG['batch_size']
+        user_ids = []
+        
+        for start in range(0, len(users), batch_size):
+            batch = users[start:start + batch_size]
+            # executemany rewrites this into a single multi-row INSERT, so the
+            # batch gets one contiguous block of ids starting at lastrowid
+            cursor.executemany(query, [(u['name'], u['age'], u.get('grade')) for u in batch])
+            first_id = cursor.lastrowid
+            batch_ids = [first_id + i * increment for i in range(len(batch))]
+            
+            cursor.execute(
+                "SELECT id, name FROM users WHERE id BETWEEN %s AND %s ORDER BY id",
+                (batch_ids[0], batch_ids[-1]))
+            inserted = cursor.fetchall()
+            if [row[0] for row in inserted] != batch_ids or [row[1] for row in inserted] != [u['name'] for u in batch]:
+                raise Error(msg="Inserted user ids are not contiguous, aborting bulk import")
+            user_ids.extend(batch_ids)
+        
+        conn.commit()
+        for u in users:
+            user_cache.invalidate(user_cache_key(u['name']))
+        return user_ids
+    except Error as e:
+        conn.rollback()
+        print(f"Error creating users in bulk: {e}")
+        return None
+    finally:
+        if conn.is_connected():
+            cursor.close()
+            conn.close()
+
+def get_user_cache_stats():
+    """Get hit-rate metrics for the login lookup cache"""
+    return user_cache.stats()
+
+@register_collector
+def collect_database_metrics():
+    """Login cache and read routing state for /metrics"""
+    cache = user_cache.stats()
+    return [
+        ('dyslexicheck_user_cache_lookups_total', 'counter', "Login cache lookups",
+         [({'result': 'hit'}, cache['hits']), ({'result': 'miss'}, cache['misses'])]),
+        ('dyslexicheck_user_cache_entries', 'gauge', "Entries in the login cache", [({}, cache['size'])]),
+        ('dyslexicheck_replica_reads_total', 'counter', "Read-only connections by target",
+         [({'target': 'replica'}, replica_state['reads_routed']),
+          ({'target': 'primary_fallback'}, replica_state['reads_fallback'])])
+    ]
+
+@timed_db
+def get_all_results(raw_details=False):
+    """Get all test results (for admin/analytics, raw_details keeps `details` as unparsed JSON)"""
+    conn = get_connection(read_only=True)
     if not conn:
         return []
     
@@ -185,7 +410,7 @@ def get_all_results():
         
         for result in results:
             if result['details']:
-                result['details'] = json.loads(result['details'])
+                result['details'] = parse_details(result['details'], raw_details)
         
         return results
     except Error as e:
@@ -195,3 +420,41 @@ def get_all_results():
         if conn.is_connected():
             cursor.close()
             conn.close()
+
+def iter_results(chunk_size=5000):
+    """Stream all test results joined with users, yielding lists of at most chunk_size rows
+
+    Raises Error if the database is unreachable or the stream breaks off, so
+    that a consumer (export_results) cannot mistake a partial stream for all rows.
+    """
+    conn = get_connection(read_only=True)
+    if not conn:
+        raise Error(msg="Could not connect to the database")
+    
+    try:
+        # Unbuffered cursor: rows are read from the server as fetchmany asks for them,
+        # so memory stays bounded by chunk_size whatever the table size
+        cursor = conn.cursor(dictionary=True, buffered=False)
+        query = """
+            SELECT tr.*, u.name, u.age, u.grade 
+            FROM test_results tr
+            JOIN users u ON tr.user_id = u.id
+            ORDER BY tr.id
+        """
+        cursor.execute(query)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for row in rows:
+                if row['details']:
+                    row['details'] = json.loads(row['details'])
+            yield rows
+    except Error as e:
+        print(f"Error streaming results: {e}")
+        raise
+    finally:
+        # Closing the connection (not the cursor) also discards rows left unread
+        # when the consumer stops early
+        if conn.is_connected():
+            conn.close()
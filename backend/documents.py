@@ -0,0 +1,139 @@
+"""Multi-page uploads: splitting documents into pages and analysing them concurrently.
+
+An upload may be a single image (JPEG, PNG, ...), a multi-frame image
+(TIFF stack, animated PNG/GIF) or a PDF. iter_pages() yields one encoded
+image per page, lazily: a page is only decoded (or, for PDFs, rendered at
+DOCUMENT_PDF_DPI with pypdfium2) when the previous ones have been handed
+out, so a long document is never held in memory as images all at once.
+
+map_pages() runs a function (preprocessing + OCR + features) over those
+pages on a shared pool of DOCUMENT_WORKERS threads, with at most
+DOCUMENT_PAGE_CONCURRENCY pages of one document in flight, and yields the
+results as pages finish. Documents with more than DOCUMENT_MAX_PAGES pages
+are rejected with TooManyPages.
+"""
+import contextvars
+import io
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from PIL import Image, ImageSequence, UnidentifiedImageError
+
+from profiler import in_request_profile
+
+DOCUMENT_CONFIG = {
+    'max_pages': int(os.environ.get('DOCUMENT_MAX_PAGES', 20)),
+    'page_concurrency': int(os.environ.get('DOCUMENT_PAGE_CONCURRENCY', 4)),
+    'workers': int(os.environ.get('DOCUMENT_WORKERS', 16)),
+    'pdf_dpi': float(os.environ.get('DOCUMENT_PDF_DPI', 200))
+}
+
+executor = ThreadPoolExecutor(max_workers=DOCUMENT_CONFIG['workers'], thread_name_prefix='page')
+# PDFium is not thread-safe
+pdf_lock = threading.Lock()
+
+
+class DocumentError(Exception):
+    pass
+
+
+class TooManyPages(DocumentError):
+    def __init__(self, pages):
+        super().__init__(f"Document has {pages} pages, at most {DOCUMENT_CONFIG['max_pages']} are supported")
+        self.pages = pages
+
+
+def is_pdf(data):
+    return data[:5] == b'%PDF-'
+
+
+def encode_page(image):
+    output = io.BytesIO()
+    # Near-lossless; preprocessing shrinks it for OCR afterwards
+    image.convert('RGB').save(output, format='JPEG', quality=95)
+    return output.getvalue()
+
+
+def pdf_pages(data):
+    import pypdfium2 as pdfium
+
+    with pdf_lock:
+        pdf = pdfium.PdfDocument(data)
+    try:
+        count = len(pdf)
+        yield count
+        for index in range(count):
+            with pdf_lock:
+                page = pdf[index]
+                image = page.render(scale=DOCUMENT_CONFIG['pdf_dpi'] / 72).to_pil()
+                page.close()
+            yield encode_page(image)
+    finally:
+        with pdf_lock:
+            pdf.close()
+
+
+# Formats whose frames are pages. Other multi-frame images are one picture: a phone camera's
+# MPO JPEG, for one, carries a preview or depth map as its second frame.
+PAGED_FORMATS = {'TIFF', 'GIF', 'PNG'}  # PNG: APNG
+
+
+def image_pages(data):
+    with Image.open(io.BytesIO(data)) as image:
+        count = getattr(image, 'n_frames', 1) if image.format in PAGED_FORMATS else 1
+        yield count
+        if count == 1:
+            # Send single images as uploaded (preprocessing handles EXIF rotation etc.)
+            yield data
+            return
+        for frame in ImageSequence.Iterator(image):
+            yield encode_page(frame)
+
+
+def iter_pages(data):
+    """(page_count, lazy iterator over the encoded page images) for an uploaded document"""
+    try:
+        pages = pdf_pages(data) if is_pdf(data) else image_pages(data)
+        count = next(pages)
+    except UnidentifiedImageError:
+        raise DocumentError("Unsupported file type, expected an image or a PDF")
+    except Exception as e:
+        raise DocumentError(f"Unsupported or damaged document: {e}")
+    if count == 0:
+        pages.close()
+        raise DocumentError("The document has no pages")
+    if count > DOCUMENT_CONFIG['max_pages']:
+        pages.close()
+        raise TooManyPages(count)
+    return count, pages
+
+
+def map_pages(func, pages, concurrency=None):
+    """Yield (page_index, func(page)) for each page as it finishes, with bounded concurrency
+
+    Pages are pulled from the iterator only when a slot is free. An
+    exception in func is re-raised and the pages still queued are dropped.
+    """
+    concurrency = concurrency or DOCUMENT_CONFIG['page_concurrency']
+    pages = enumerate(pages)
+    pending = {}
+
+    def fill():
+        while len(pending) < concurrency:
+            item = next(pages, None)
+            if item is None:
+                return
+            index, page = item
+            pending[executor.submit(contextvars.copy_context().run, in_request_profile, func, page)] = index
+
+    try:
+        fill()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result()
+            fill()
+    finally:
+        for future in pending:
+            future.cancel()
@@ -0,0 +1,106 @@
+"""Lazily loaded heavy dependencies ("engines").
+
+Importing TextBlob/NLTK, abydos, Tesseract, the IPA lexicon and
+starting LanguageTool takes seconds, and most routes need none of them.
+Each engine is loaded on first use (once, under a lock) and records how
+long that took, so /api/ready can report which engines are warm.
+
+WARMUP_ENGINES (comma separated names, or "all") loads engines in a
+background thread at startup; /api/ready answers 503 until those are warm.
+wsgi.py switches the warm-up to run synchronously so engines are loaded in
+the gunicorn master before it forks its workers.
+"""
+import os
+import threading
+import time
+
+engines = {}
+
+WARMUP_CONFIG = {
+    'background': True
+}
+
+
+class Engine:
+    def __init__(self, name, load):
+        self.name = name
+        self.load = load
+        self.value = None
+        self.state = 'cold'
+        self.error = None
+        self.load_seconds = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        """The loaded engine (None if loading failed)"""
+        if self.state in ('warm', 'failed'):
+            return self.value
+        with self.lock:
+            if self.state in ('warm', 'failed'):
+                return self.value
+            self.state = 'loading'
+            start = time.perf_counter()
+            try:
+                self.value = self.load()
+            except Exception as e:
+                print(f"Warning: Could not load engine {self.name}: {e}")
+                self.error = str(e)
+            self.load_seconds = time.perf_counter() - start
+            self.state = 'warm' if self.value is not None else 'failed'
+            return self.value
+
+    def set(self, value):
+        """Replace the engine with an already loaded value"""
+        with self.lock:
+            self.value = value
+            self.error = None
+            self.state = 'warm' if value is not None else 'failed'
+
+    def status(self):
+        status = {'state': self.state}
+        if self.load_seconds is not None:
+            status['load_seconds'] = round(self.load_seconds, 4)
+        if self.error:
+            status['error'] = self.error
+        return status
+
+
+def engine(name):
+    """Decorator registering a zero-argument loader as a lazily loaded engine"""
+    def register(load):
+        engines[name] = Engine(name, load)
+        return engines[name]
+    return register
+
+
+def warmup_names():
+    names = [name.strip() for name in os.environ.get('WARMUP_ENGINES', '').split(',') if name.strip()]
+    return sorted(engines) if names == ['all'] else names
+
+
+def warm_up(names=None):
+    for name in names if names is not None else sorted(engines):
+        if name in engines:
+            engines[name].get()
+        else:
+            print(f"Warning: Unknown engine {name}")
+
+
+def start_warm_up(names=None):
+    """Load engines on a background thread so startup is not blocked (or right away, see WARMUP_CONFIG)"""
+    names = warmup_names() if names is None else names
+    if not names:
+        return None
+    if not WARMUP_CONFIG['background']:
+        warm_up(names)
+        return None
+    thread = threading.Thread(target=warm_up, args=(names,), name='engine-warmup', daemon=True)
+    thread.start()
+    return thread
+
+
+def readiness():
+    """(ready, {engine: status}); ready once every WARMUP_ENGINES engine finished loading"""
+    statuses = {name: engines[name].status() for name in sorted(engines)}
+    ready = all(statuses[name]['state'] in ('warm', 'failed') for name in warmup_names() if name in statuses)
+    return ready, statuses
@@ -0,0 +1,232 @@
+"""Columnar (Parquet / Arrow IPC) export of test results for analytics.
+
+Rows are streamed out of MySQL in chunks and written one record batch at a
+time, so memory use depends on the chunk size and not on the table size.
+
+    python export_results.py --format parquet --output results.parquet
+    python export_results.py --format arrow --output results.arrow
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+
+from mysql.connector import Error
+
+from database import iter_results
+
+# pyarrow is only needed for exports
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+EXPORT_FORMATS = ('parquet', 'arrow')
+
+EXPORT_CONFIG = {
+    'chunk_size': 5000
+}
+
+# Columns taken straight from test_results / users
+BASE_COLUMNS = [
+    ('id', 'int64'),
+    ('user_id', 'int64'),
+    ('test_type', 'string'),
+    ('score', 'float64'),
+    ('prediction', 'string'),
+    ('confidence', 'float64'),
+    ('created_at', 'timestamp'),
+    ('name', 'string'),
+    ('age', 'int32'),
+    ('grade', 'string')
+]
+
+# Known keys of the `details` JSON column, flattened into typed columns.
+# Handwriting rows carry the four model features (same names as the API
+# response), pronunciation and dictation rows carry their own summaries.
+DETAIL_COLUMNS = [
+    ('extracted_text', 'string'),
+    ('spelling_accuracy', 'float64'),
+    ('grammatical_accuracy', 'float64'),
+    ('percentage_of_corrections', 'float64'),
+    ('phonetic_accuracy', 'float64'),
+    ('overall_accuracy', 'float64'),
+    ('consistency_score', 'float64'),
+    ('error_rate', 'float64'),
+    ('spelling_error_rate', 'float64'),
+    ('avg_edit_distance', 'float64'),
+    ('correct_words', 'int64'),
+    ('total_words', 'int64')
+]
+
+
+def arrow_type(name):
+    if name == 'timestamp':
+        return pa.timestamp('s')
+    return getattr(pa, name)()
+
+
+def build_schema():
+    """Arrow schema of an export: base columns, flattened details, then leftover details as JSON"""
+    fields = [pa.field(name, arrow_type(kind)) for name, kind in BASE_COLUMNS]
+    fields += [pa.field(f"details_{name}", arrow_type(kind)) for name, kind in DETAIL_COLUMNS]
+    fields.append(pa.field('details_extra', pa.string()))
+    return pa.schema(fields)
+
+
+def coerce(value, kind):
+    """Convert a JSON value to the column type, dropping values that do not fit"""
+    if value is None:
+        return None
+    try:
+        if kind.startswith('float'):
+            return float(value)
+        if kind.startswith('int'):
+            return int(value)
+        if kind == 'string':
+            return str(value)
+    except (TypeError, ValueError):
+        return None
+    return value
+
+
+def rows_to_batch(rows, schema):
+    """Turn a chunk of result rows into one Arrow record batch"""
+    detail_keys = {name for name, _ in DETAIL_COLUMNS}
+    columns = {name: [row.get(name) for row in rows] for name, _ in BASE_COLUMNS}
+
+    for name, kind in DETAIL_COLUMNS:
+        columns[f"details_{name}"] = [
+            coerce(row['details'].get(name), kind) if isinstance(row.get('details'), dict) else None
+            for row in rows
+        ]
+
+    extra = []
+    for row in rows:
+        details = row.get('details')
+        if isinstance(details, dict):
+            leftover = {k: v for k, v in details.items() if k not in detail_keys}
+            extra.append(json.dumps(leftover) if leftover else None)
+        else:
+            extra.append(json.dumps(details) if details is not None else None)
+    columns['details_extra'] = extra
+
+    return pa.record_batch([pa.array(columns[field.name], type=field.type) for field in schema], schema=schema)
+
+
+class ChunkSink:
+    """Write-only file object that hands written bytes back to the caller (for streaming responses)"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def open_writer(sink, fmt, schema):
+    if fmt == 'parquet':
+        return pq.ParquetWriter(sink, schema, compression='snappy')
+    return pa.ipc.new_stream(sink, schema)
+
+
+def write_batch(writer, fmt, batch):
+    if fmt == 'parquet':
+        # One row group per database chunk
+        writer.write_table(pa.Table.from_batches([batch]))
+    else:
+        writer.write_batch(batch)
+
+
+def check_export_format(fmt):
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed, exports are unavailable")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}', expected one of {', '.join(EXPORT_FORMATS)}")
+
+
+def export_results(path, fmt='parquet', chunk_size=None):
+    """Export all results to a Parquet or Arrow IPC (stream format) file, returning the row count
+
+    If reading the results fails, the partial file is removed and the error raised.
+    """
+    check_export_format(fmt)
+    schema = build_schema()
+    total = 0
+    try:
+        with open(path, 'wb') as f:
+            writer = open_writer(pa.PythonFile(f, mode='w'), fmt, schema)
+            try:
+                for rows in iter_results(chunk_size or EXPORT_CONFIG['chunk_size']):
+                    write_batch(writer, fmt, rows_to_batch(rows, schema))
+                    total += len(rows)
+            finally:
+                writer.close()
+    except BaseException:
+        # The footer written on close would make a truncated export read as a complete one
+        # (and if open() failed there is no file to remove)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+        raise
+    return total
+
+
+def stream_results(fmt='parquet', chunk_size=None):
+    """Yield an export as bytes, one database chunk at a time
+
+    If reading the results fails, the error is raised before the Parquet footer
+    or the Arrow end-of-stream marker is written; the server then aborts the
+    response, so the client sees a failed download rather than a short export.
+    """
+    check_export_format(fmt)
+    schema = build_schema()
+    sink = ChunkSink()
+    writer = open_writer(pa.PythonFile(sink, mode='w'), fmt, schema)
+    for rows in iter_results(chunk_size or EXPORT_CONFIG['chunk_size']):
+        write_batch(writer, fmt, rows_to_batch(rows, schema))
+        data = sink.drain()
+        if data:
+            yield data
+    writer.close()
+    yield sink.drain()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='parquet')
+    parser.add_argument('--output', required=True, help="file to write")
+    parser.add_argument('--chunk-size', type=int, default=EXPORT_CONFIG['chunk_size'],
+                        help="rows fetched from MySQL and written per batch")
+    args = parser.parse_args()
+
+    try:
+        total = export_results(args.output, args.format, args.chunk_size)
+    except Error as e:
+        sys.exit(f"Export failed, no file written: {e}")
+    print(f"Exported {total} results to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,320 @@
+import os
+import re
+
+import httpx
+import numpy as np
+import requests
+
+import http_client
+from cache import TTLCache
+from engines import engine
+from http_client import CircuitOpenError
+from metrics import external_call, fallbacks
+from singleflight import SingleFlight
+
+# text correction API authentication (read from env for safety)
+api_key_textcorrection = os.environ.get('BING_SPELLCHECK_KEY', '7aba4995897b4dcaa86c34ddb82a1ecf')
+endpoint_textcorrection = os.environ.get('BING_SPELLCHECK_ENDPOINT', 'https://api.bing.microsoft.com/v7.0/SpellCheck')
+
+# Values reported for a feature whose stage failed or ran out of latency budget (the Streamlit
+# app's defaults); the phonetic score is not used by score() and is left out rather than guessed
+DEGRADED_FEATURES = {
+    'spelling_accuracy': 85.0,
+    'grammatical_accuracy': 80.0,
+    'percentage_of_corrections': 5.0,
+    'phonetic_accuracy': None
+}
+
+# Heavy libraries are imported on first use, see engines.py
+@engine('textblob')
+def load_textblob():
+    from textblob import TextBlob
+    TextBlob("warm").correct()  # loads the spelling model
+    return TextBlob
+
+@engine('phonetics')
+def load_phonetic_encoders():
+    from abydos.phonetic import Soundex, Metaphone, Caverphone, NYSIIS
+    return Soundex(), Metaphone(), Caverphone(), NYSIIS()
+
+class IpaLexicon:
+    """eng_to_ipa.convert() over the CMU dictionary held in memory
+
+    eng_to_ipa opens its sqlite database on every call; loading the JSON
+    copy of the dictionary once is ~100x faster per word and lets gunicorn
+    workers share it with the master (see wsgi.py).
+    """
+
+    def __init__(self):
+        import json
+        from eng_to_ipa import transcribe
+        self.transcribe = transcribe
+        path = os.path.join(os.path.dirname(transcribe.__file__), 'resources', 'CMU_dict.json')
+        with open(path, encoding='utf-8') as f:
+            self.cmu = json.load(f)
+
+    def convert(self, text):
+        transcribe = self.transcribe
+        words = [transcribe.preserve_punc(word.lower())[0] for word in text.split()]
+        cmu = [self.cmu.get(word[1]) or ["__IGNORE__" + word[1]] for word in words]
+        ipa = transcribe.cmu_to_ipa(cmu, stress_marking='both')
+        ipa = transcribe._punct_replace_word(words, ipa)
+        return transcribe.get_top(ipa)
+
+@engine('ipa')
+def load_ipa():
+    return IpaLexicon()
+
+@engine('languagetool')
+def load_language_tool():
+    # LANGUAGETOOL_SERVER points at a remote server instead of starting a local JVM
+    import language_tool_python
+    return language_tool_python.LanguageTool('en-US', remote_server=os.environ.get('LANGUAGETOOL_SERVER'))
+
+def init_language_tool(remote_server=None):
+    """Start a local LanguageTool server (or connect to remote_server) now, with error handling"""
+    try:
+        import language_tool_python
+        tool = language_tool_python.LanguageTool('en-US', remote_server=remote_server)
+    except Exception as e:
+        print(f"Warning: Could not initialize LanguageTool: {e}")
+        tool = None
+    load_language_tool.set(tool)
+    return tool
+
+language_tool_server = None
+
+def start_language_tool_server():
+    """Start one local LanguageTool server for several processes to share; returns its URL
+
+    The gunicorn master (wsgi.py) calls this before forking and hands the URL
+    to the workers as LANGUAGETOOL_SERVER, so there is one JVM per host
+    instead of one per worker, and recycled workers do not restart it.
+    """
+    global language_tool_server
+    import language_tool_python
+    from language_tool_python import server
+
+    tool = language_tool_python.LanguageTool('en-US')
+    # Detach the JVM from the client object, which stops it when closed or collected, and
+    # from language_tool_python's atexit hook: stop_language_tool_server() owns it now
+    language_tool_server, tool._server = tool._server, None
+    server.RUNNING_SERVER_PROCESSES.remove(language_tool_server)
+    return f"http://{tool._host}:{tool._port}"
+
+def stop_language_tool_server():
+    global language_tool_server
+    if language_tool_server is not None:
+        language_tool_server.terminate()
+        language_tool_server.wait(timeout=30)
+        language_tool_server = None
+
+def levenshtein(s1, s2):
+    if len(s1) < len(s2):
+        return levenshtein(s2, s1)
+
+    # len(s1) >= len(s2)
+    if len(s2) == 0:
+        return len(s1)
+
+    previous_row = range(len(s2) + 1)
+    for i, c1 in enumerate(s1):
+        current_row = [i + 1]
+        for j, c2 in enumerate(s2):
+            # j+1 instead of j since previous_row and current_row are one character longer
+            insertions = previous_row[j + 1] + 1
+            deletions = current_row[j] + 1       # than s2
+            substitutions = previous_row[j] + (c1 != c2)
+            current_row.append(min(insertions, deletions, substitutions))
+        previous_row = current_row
+
+    return previous_row[-1]
+
+def check_pronounciation(str1, str2):
+    ipa = load_ipa.get()
+    s1 = ipa.convert(str1)
+    s2 = ipa.convert(str2)
+    return levenshtein(s1, s2)
+
+def dictation_accuracy(words, user_input):
+    """Per-word accuracy of a dictation attempt (missing answers score 0)"""
+    accuracy = []
+    for i in range(min(len(words), len(user_input))):
+        word_accuracy = 1 - (levenshtein(words[i], user_input[i]) / max(len(words[i]), 1))
+        accuracy.append(word_accuracy)
+
+    # Fill remaining with zeros if user provided fewer words
+    while len(accuracy) < len(words):
+        accuracy.append(0)
+    return accuracy
+
+# TextBlob's correct() is the most expensive step of an analysis (about a second of CPU for a
+# sample) and three features need it: concurrent stages share one correction, and recent ones are kept
+SPELL_CACHE_CONFIG = {
+    'max_size': int(os.environ.get('SPELL_CACHE_MAX_SIZE', 512)),
+    'ttl': float(os.environ.get('SPELL_CACHE_TTL', 300))
+}
+
+spell_cache = TTLCache(**SPELL_CACHE_CONFIG)
+spell_corrections = SingleFlight('spell_correction')
+
+def correct_spelling(extracted_text):
+    TextBlob = load_textblob.get()
+    spell_corrected = str(TextBlob(extracted_text).correct())
+    spell_cache.set(extracted_text, spell_corrected)
+    return spell_corrected
+
+def spell_correct(extracted_text):
+    """str(TextBlob(extracted_text).correct()), computed once for concurrent and recent callers"""
+    found, spell_corrected = spell_cache.get(extracted_text)
+    if found:
+        return spell_corrected
+    return spell_corrections.do(extracted_text, correct_spelling, extracted_text)
+
+# method for finding the spelling accuracy
+def spelling_accuracy(extracted_text):
+    spell_corrected = spell_correct(extracted_text)
+    return ((len(extracted_text) - (levenshtein(extracted_text, str(spell_corrected))))/(len(extracted_text)+1))*100
+
+# method for gramatical accuracy
+def gramatical_accuracy(extracted_text):
+    my_tool = load_language_tool.get()
+    spell_corrected = spell_correct(extracted_text)
+    if my_tool is not None:
+        with external_call('languagetool'):
+            correct_text = my_tool.correct(str(spell_corrected))
+    else:
+        # Fallback: use TextBlob for basic grammar correction
+        fallbacks.inc('grammatical_accuracy')
+        correct_text = str(spell_corrected)
+    extracted_text_set = set(str(spell_corrected).split(" "))
+    correct_text_set = set(correct_text.split(" "))
+    n = max(len(extracted_text_set - correct_text_set),
+            len(correct_text_set - extracted_text_set))
+    return ((len(str(spell_corrected)) - n)/(len(str(spell_corrected))+1))*100
+
+# percentage of corrections
+def bing_spellcheck_request(extracted_text):
+    """Keyword arguments for the Bing Spell Check POST (shared with the async client in asgi.py)"""
+    return {
+        'url': endpoint_textcorrection,
+        'headers': {
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'Ocp-Apim-Subscription-Key': api_key_textcorrection,
+        },
+        'params': {
+            'mkt': 'en-us',
+            'mode': 'proof'
+        },
+        'data': {'text': extracted_text}
+    }
+
+def corrections_from_response(extracted_text, json_response):
+    return len(json_response['flaggedTokens'])/len(extracted_text.split(" "))*100
+
+def local_percentage_of_corrections(extracted_text):
+    """Fallback for Bing: share of tokens missing from TextBlob's spelling model"""
+    load_textblob.get()
+    from textblob.en import spelling
+    flagged = [token for token in re.findall(r"[A-Za-z']+", extracted_text) if token.lower() not in spelling]
+    return len(flagged)/len(extracted_text.split(" "))*100
+
+def percentage_of_corrections(extracted_text):
+    try:
+        response = http_client.request('bing_spellcheck', 'POST', **bing_spellcheck_request(extracted_text))
+        response.raise_for_status()
+        json_response = response.json()
+    except (CircuitOpenError, requests.RequestException) as e:
+        print(f"Bing Spell Check unavailable ({e}), using the local word list")
+        fallbacks.inc('percentage_of_corrections')
+        return local_percentage_of_corrections(extracted_text)
+    return corrections_from_response(extracted_text, json_response)
+
+async def percentage_of_corrections_async(extracted_text):
+    """percentage_of_corrections() for coroutines (ASGI app), with the same local fallback"""
+    try:
+        response = await http_client.request_async('bing_spellcheck', 'POST',
+                                                   **bing_spellcheck_request(extracted_text))
+        response.raise_for_status()
+        json_response = response.json()
+    except (CircuitOpenError, httpx.HTTPError) as e:
+        print(f"Bing Spell Check unavailable ({e}), using the local word list")
+        fallbacks.inc('percentage_of_corrections')
+        return local_percentage_of_corrections(extracted_text)
+    return corrections_from_response(extracted_text, json_response)
+
+# percentage of phonetic accuracy
+def percentage_of_phonetic_accuraccy(extracted_text):
+    soundex, metaphone, caverphone, nysiis = load_phonetic_encoders.get()
+    spell_corrected = spell_correct(extracted_text)
+
+    extracted_text_list = extracted_text.split(" ")
+    extracted_phonetics_soundex = [soundex.encode(
+        string) for string in extracted_text_list]
+    extracted_phonetics_metaphone = [metaphone.encode(
+        string) for string in extracted_text_list]
+    extracted_phonetics_caverphone = [caverphone.encode(
+        string) for string in extracted_text_list]
+    extracted_phonetics_nysiis = [nysiis.encode(
+        string) for string in extracted_text_list]
+
+    extracted_soundex_string = " ".join(extracted_phonetics_soundex)
+    extracted_metaphone_string = " ".join(extracted_phonetics_metaphone)
+    extracted_caverphone_string = " ".join(extracted_phonetics_caverphone)
+    extracted_nysiis_string = " ".join(extracted_phonetics_nysiis)
+
+    spell_corrected_list = str(spell_corrected).split(" ")
+    spell_corrected_phonetics_soundex = [
+        soundex.encode(string) for string in spell_corrected_list]
+    spell_corrected_phonetics_metaphone = [
+        metaphone.encode(string) for string in spell_corrected_list]
+    spell_corrected_phonetics_caverphone = [
+        caverphone.encode(string) for string in spell_corrected_list]
+    spell_corrected_phonetics_nysiis = [nysiis.encode(
+        string) for string in spell_corrected_list]
+
+    spell_corrected_soundex_string = " ".join(
+        spell_corrected_phonetics_soundex)
+    spell_corrected_metaphone_string = " ".join(
+        spell_corrected_phonetics_metaphone)
+    spell_corrected_caverphone_string = " ".join(
+        spell_corrected_phonetics_caverphone)
+    spell_corrected_nysiis_string = " ".join(spell_corrected_phonetics_nysiis)
+
+    soundex_score = (len(extracted_soundex_string)-(levenshtein(extracted_soundex_string,
+                     spell_corrected_soundex_string)))/(len(extracted_soundex_string)+1)
+    metaphone_score = (len(extracted_metaphone_string)-(levenshtein(extracted_metaphone_string,
+                       spell_corrected_metaphone_string)))/(len(extracted_metaphone_string)+1)
+    caverphone_score = (len(extracted_caverphone_string)-(levenshtein(extracted_caverphone_string,
+                        spell_corrected_caverphone_string)))/(len(extracted_caverphone_string)+1)
+    nysiis_score = (len(extracted_nysiis_string)-(levenshtein(extracted_nysiis_string,
+                    spell_corrected_nysiis_string)))/(len(extracted_nysiis_string)+1)
+    
+    return ((0.5*caverphone_score + 0.2*soundex_score + 0.2*metaphone_score + 0.1 * nysiis_score))*100
+
+def score(input):
+    if input[0] <= 96.40350723266602:
+        var0 = [0.0, 1.0]
+    else:
+        if input[1] <= 99.1046028137207:
+            var0 = [0.0, 1.0]
+        else:
+            if input[2] <= 2.408450722694397:
+                if input[2] <= 1.7936508059501648:
+                    var0 = [1.0, 0.0]
+                else:
+                    var0 = [0.0, 1.0]
+            else:
+                var0 = [1.0, 0.0]
+    return var0
+
+def score_batch(inputs):
+    """score() for many feature arrays at once, as an (n, 2) array of the same [p0, p1] rows
+
+    The same decision tree, evaluated with array comparisons over all rows
+    (only the first three features are used).
+    """
+    features = np.array([row[:3] for row in inputs], dtype=float).reshape(-1, 3)
+    first = ((features[:, 0] > 96.40350723266602) & (features[:, 1] > 99.1046028137207)
+             & ((features[:, 2] > 2.408450722694397) | (features[:, 2] <= 1.7936508059501648)))
+    return np.column_stack([first, ~first]).astype(float)
@@ -0,0 +1,64 @@
+"""gunicorn settings for the Flask API (see wsgi.py).
+
+    cd backend && gunicorn -c gunicorn.conf.py
+
+Analysis requests are CPU bound in TextBlob but spend most of their wall
+time waiting on Azure Read, so each worker (one per core by default) runs a
+few threads. Override with WEB_CONCURRENCY / GUNICORN_THREADS.
+
+Threads and admission control (admission.py) go together: each worker
+runs at most ADMISSION_MAX_CONCURRENT analyses and queues up to
+ADMISSION_QUEUE_SIZE more, and every one of those holds a thread. The pool
+therefore gets ADMISSION_MAX_CONCURRENT + ADMISSION_QUEUE_SIZE threads plus
+SPARE_THREADS, which stay free to answer 429s, /metrics and /api/ready
+when the analysis slots and the queue are full. An explicit
+GUNICORN_THREADS is kept, and the admission limits are lowered to fit it.
+
+Graceful restart: `kill -HUP <master>` replaces the workers without dropping
+requests in flight (they get graceful_timeout seconds to finish). With
+preload_app, HUP does not reload application code; deploy new code with
+USR2 (start a new master) followed by WINCH/TERM on the old one.
+"""
+import multiprocessing
+import os
+import sys
+
+chdir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, chdir)
+
+# Same module object as the preloaded app uses, so limits fitted here apply to it
+from admission import ADMISSION_CONFIG
+wsgi_app = 'wsgi:app'
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+preload_app = True
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+SPARE_THREADS = 2
+if 'GUNICORN_THREADS' in os.environ:
+    threads = int(os.environ['GUNICORN_THREADS'])
+    spare = min(SPARE_THREADS, threads - 1)
+    ADMISSION_CONFIG['max_concurrent'] = max(1, min(ADMISSION_CONFIG['max_concurrent'], threads - spare))
+    ADMISSION_CONFIG['queue_size'] = max(0, min(ADMISSION_CONFIG['queue_size'],
+                                                threads - spare - ADMISSION_CONFIG['max_concurrent']))
+else:
+    threads = ADMISSION_CONFIG['max_concurrent'] + ADMISSION_CONFIG['queue_size'] + SPARE_THREADS
+
+# An image analysis polls Azure Read for several seconds
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then to bound slow leaks; cheap because the master holds the preloaded engines
+# and the shared LanguageTool server
+max_requests = 1000
+max_requests_jitter = 100
+
+accesslog = '-'
+errorlog = '-'
+
+
+def on_exit(server):
+    # The shared LanguageTool server started by wsgi.py in this master
+    from features import stop_language_tool_server
+    stop_language_tool_server()
@@ -0,0 +1,281 @@
+"""Shared outbound HTTP client for the external services (Azure Read, Bing).
+
+One pooled requests.Session (keep-alive) with connect/read timeouts,
+bounded retries with full jitter on connection errors, timeouts, 429 and
+5xx, and a circuit breaker per service. When a service's error rate over
+the last BREAKER_WINDOW seconds reaches BREAKER_ERROR_RATE (with at least
+BREAKER_MIN_CALLS calls), its breaker opens and calls fail fast with
+CircuitOpenError for BREAKER_COOLDOWN seconds, so callers switch to their
+local fallback instead of tying up a worker. After the cooldown one trial
+call is let through (half-open) and closes the breaker again on success.
+
+Within an analysis request, timeouts and retries are also capped at what
+is left of the request's latency budget (budget.py); a call cut short by
+the budget raises BudgetExceeded and does not count against the breaker.
+
+request_async() is the same client for the ASGI app, on one shared
+httpx.AsyncClient, with the same breakers, retries and budget handling.
+
+Breaker states are exported on /metrics as dyslexicheck_circuit_state.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+import budget
+from budget import BudgetExceeded
+from metrics import Counter, external_call, external_calls, register_collector
+
+HTTP_CONFIG = {
+    'connect_timeout': float(os.environ.get('HTTP_CONNECT_TIMEOUT', 3.05)),
+    'read_timeout': float(os.environ.get('HTTP_READ_TIMEOUT', 15)),
+    'retries': int(os.environ.get('HTTP_RETRIES', 2)),
+    'backoff': float(os.environ.get('HTTP_BACKOFF', 0.25)),
+    'pool_size': int(os.environ.get('HTTP_POOL_SIZE', 32))
+}
+
+BREAKER_CONFIG = {
+    'error_rate': float(os.environ.get('BREAKER_ERROR_RATE', 0.5)),
+    'min_calls': int(os.environ.get('BREAKER_MIN_CALLS', 10)),
+    'window': float(os.environ.get('BREAKER_WINDOW', 30)),
+    'cooldown': float(os.environ.get('BREAKER_COOLDOWN', 30))
+}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+retries = Counter('dyslexicheck_external_retries_total', "Retried calls to external services", labels=('service',))
+
+session = requests.Session()
+adapter = HTTPAdapter(pool_connections=HTTP_CONFIG['pool_size'], pool_maxsize=HTTP_CONFIG['pool_size'],
+                      max_retries=0)
+session.mount('http://', adapter)
+session.mount('https://', adapter)
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, service):
+        super().__init__(f"{service} is unavailable (circuit open)")
+        self.service = service
+
+
+class RetryableStatus(Exception):
+    def __init__(self, response):
+        super().__init__(f"HTTP {response.status_code} from {response.url}")
+        self.response = response
+
+
+class CircuitBreaker:
+    STATES = {'closed': 0, 'half_open': 1, 'open': 2}
+
+    def __init__(self, service, config=BREAKER_CONFIG):
+        self.service = service
+        self.config = config
+        self.state = 'closed'
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.calls = deque()  # (timestamp, ok)
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.config['cooldown']:
+                self.state = 'half_open'
+                self.trial_in_flight = False
+            if self.state == 'half_open' and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record(self, ok):
+        now = time.monotonic()
+        with self.lock:
+            if self.state == 'half_open':
+                self.trial_in_flight = False
+                if ok:
+                    self.state = 'closed'
+                    self.calls.clear()
+                else:
+                    self.trip(now)
+                return
+            self.calls.append((now, ok))
+            while self.calls and self.calls[0][0] < now - self.config['window']:
+                self.calls.popleft()
+            failures = sum(1 for _, call_ok in self.calls if not call_ok)
+            if (self.state == 'closed' and len(self.calls) >= self.config['min_calls']
+                    and failures / len(self.calls) >= self.config['error_rate']):
+                self.trip(now)
+
+    def release(self):
+        """The allowed call ended without a verdict (e.g. out of budget): let another trial through"""
+        with self.lock:
+            self.trial_in_flight = False
+
+    def trip(self, now):
+        print(f"Circuit breaker for {self.service} opened")
+        self.state = 'open'
+        self.opened_at = now
+        self.calls.clear()
+
+
+breakers = {}
+breakers_lock = threading.Lock()
+
+
+def get_breaker(service):
+    with breakers_lock:
+        if service not in breakers:
+            breakers[service] = CircuitBreaker(service)
+        return breakers[service]
+
+
+def backoff_delay(attempt):
+    """Full jitter: uniform in [0, backoff * 2^attempt]"""
+    return random.uniform(0, HTTP_CONFIG['backoff'] * (2 ** attempt))
+
+
+def begin_call(service, call):
+    """The service's breaker, once the budget and the breaker allow a call"""
+    if budget.remaining() == 0:
+        raise BudgetExceeded(call or service)
+    breaker = get_breaker(service)
+    if not breaker.allow():
+        external_calls.inc(call or service, 'rejected')
+        raise CircuitOpenError(service)
+    return breaker
+
+
+def normalize_timeout(timeout):
+    timeout = timeout or (HTTP_CONFIG['connect_timeout'], HTTP_CONFIG['read_timeout'])
+    return timeout if isinstance(timeout, tuple) else (timeout, timeout)
+
+
+def attempt_timeout(breaker, timeout, service, call):
+    """(capped, (connect, read) timeout) for the next attempt, capped at the budget that is left"""
+    left = budget.remaining()
+    if left == 0:
+        breaker.release()
+        raise BudgetExceeded(call or service)
+    capped = left is not None and left < max(timeout)
+    return capped, tuple(min(t, left) for t in timeout) if capped else timeout
+
+
+def attempt_failed(breaker, error, capped, attempt, attempts, service, call):
+    """Account for a failed attempt: the backoff delay before the next one, or raise
+
+    Returns None when the last outcome was an HTTP error status to hand to
+    the caller (error.response).
+    """
+    if capped and budget.remaining() == 0:
+        # Our deadline, not the service's fault (a read cut short mid-body surfaces as a
+        # connection error, not a timeout)
+        breaker.release()
+        raise BudgetExceeded(call or service) from error
+
+    breaker.record(False)
+    delay = backoff_delay(attempt)
+    left = budget.remaining()
+    # No retries for a half-open trial, once this failure opened the breaker or past the budget
+    if attempt == attempts - 1 or breaker.state != 'closed' or (left is not None and delay >= left):
+        if isinstance(error, RetryableStatus):
+            return None
+        raise error
+    retries.inc(call or service)
+    return delay
+
+
+def request(service, method, url, timeout=None, call=None, **kwargs):
+    """session.request() through the service's circuit breaker, with timeouts and retries
+
+    Raises CircuitOpenError without calling out while the breaker is open,
+    and BudgetExceeded when the request's latency budget runs out.
+    Each attempt is counted/timed by metrics.external_call(call or service).
+    """
+    breaker = begin_call(service, call)
+    timeout = normalize_timeout(timeout)
+    attempts = HTTP_CONFIG['retries'] + 1
+    for attempt in range(attempts):
+        capped, attempt_timeouts = attempt_timeout(breaker, timeout, service, call)
+        try:
+            with external_call(call or service):
+                response = session.request(method, url, timeout=attempt_timeouts, **kwargs)
+                if response.status_code in RETRY_STATUSES:
+                    raise RetryableStatus(response)
+        except (requests.RequestException, RetryableStatus) as e:
+            delay = attempt_failed(breaker, e, capped, attempt, attempts, service, call)
+            if delay is None:
+                return e.response
+            time.sleep(delay)
+        except BaseException:
+            # Not an answer from the service (e.g. a bad argument): no verdict, but a half-open
+            # breaker must not be left waiting for this trial forever
+            breaker.release()
+            raise
+        else:
+            breaker.record(True)
+            return response
+
+
+async_client = None
+
+
+def get_async_client(max_connections=None):
+    """The shared httpx.AsyncClient (for one event loop, see asgi.py), created on first use"""
+    global async_client
+    if async_client is None:
+        connections = max_connections or HTTP_CONFIG['pool_size']
+        async_client = httpx.AsyncClient(limits=httpx.Limits(max_connections=connections,
+                                                             max_keepalive_connections=connections))
+    return async_client
+
+
+async def close_async_client():
+    global async_client
+    if async_client is not None:
+        await async_client.aclose()
+        async_client = None
+
+
+async def request_async(service, method, url, timeout=None, call=None, **kwargs):
+    """request() for coroutines, on the shared httpx.AsyncClient with the same breakers, retries and budget"""
+    breaker = begin_call(service, call)
+    timeout = normalize_timeout(timeout)
+    attempts = HTTP_CONFIG['retries'] + 1
+    for attempt in range(attempts):
+        capped, (connect, read) = attempt_timeout(breaker, timeout, service, call)
+        try:
+            with external_call(call or service):
+                response = await get_async_client().request(method, url, timeout=httpx.Timeout(read, connect=connect),
+                                                            **kwargs)
+                if response.status_code in RETRY_STATUSES:
+                    raise RetryableStatus(response)
+        except (httpx.HTTPError, RetryableStatus) as e:
+            delay = attempt_failed(breaker, e, capped, attempt, attempts, service, call)
+            if delay is None:
+                return e.response
+            await asyncio.sleep(delay)
+        except BaseException:
+            # e.g. cancelled by a stage timeout in asgi.degradable: no verdict on the service
+            breaker.release()
+            raise
+        else:
+            breaker.record(True)
+            return response
+
+
+@register_collector
+def collect_breaker_states():
+    with breakers_lock:
+        items = sorted(breakers.items())
+    return [
+        ('dyslexicheck_circuit_state', 'gauge', "Circuit breaker state per external service (0 closed, 1 half-open, 2 open)",
+         [({'service': service}, CircuitBreaker.STATES[breaker.state]) for service, breaker in items])
+    ]
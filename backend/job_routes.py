@@ -0,0 +1,87 @@
+import base64
+import hmac
+
+from flask import Blueprint, abort, request, jsonify
+
+from documents import DocumentError, iter_pages
+from jobs import JOB_CONFIG, QueueFull, get_queue
+
+# Create Blueprint for the analysis job queue (see jobs.py)
+jobs_bp = Blueprint('jobs', __name__, url_prefix='/api/jobs')
+
+@jobs_bp.route('', methods=['POST'])
+def submit_jobs():
+    """Queue one analysis job per uploaded file ('file' or 'files'); answers 202 with the job ids"""
+    files = [file for file in request.files.getlist('files') + request.files.getlist('file') if file.filename]
+    if not files:
+        return jsonify({'error': 'No files'}), 400
+
+    uploads = []
+    for file in files:
+        data = file.read()
+        file.close()
+        try:
+            # Reject unreadable uploads now rather than after a worker's retries
+            _, pages = iter_pages(data)
+        except DocumentError as e:
+            return jsonify({'error': f"{file.filename}: {e}"}), 400
+        # Release the open PDF now; the worker renders the pages from the stored upload
+        pages.close()
+        uploads.append((file.filename, data))
+
+    queue = get_queue()
+    jobs = []
+    try:
+        for filename, data in uploads:
+            jobs.append({'id': queue.enqueue(data, filename), 'filename': filename, 'status': 'queued'})
+    except QueueFull as e:
+        response = jsonify({'error': str(e), 'jobs': jobs})
+        response.status_code = 429
+        response.headers['Retry-After'] = '60'
+        return response
+    return jsonify({'jobs': jobs}), 202
+
+@jobs_bp.route('/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status of a job, with its result once done or its last error"""
+    job = get_queue().status(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+# Routes for workers on other hosts (worker.py --api); disabled unless JOB_WORKER_TOKEN is set
+
+def check_worker_token():
+    if not JOB_CONFIG['worker_token']:
+        abort(404)
+    if not hmac.compare_digest(request.headers.get('X-Worker-Token', ''), JOB_CONFIG['worker_token']):
+        abort(403)
+
+@jobs_bp.route('/lease', methods=['POST'])
+def lease_job():
+    check_worker_token()
+    job = get_queue().lease(request.get_json().get('worker', request.remote_addr))
+    if job is None:
+        return '', 204
+    job['payload'] = base64.b64encode(job['payload']).decode('ascii')
+    return jsonify(job)
+
+@jobs_bp.route('/<job_id>/heartbeat', methods=['POST'])
+def heartbeat_job(job_id):
+    check_worker_token()
+    ok = get_queue().heartbeat(job_id, request.get_json()['lease_id'])
+    return jsonify({'ok': ok}), 200 if ok else 409
+
+@jobs_bp.route('/<job_id>/complete', methods=['POST'])
+def complete_job(job_id):
+    check_worker_token()
+    data = request.get_json()
+    ok = get_queue().complete(job_id, data['lease_id'], data['result'])
+    return jsonify({'ok': ok}), 200 if ok else 409
+
+@jobs_bp.route('/<job_id>/fail', methods=['POST'])
+def fail_job(job_id):
+    check_worker_token()
+    data = request.get_json()
+    ok = get_queue().fail(job_id, data['lease_id'], data['error'])
+    return jsonify({'ok': ok}), 200 if ok else 409
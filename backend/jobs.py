@@ -0,0 +1,247 @@
+"""Durable analysis job queue in SQLite, consumed by worker.py processes.
+
+POST /api/jobs stores the upload as a queued job and answers 202 with its
+id; GET /api/jobs/<id> reports its status and, once done, the same result
+/api/analyze-image would have returned. Any number of `python worker.py`
+processes take jobs off the queue:
+
+- lease() hands a job to one worker for JOB_VISIBILITY_TIMEOUT seconds
+  (workers heartbeat to extend it while they work). A job whose worker dies
+  becomes visible again when its lease runs out, so every job is delivered
+  at least once and may, rarely, be analysed twice.
+- fail() puts a job back with an exponential delay (JOB_RETRY_DELAY,
+  doubling per attempt); after JOB_MAX_ATTEMPTS deliveries it is moved to
+  the 'dead' status (the dead-letter queue) with its last error instead.
+  `python worker.py --requeue-dead` queues dead jobs again.
+- complete() and fail() only apply with the lease id the worker was given,
+  so a worker that lost its lease cannot overwrite the new holder's outcome.
+
+The database (JOB_DB_PATH) runs in WAL mode, so workers on the same host
+share the file directly. Workers on other hosts must not open it over a
+network file system; they use the API instead (worker.py --api), which
+serves lease/heartbeat/complete/fail to holders of JOB_WORKER_TOKEN.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from metrics import Counter, register_collector
+
+JOB_CONFIG = {
+    'db_path': os.environ.get('JOB_DB_PATH',
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), 'jobs.sqlite3')),
+    'visibility_timeout': float(os.environ.get('JOB_VISIBILITY_TIMEOUT', 120)),
+    'max_attempts': int(os.environ.get('JOB_MAX_ATTEMPTS', 3)),
+    'retry_delay': float(os.environ.get('JOB_RETRY_DELAY', 5)),
+    'max_queued': int(os.environ.get('JOB_MAX_QUEUED', 10000)),
+    'worker_token': os.environ.get('JOB_WORKER_TOKEN', '')
+}
+
+STATUSES = ('queued', 'running', 'done', 'dead')
+
+job_outcomes = Counter('dyslexicheck_jobs_total', "Analysis job deliveries by outcome", labels=('outcome',))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    filename TEXT,
+    payload BLOB NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    lease_id TEXT,
+    lease_until REAL,
+    worker TEXT,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, available_at);
+CREATE INDEX IF NOT EXISTS jobs_leases ON jobs (status, lease_until);
+"""
+
+
+class QueueFull(Exception):
+    def __init__(self, queued):
+        super().__init__(f"Job queue is full ({queued} jobs waiting)")
+
+
+class JobQueue:
+    """The jobs table; one instance per process, safe to share between threads"""
+
+    def __init__(self, path=None, config=JOB_CONFIG):
+        self.path = path or config['db_path']
+        self.config = config
+        self._local = threading.local()
+        self.connect().executescript(SCHEMA)
+
+    def connect(self):
+        """This thread's connection, in autocommit mode (sqlite3 connections cannot be shared between threads)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=FULL')
+            self._local.conn = conn
+        return conn
+
+    def transaction(self):
+        return _Transaction(self.connect())
+
+    def enqueue(self, payload, filename=None, kind='analyze-image'):
+        """Queue a job for the image/document bytes and return its id (raises QueueFull)"""
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self.transaction() as conn:
+            queued = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            if queued >= self.config['max_queued']:
+                raise QueueFull(queued)
+            conn.execute(
+                "INSERT INTO jobs (id, kind, filename, payload, max_attempts, available_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, filename, payload, self.config['max_attempts'], now, now, now))
+        job_outcomes.inc('enqueued')
+        return job_id
+
+    def lease(self, worker):
+        """Take the oldest visible job for `worker`, or None
+
+        Returns a dict with the job's id, kind, filename, payload, attempt
+        number and the lease_id to pass to heartbeat/complete/fail.
+        """
+        now = time.time()
+        with self.transaction() as conn:
+            # Leases that ran out on their last attempt go to the dead-letter queue
+            expired = conn.execute(
+                "UPDATE jobs SET status = 'dead', error = 'Lease expired on the last attempt', lease_id = NULL, "
+                "updated_at = ? WHERE status = 'running' AND lease_until < ? AND attempts >= max_attempts",
+                (now, now)).rowcount
+            row = conn.execute(
+                "SELECT id, kind, filename, payload, attempts FROM jobs "
+                "WHERE (status = 'queued' AND available_at <= ?) OR (status = 'running' AND lease_until < ?) "
+                "ORDER BY available_at LIMIT 1", (now, now)).fetchone()
+            if row is not None:
+                lease_id = uuid.uuid4().hex
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_id = ?, lease_until = ?, "
+                    "worker = ?, updated_at = ? WHERE id = ?",
+                    (lease_id, now + self.config['visibility_timeout'], worker, now, row['id']))
+        if expired:
+            job_outcomes.inc('dead', amount=expired)
+        if row is None:
+            return None
+        job_outcomes.inc('leased')
+        return {'id': row['id'], 'kind': row['kind'], 'filename': row['filename'], 'payload': row['payload'],
+                'attempt': row['attempts'] + 1, 'lease_id': lease_id}
+
+    def heartbeat(self, job_id, lease_id):
+        """Extend a lease by the visibility timeout; False if the lease was lost"""
+        now = time.time()
+        with self.transaction() as conn:
+            return conn.execute(
+                "UPDATE jobs SET lease_until = ?, updated_at = ? WHERE id = ? AND lease_id = ? AND status = 'running'",
+                (now + self.config['visibility_timeout'], now, job_id, lease_id)).rowcount == 1
+
+    def complete(self, job_id, lease_id, result):
+        """Store the result of a leased job; False if the lease was lost"""
+        now = time.time()
+        with self.transaction() as conn:
+            done = conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, error = NULL, lease_id = NULL, payload = X'', "
+                "updated_at = ? WHERE id = ? AND lease_id = ? AND status = 'running'",
+                (json.dumps(result), now, job_id, lease_id)).rowcount == 1
+        job_outcomes.inc('done' if done else 'lost_lease')
+        return done
+
+    def fail(self, job_id, lease_id, error):
+        """Retry a leased job later, or dead-letter it after its last attempt; False if the lease was lost"""
+        now = time.time()
+        with self.transaction() as conn:
+            row = conn.execute("SELECT attempts, max_attempts FROM jobs WHERE id = ? AND lease_id = ? "
+                               "AND status = 'running'", (job_id, lease_id)).fetchone()
+            if row is None:
+                job_outcomes.inc('lost_lease')
+                return False
+            if row['attempts'] >= row['max_attempts']:
+                outcome, available_at = 'dead', now
+            else:
+                outcome = 'retried'
+                available_at = now + self.config['retry_delay'] * 2 ** (row['attempts'] - 1)
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, available_at = ?, lease_id = NULL, updated_at = ? "
+                "WHERE id = ?",
+                ('dead' if outcome == 'dead' else 'queued', str(error), available_at, now, job_id))
+        job_outcomes.inc(outcome)
+        return True
+
+    def requeue_dead(self):
+        """Give every dead-lettered job a fresh set of attempts; returns how many"""
+        now = time.time()
+        with self.transaction() as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = 0, available_at = ?, updated_at = ? "
+                "WHERE status = 'dead'", (now, now)).rowcount
+
+    def status(self, job_id):
+        """Public view of a job (no payload), or None if it does not exist"""
+        row = self.connect().execute("SELECT id, filename, status, attempts, max_attempts, result, error, created_at, "
+                                     "updated_at FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def counts(self):
+        """{status: number of jobs}"""
+        rows = self.connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = dict.fromkeys(STATUSES, 0)
+        counts.update({status: count for status, count in rows})
+        return counts
+
+
+class _Transaction:
+    """`with` block running as one write transaction (BEGIN IMMEDIATE), so leases cannot race"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute('COMMIT' if exc_type is None else 'ROLLBACK')
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue():
+    """The process-wide JobQueue, opened on first use"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
+
+
+@register_collector
+def collect_jobs():
+    if _queue is None:
+        return []
+    try:
+        counts = _queue.counts()
+    except sqlite3.Error as e:
+        print(f"Could not count jobs: {e}")
+        return []
+    return [('dyslexicheck_jobs', 'gauge', "Analysis jobs in the queue database by status",
+             [({'status': status}, count) for status, count in counts.items()])]
@@ -0,0 +1,203 @@
+"""In-process metrics exposed in Prometheus text format on /metrics.
+
+Histograms and counters are plain Python objects guarded by a lock, so
+recording a sample costs a couple of dictionary lookups and a bisect.
+"""
+import contextvars
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Upper bounds (seconds) shared by all latency histograms: fast local work up to slow OCR polling
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+registry = []
+collectors = []
+
+# Per-request list of (stage, seconds), see start_stage_trace()
+stage_trace = contextvars.ContextVar('stage_trace', default=None)
+
+
+def format_labels(names, values):
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{escaped}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+        registry.append(self)
+
+    def inc(self, *label_values, amount=1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def get(self, *label_values):
+        return self.values.get(label_values, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            items = sorted(self.values.items())
+        for label_values, value in items:
+            lines.append(f"{self.name}{format_labels(self.labels, label_values)} {format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self.lock = threading.Lock()
+        registry.append(self)
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(label_values)
+            if series is None:
+                # per-bucket (non-cumulative) counts + overflow, sum, count
+                series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            items = sorted((k, [list(v[0]), v[1], v[2]]) for k, v in self.series.items())
+        for label_values, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                labels = format_labels(self.labels + ('le',), label_values + (format_value(float(bound)),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+def register_collector(collect):
+    """Register a callable returning (name, type, documentation, [(labels_dict, value)]) tuples, read at scrape time"""
+    collectors.append(collect)
+    return collect
+
+
+def render():
+    """Current metrics in Prometheus text exposition format"""
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    for collect in collectors:
+        try:
+            families = collect()
+        except Exception as e:
+            print(f"Metrics collector {collect.__name__} failed: {e}")
+            continue
+        for name, kind, documentation, samples in families:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{format_labels(tuple(labels), tuple(labels.values()))} {format_value(value)}")
+    return '\n'.join(lines) + '\n'
+
+
+request_seconds = Histogram('dyslexicheck_request_seconds', "HTTP request latency by route",
+                            labels=('method', 'route', 'status'))
+stage_seconds = Histogram('dyslexicheck_stage_seconds', "Latency of analysis pipeline stages",
+                          labels=('stage',))
+db_seconds = Histogram('dyslexicheck_db_seconds', "Latency of database functions", labels=('function',))
+external_calls = Counter('dyslexicheck_external_calls_total', "Calls to external services",
+                         labels=('service', 'outcome'))
+fallbacks = Counter('dyslexicheck_fallback_total', "Feature values computed with a fallback instead of the real engine",
+                    labels=('feature',))
+stage_timeouts = Counter('dyslexicheck_stage_timeout_total', "Pipeline stages abandoned after their timeout",
+                         labels=('stage',))
+stage_degraded = Counter('dyslexicheck_stage_degraded_total', "Stages answered with their degraded value",
+                         labels=('stage', 'reason'))
+
+
+def start_stage_trace():
+    """Also collect the stage timings of the current request (context) in a list"""
+    trace = []
+    stage_trace.set(trace)
+    return trace
+
+
+def finish_stage_trace():
+    """Stop collecting and return {stage: total seconds} for the current request"""
+    trace = stage_trace.get()
+    stage_trace.set(None)
+    totals = {}
+    for stage, seconds in trace or ():
+        totals[stage] = totals.get(stage, 0.0) + seconds
+    return totals
+
+
+def observe_stage(stage, seconds):
+    stage_seconds.observe(seconds, stage)
+    trace = stage_trace.get()
+    if trace is not None:
+        trace.append((stage, seconds))
+
+
+@contextmanager
+def stage_timer(stage):
+    """Record the duration of a pipeline stage (also when it raises)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+@contextmanager
+def external_call(service):
+    """Count an outbound call as ok/error and time it as stage `service`"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        external_calls.inc(service, 'error')
+        raise
+    else:
+        external_calls.inc(service, 'ok')
+    finally:
+        observe_stage(service, time.perf_counter() - start)
+
+
+def timed_db(func):
+    """Decorator recording the latency of a database function"""
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            db_seconds.observe(time.perf_counter() - start, name)
+    return wrapper
@@ -0,0 +1,347 @@
+"""Azure Read (v3.2 REST) client on top of http_client.
+
+Submits the image, polls the operation until it is done and joins the
+recognised lines, like the SDK loop it replaces, but through the shared
+pooled session with timeouts, retries and the `azure_read` circuit
+breaker. When Azure is unavailable (breaker open or the call failed after
+retries) and Tesseract is installed (see SETUP_TESSERACT.md), the text is
+read locally instead and counted as an `ocr` fallback.
+
+Hedging (OCR_HEDGE=1): if a read has not finished after the
+OCR_HEDGE_PERCENTILE of recent read latencies, a second read of the same
+image is started on a small pool (OCR_HEDGE_WORKERS threads; the first
+read runs in the caller's thread) and whichever finishes first wins; the
+other one stops polling. Hedges are paid for from a budget of OCR_HEDGE_BUDGET extra reads
+per read (token bucket), so a slow Azure cannot double its own load.
+Outcomes are counted in dyslexicheck_ocr_hedge_total.
+
+read_text_async() is the same client (hedging and Tesseract fallback
+included) for the ASGI app.
+"""
+import asyncio
+import contextvars
+import io
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import requests
+
+import budget
+from engines import engine
+from http_client import CircuitOpenError, request, request_async
+from metrics import Counter, fallbacks
+
+OCR_CONFIG = {
+    'endpoint': os.environ.get('AZURE_COMPUTERVISION_ENDPOINT', 'https://prana-------------v.cognitiveservices.azure.com/'),
+    'key': os.environ.get('AZURE_COMPUTERVISION_KEY', '1780f5636509411da43040b70b5d2e22'),
+    'poll_interval': float(os.environ.get('OCR_POLL_INTERVAL', 5)),
+    'max_wait': float(os.environ.get('OCR_MAX_WAIT', 120)),
+    'hedge': os.environ.get('OCR_HEDGE', '').lower() in ('1', 'true', 'yes'),
+    'hedge_percentile': float(os.environ.get('OCR_HEDGE_PERCENTILE', 95)),
+    'hedge_delay': float(os.environ.get('OCR_HEDGE_DELAY', 10)),  # until there are enough samples
+    'hedge_min_delay': float(os.environ.get('OCR_HEDGE_MIN_DELAY', 0.5)),
+    'hedge_min_samples': int(os.environ.get('OCR_HEDGE_MIN_SAMPLES', 20)),
+    'hedge_budget': float(os.environ.get('OCR_HEDGE_BUDGET', 0.1)),
+    'hedge_burst': float(os.environ.get('OCR_HEDGE_BURST', 3))
+}
+
+ocr_hedges = Counter('dyslexicheck_ocr_hedge_total', "Hedged Azure Read requests by outcome",
+                     labels=('outcome',))
+
+
+class OcrError(Exception):
+    pass
+
+
+class OcrCancelled(Exception):
+    """The read lost a hedge race and stopped polling"""
+
+
+def analyze_url():
+    return OCR_CONFIG['endpoint'].rstrip('/') + '/vision/v3.2/read/analyze'
+
+
+def auth_headers():
+    return {'Ocp-Apim-Subscription-Key': OCR_CONFIG['key']}
+
+
+def lines_from_result(read_result):
+    """Text of a finished Read operation (empty unless it succeeded)"""
+    text = []
+    if read_result['status'] == 'succeeded':
+        for text_result in read_result['analyzeResult']['readResults']:
+            for line in text_result['lines']:
+                text.append(line['text'])
+    return " ".join(text)
+
+
+def azure_read_result(data, cancelled=None):
+    """Finished Azure Read operation (analyzeResult with lines and bounding boxes) for the image bytes"""
+    headers = dict(auth_headers(), **{'Content-Type': 'application/octet-stream'})
+    response = request('azure_read', 'POST', analyze_url(), call='azure_read_submit', data=data, headers=headers)
+    if response.status_code != 202:
+        raise OcrError(f"Azure Read submit failed with HTTP {response.status_code}: {response.text[:200]}")
+    operation_location = response.headers['Operation-Location']
+
+    deadline = time.monotonic() + OCR_CONFIG['max_wait']
+    while True:
+        if cancelled is not None and cancelled.is_set():
+            raise OcrCancelled()
+        response = request('azure_read', 'GET', operation_location, call='azure_read_poll', headers=auth_headers())
+        if response.status_code != 200:
+            raise OcrError(f"Azure Read poll failed with HTTP {response.status_code}")
+        read_result = response.json()
+        if read_result['status'].lower() not in ['notstarted', 'running']:
+            return read_result
+        if time.monotonic() >= deadline:
+            raise OcrError(f"Azure Read did not finish within {OCR_CONFIG['max_wait']:g}s")
+        left = budget.remaining()
+        if left is not None and left < OCR_CONFIG['poll_interval']:
+            raise budget.BudgetExceeded('Azure Read')
+        if cancelled is not None:
+            cancelled.wait(OCR_CONFIG['poll_interval'])
+        else:
+            time.sleep(OCR_CONFIG['poll_interval'])
+
+
+def azure_read(data, cancelled=None):
+    return lines_from_result(azure_read_result(data, cancelled))
+
+
+class LatencyTracker:
+    """Sliding window of recent read latencies"""
+
+    def __init__(self, size=200):
+        self.samples = deque(maxlen=size)
+        self.lock = threading.Lock()
+
+    def add(self, seconds):
+        with self.lock:
+            self.samples.append(seconds)
+
+    def percentile(self, pct):
+        with self.lock:
+            ordered = sorted(self.samples)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def __len__(self):
+        return len(self.samples)
+
+
+class HedgeBudget:
+    """Token bucket: every read earns `ratio` tokens (up to `burst`), a hedge spends one"""
+
+    def __init__(self, ratio, burst):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = burst
+        self.lock = threading.Lock()
+
+    def earn(self):
+        with self.lock:
+            self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def try_spend(self):
+        with self.lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+read_latency = LatencyTracker()
+hedge_budget = HedgeBudget(OCR_CONFIG['hedge_budget'], OCR_CONFIG['hedge_burst'])
+hedge_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('OCR_HEDGE_WORKERS', 32)),
+                                    thread_name_prefix='ocr')
+
+
+def hedge_delay():
+    if len(read_latency) < OCR_CONFIG['hedge_min_samples']:
+        return OCR_CONFIG['hedge_delay']
+    return max(OCR_CONFIG['hedge_min_delay'], read_latency.percentile(OCR_CONFIG['hedge_percentile']))
+
+
+def timed_read(data, cancelled):
+    start = time.monotonic()
+    text = azure_read(data, cancelled)
+    read_latency.add(time.monotonic() - start)
+    return text
+
+
+def hedged_azure_read(data):
+    """azure_read(), plus a second read of the same image if the first one is slow
+
+    The first read runs in the calling thread and a timer starts the hedge on
+    hedge_executor, so the hedge delay counts from when the read starts and
+    time spent waiting for a pool thread is never taken for Azure latency.
+    A read that loses stops at its next poll; the caller may wait for the
+    Azure call the primary read is in when the hedge wins.
+    """
+    hedge_budget.earn()
+    cancelled = threading.Event()  # one read has finished: the other one stops polling
+    context = contextvars.copy_context()
+    hedges = []
+    lock = threading.Lock()
+
+    def start_hedge():
+        with lock:
+            if cancelled.is_set():
+                return
+            if not hedge_budget.try_spend():
+                ocr_hedges.inc('budget_exhausted')
+                return
+            hedges.append(hedge_executor.submit(context.run, run_hedge))
+
+    def run_hedge():
+        text = timed_read(data, cancelled)
+        cancelled.set()
+        return text
+
+    timer = threading.Timer(hedge_delay(), start_hedge)
+    timer.daemon = True
+    timer.start()
+    error = None
+    try:
+        text = timed_read(data, cancelled)
+    except OcrCancelled:
+        # The hedge finished first
+        ocr_hedges.inc('hedge_won')
+        return hedges[0].result()
+    except Exception as e:
+        error = e
+    finally:
+        timer.cancel()
+        with lock:
+            hedge = hedges[0] if hedges else None
+            if hedge is None or error is None:
+                # No hedge starts from now on, and a running one stops at its next poll
+                cancelled.set()
+
+    if hedge is None:
+        if error is not None:
+            raise error
+        return text
+    if error is None:
+        ocr_hedges.inc('primary_won')
+        return text
+    # The primary read failed: the hedge is the last chance
+    try:
+        text = hedge.result()
+    except Exception:
+        ocr_hedges.inc('both_failed')
+        raise
+    ocr_hedges.inc('hedge_won')
+    return text
+
+
+@engine('tesseract')
+def load_tesseract():
+    import pytesseract
+    pytesseract.get_tesseract_version()  # raises if the binary is missing
+    return pytesseract
+
+
+def tesseract_read(data):
+    from PIL import Image
+    pytesseract = load_tesseract.get()
+    with Image.open(io.BytesIO(data)) as image:
+        return " ".join(pytesseract.image_to_string(image).split())
+
+
+def read_text(data):
+    """Text in the image bytes, from Azure Read or the local Tesseract fallback"""
+    try:
+        if OCR_CONFIG['hedge']:
+            return hedged_azure_read(data)
+        return azure_read(data)
+    except (CircuitOpenError, requests.RequestException) as e:
+        if load_tesseract.get() is None:
+            raise
+        print(f"Azure Read unavailable ({e}), falling back to Tesseract")
+        fallbacks.inc('ocr')
+        return tesseract_read(data)
+
+
+async def azure_read_result_async(data):
+    """azure_read_result() for coroutines (ASGI app), through http_client.request_async"""
+    headers = dict(auth_headers(), **{'Content-Type': 'application/octet-stream'})
+    response = await request_async('azure_read', 'POST', analyze_url(), call='azure_read_submit', content=data,
+                                   headers=headers)
+    if response.status_code != 202:
+        raise OcrError(f"Azure Read submit failed with HTTP {response.status_code}: {response.text[:200]}")
+    operation_location = response.headers['Operation-Location']
+
+    deadline = time.monotonic() + OCR_CONFIG['max_wait']
+    while True:
+        response = await request_async('azure_read', 'GET', operation_location, call='azure_read_poll',
+                                       headers=auth_headers())
+        if response.status_code != 200:
+            raise OcrError(f"Azure Read poll failed with HTTP {response.status_code}")
+        read_result = response.json()
+        if read_result['status'].lower() not in ['notstarted', 'running']:
+            return read_result
+        if time.monotonic() >= deadline:
+            raise OcrError(f"Azure Read did not finish within {OCR_CONFIG['max_wait']:g}s")
+        left = budget.remaining()
+        if left is not None and left < OCR_CONFIG['poll_interval']:
+            raise budget.BudgetExceeded('Azure Read')
+        await asyncio.sleep(OCR_CONFIG['poll_interval'])
+
+
+async def timed_read_async(data):
+    start = time.monotonic()
+    text = lines_from_result(await azure_read_result_async(data))
+    read_latency.add(time.monotonic() - start)
+    return text
+
+
+async def hedged_azure_read_async(data):
+    """hedged_azure_read() for coroutines: the loser is cancelled instead of told to stop polling"""
+    hedge_budget.earn()
+    primary = asyncio.ensure_future(timed_read_async(data))
+    names = {primary: 'primary'}
+    try:
+        done, _ = await asyncio.wait([primary], timeout=hedge_delay())
+        if done:
+            return primary.result()
+
+        if not hedge_budget.try_spend():
+            ocr_hedges.inc('budget_exhausted')
+            return await primary
+
+        names[asyncio.ensure_future(timed_read_async(data))] = 'hedge'
+        pending = set(names)
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    ocr_hedges.inc('hedge_won' if names[task] == 'hedge' else 'primary_won')
+                    return task.result()
+                error = task.exception()
+        ocr_hedges.inc('both_failed')
+        raise error
+    finally:
+        # Also when the request itself is cancelled (e.g. asgi.degradable timeouts)
+        for task in names:
+            task.cancel()
+
+
+async def read_text_async(data):
+    """read_text() for coroutines: Azure Read (hedged if enabled), else Tesseract on a worker thread"""
+    try:
+        if OCR_CONFIG['hedge']:
+            return await hedged_azure_read_async(data)
+        return lines_from_result(await azure_read_result_async(data))
+    except (CircuitOpenError, httpx.HTTPError) as e:
+        if load_tesseract.get() is None:
+            raise
+        print(f"Azure Read unavailable ({e}), falling back to Tesseract")
+        fallbacks.inc('ocr')
+        return await asyncio.to_thread(tesseract_read, data)
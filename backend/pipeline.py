@@ -0,0 +1,83 @@
+"""Concurrent execution of independent analysis stages.
+
+The feature stages only depend on the OCR text, not on each other, so
+get_feature_array runs them side by side on one shared, bounded thread
+pool: the Bing and LanguageTool round trips overlap with each other and
+with the TextBlob/abydos work. Each stage gets PIPELINE_STAGE_TIMEOUT
+seconds, or what is left of the request's latency budget (budget.py) if
+that is less. A stage that overruns fails the request with StageTimeout
+(its thread is not interrupted, it finishes in the background) unless it
+has a degraded value, which is then used instead and reported.
+"""
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import budget
+import metrics
+from profiler import in_request_profile
+
+PIPELINE_CONFIG = {
+    'workers': int(os.environ.get('PIPELINE_WORKERS', 8)),
+    'stage_timeout': float(os.environ.get('PIPELINE_STAGE_TIMEOUT', 30))
+}
+
+executor = ThreadPoolExecutor(max_workers=PIPELINE_CONFIG['workers'], thread_name_prefix='stage')
+
+
+class StageTimeout(Exception):
+    def __init__(self, stage, timeout):
+        super().__init__(f"Stage {stage} did not finish within {timeout:g}s")
+        self.stage = stage
+
+
+def timed_stage(stage, func, args):
+    with metrics.stage_timer(stage):
+        return func(*args)
+
+
+def run_stages(stages, timeout=None, degraded_values=None):
+    """Run {stage: (func, args)} concurrently and return ({stage: result}, [degraded stages])
+
+    Exceptions from a stage are re-raised in the caller, and a stage that
+    times out raises StageTimeout, unless the stage is in degraded_values:
+    then its value from there is used and the stage is listed as degraded.
+    Every stage is timed under its own name as with metrics.stage_timer.
+    """
+    timeout = PIPELINE_CONFIG['stage_timeout'] if timeout is None else timeout
+    left = budget.remaining()
+    if left is not None:
+        timeout = min(timeout, left)
+    degraded_values = degraded_values or {}
+    start = time.monotonic()
+    # Each stage runs in its own copy of the request context, so per-request stage traces are kept
+    # (and in the request's profile, if it is being profiled)
+    futures = {stage: executor.submit(contextvars.copy_context().run, in_request_profile, timed_stage, stage, func,
+                                      args)
+               for stage, (func, args) in stages.items()}
+    results = {}
+    degraded = []
+    try:
+        for stage, future in futures.items():
+            remaining = max(0.0, start + timeout - time.monotonic())
+            try:
+                results[stage] = future.result(timeout=remaining)
+            except TimeoutError:
+                metrics.stage_timeouts.inc(stage)
+                if stage not in degraded_values:
+                    raise StageTimeout(stage, timeout)
+                metrics.stage_degraded.inc(stage, 'timeout')
+                results[stage] = degraded_values[stage]
+                degraded.append(stage)
+            except Exception as e:
+                if stage not in degraded_values:
+                    raise
+                print(f"Error in {stage}, using its degraded value: {e}")
+                metrics.stage_degraded.inc(stage, 'error')
+                results[stage] = degraded_values[stage]
+                degraded.append(stage)
+    finally:
+        for future in futures.values():
+            future.cancel()
+    return results, degraded
@@ -0,0 +1,74 @@
+"""Image preprocessing before OCR: smaller payloads for Azure Read.
+
+Phone photos of worksheets are several MB of colour JPEG. Before they are
+sent to Azure Read they are rotated upright from the EXIF orientation,
+converted to grayscale, downscaled to PREPROCESS_TARGET_DPI (from the
+image's own DPI when it has one, otherwise by capping the long side at
+PREPROCESS_TARGET_DPI x PREPROCESS_PAGE_INCHES, an A4 page) and
+re-encoded as JPEG at PREPROCESS_QUALITY. Images are never upscaled, and
+the original bytes are sent when the result would not be smaller or the
+image cannot be decoded.
+
+Decoding and resizing run on a bounded pool of PREPROCESS_WORKERS threads
+(Pillow releases the GIL for most of it), so a burst of large uploads
+cannot take every CPU. Bytes before/after are counted in
+dyslexicheck_ocr_payload_bytes_total.
+"""
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+from metrics import Counter
+
+PREPROCESS_CONFIG = {
+    'enabled': os.environ.get('PREPROCESS_IMAGES', '1').lower() in ('1', 'true', 'yes'),
+    'target_dpi': float(os.environ.get('PREPROCESS_TARGET_DPI', 200)),
+    'page_inches': float(os.environ.get('PREPROCESS_PAGE_INCHES', 11.7)),
+    'quality': int(os.environ.get('PREPROCESS_QUALITY', 85)),
+    'workers': int(os.environ.get('PREPROCESS_WORKERS', 2))
+}
+
+payload_bytes = Counter('dyslexicheck_ocr_payload_bytes_total', "Image bytes before and after preprocessing",
+                        labels=('stage',))
+
+executor = ThreadPoolExecutor(max_workers=PREPROCESS_CONFIG['workers'], thread_name_prefix='preprocess')
+
+
+def scale_factor(image):
+    """Downscale factor (<= 1) that brings the image to the target DPI"""
+    factors = [1.0, PREPROCESS_CONFIG['target_dpi'] * PREPROCESS_CONFIG['page_inches'] / max(image.size)]
+    dpi = image.info.get('dpi')
+    if dpi and dpi[0] and float(dpi[0]) > PREPROCESS_CONFIG['target_dpi']:
+        factors.append(PREPROCESS_CONFIG['target_dpi'] / float(dpi[0]))
+    return min(factors)
+
+
+def shrink_image(data):
+    """Upright, grayscale, downscaled JPEG version of the image bytes (or the bytes unchanged)"""
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image = ImageOps.exif_transpose(image)
+            factor = scale_factor(image)
+            image = image.convert('L')
+            if factor < 1:
+                size = (max(1, round(image.width * factor)), max(1, round(image.height * factor)))
+                image = image.resize(size, Image.LANCZOS)
+            output = io.BytesIO()
+            image.save(output, format='JPEG', quality=PREPROCESS_CONFIG['quality'], optimize=True)
+    except Exception as e:
+        print(f"Error in image preprocessing: {e}")
+        return data
+    shrunk = output.getvalue()
+    return shrunk if len(shrunk) < len(data) else data
+
+
+def preprocess_image(data):
+    """shrink_image() on the preprocessing pool; returns the bytes to send to OCR"""
+    if not PREPROCESS_CONFIG['enabled']:
+        return data
+    result = executor.submit(shrink_image, data).result()
+    payload_bytes.inc('original', amount=len(data))
+    payload_bytes.inc('sent', amount=len(result))
+    return result
@@ -0,0 +1,219 @@
+"""On-demand profiling of single requests.
+
+When PROFILING_ENABLED=1, a request to a profiled route that carries an
+`X-Profile` header or a `profile` query parameter runs under a profiler:
+
+  - `sampling` (default): a background thread samples the request thread's
+    stack every PROFILE_INTERVAL seconds and writes collapsed stacks
+    (`frame;frame;frame count`), ready for flamegraph.pl or speedscope
+  - `cprofile`: deterministic cProfile, written as a pstats file
+
+Work the request hands to the stage and page thread pools is included:
+those pools run their tasks through in_request_profile(), which adds the
+pool thread to the sampled threads (or runs the task under its own cProfile,
+merged into the request's profile) while it works for the profiled request.
+
+tracemalloc peak memory is recorded in both modes. The response carries
+X-Profile-Id / X-Profile-Wall-Ms / X-Profile-Peak-Memory headers and the
+file can be fetched from /api/debug/profiles/<id>. If PROFILING_TOKEN is
+set the request must also send it in `X-Profile-Token`.
+
+Only one request is profiled at a time (tracemalloc is process-wide);
+requests arriving meanwhile run normally with `X-Profile-Status: busy`.
+"""
+import cProfile
+import functools
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+
+from flask import current_app, request
+
+PROFILER_CONFIG = {
+    'enabled': os.environ.get('PROFILING_ENABLED', '').lower() in ('1', 'true', 'yes'),
+    'token': os.environ.get('PROFILING_TOKEN'),
+    'output_dir': os.environ.get('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'dyslexicheck-profiles')),
+    'interval': float(os.environ.get('PROFILE_INTERVAL', 0.005))
+}
+
+PROFILE_MODES = ('sampling', 'cprofile')
+
+profile_lock = threading.Lock()
+
+
+class ProfileSession:
+    """The profile being taken of the current request, as seen from the threads working for it"""
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.thread_ids = set()  # pool threads to sample besides the request thread
+        self.profiles = []  # finished cProfile runs of pool tasks
+        self.lock = threading.Lock()
+
+
+current_profile = ContextVar('current_profile', default=None)
+
+
+def in_request_profile(func, *args):
+    """func(*args) on a pool thread, included in the profile of the request that submitted it (if any)"""
+    session = current_profile.get()
+    if session is None:
+        return func(*args)
+    if session.mode == 'cprofile':
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # another profiler is active in this thread
+            return func(*args)
+        try:
+            return func(*args)
+        finally:
+            profiler.disable()
+            with session.lock:
+                session.profiles.append(profiler)
+
+    thread_id = threading.get_ident()
+    with session.lock:
+        session.thread_ids.add(thread_id)
+    try:
+        return func(*args)
+    finally:
+        with session.lock:
+            session.thread_ids.discard(thread_id)
+
+
+class StackSampler(threading.Thread):
+    """Samples the stacks of a thread (and the session's pool threads) at a fixed interval and counts identical stacks"""
+
+    def __init__(self, thread_id, interval, session=None):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.session = session
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            thread_ids = {self.thread_id}
+            if self.session is not None:
+                with self.session.lock:
+                    thread_ids |= self.session.thread_ids
+            frames = sys._current_frames()
+            for thread_id in thread_ids:
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if stack:
+                    self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+    def collapsed(self):
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def requested_mode():
+    """Profiling mode asked for by the current request, or None"""
+    if not PROFILER_CONFIG['enabled']:
+        return None
+    mode = request.headers.get('X-Profile') or request.args.get('profile')
+    if not mode:
+        return None
+    token = PROFILER_CONFIG['token']
+    if token and request.headers.get('X-Profile-Token') != token:
+        return None
+    mode = mode.lower()
+    return mode if mode in PROFILE_MODES else 'sampling'
+
+
+def profile_path(profile_id):
+    return os.path.join(PROFILER_CONFIG['output_dir'], profile_id)
+
+
+def run_profiled(func, mode, name):
+    """Run func under the profiler, returning (result, profile info dict)"""
+    os.makedirs(PROFILER_CONFIG['output_dir'], exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+
+    tracing_already = tracemalloc.is_tracing()
+    if not tracing_already:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+
+    session = ProfileSession(mode)
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        profile_id = f"{stamp}-{name}.prof"
+    else:
+        profiler = StackSampler(threading.get_ident(), PROFILER_CONFIG['interval'], session)
+        profile_id = f"{stamp}-{name}.collapsed"
+
+    token = current_profile.set(session)
+    start = time.perf_counter()
+    try:
+        if mode == 'cprofile':
+            result = profiler.runcall(func)
+        else:
+            profiler.start()
+            try:
+                result = func()
+            finally:
+                profiler.stop()
+    finally:
+        wall = time.perf_counter() - start
+        current_profile.reset(token)
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+        if not tracing_already:
+            tracemalloc.stop()
+
+    if mode == 'cprofile':
+        stats = pstats.Stats(profiler)
+        with session.lock:
+            for pool_profiler in session.profiles:
+                stats.add(pool_profiler)
+        stats.dump_stats(profile_path(profile_id))
+    else:
+        with open(profile_path(profile_id), 'w', encoding='utf-8') as f:
+            f.write(profiler.collapsed())
+
+    return result, {'id': profile_id, 'wall_ms': round(wall * 1000, 2), 'peak_memory': peak}
+
+
+def profiled(view):
+    """Flask view decorator: profile the request when asked to (see module docstring)"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        mode = requested_mode()
+        if mode is None:
+            return view(*args, **kwargs)
+
+        if not profile_lock.acquire(blocking=False):
+            response = current_app.make_response(view(*args, **kwargs))
+            response.headers['X-Profile-Status'] = 'busy'
+            return response
+        try:
+            result, info = run_profiled(lambda: view(*args, **kwargs), mode, view.__name__)
+        finally:
+            profile_lock.release()
+
+        response = current_app.make_response(result)
+        response.headers['X-Profile-Status'] = 'ok'
+        response.headers['X-Profile-Id'] = info['id']
+        response.headers['X-Profile-Wall-Ms'] = str(info['wall_ms'])
+        response.headers['X-Profile-Peak-Memory'] = str(info['peak_memory'])
+        return response
+    return wrapper
@@ -0,0 +1,69 @@
+"""Opt-in recording of analysis requests for offline replay.
+
+With RECORD_REQUESTS=1 the analysis routes capture an anonymized payload
+(the OCR text instead of the image, dictation word lists, pronunciation
+pairs - no file names, user ids or client addresses). A request is written
+as one JSON line to RECORD_PATH when it took at least RECORD_SLOW_SECONDS,
+together with its per-stage timings; faster requests are kept with
+probability RECORD_SAMPLE_RATE (default 0, i.e. only slow ones).
+
+tools/benchmarks/replay_recordings.py pushes a recording file back through
+the feature functions and can promote slow cases to benchmark fixtures.
+"""
+import json
+import os
+import random
+import tempfile
+import threading
+from datetime import datetime
+
+from flask import g
+
+import metrics
+
+RECORDER_CONFIG = {
+    'enabled': os.environ.get('RECORD_REQUESTS', '').lower() in ('1', 'true', 'yes'),
+    'path': os.environ.get('RECORD_PATH', os.path.join(tempfile.gettempdir(), 'dyslexicheck-recordings.jsonl')),
+    'slow_seconds': float(os.environ.get('RECORD_SLOW_SECONDS', 2.0)),
+    'sample_rate': float(os.environ.get('RECORD_SAMPLE_RATE', 0.0))
+}
+
+write_lock = threading.Lock()
+
+
+def start():
+    """Begin collecting stage timings for the current request (before_request)"""
+    if RECORDER_CONFIG['enabled']:
+        metrics.start_stage_trace()
+
+
+def capture(kind, payload):
+    """Attach the anonymized payload of the current request to its recording"""
+    if RECORDER_CONFIG['enabled']:
+        g.recording = {'kind': kind, 'payload': payload}
+
+
+def finish(status, elapsed):
+    """Write the recording of the current request if it is slow or sampled (after_request)"""
+    if not RECORDER_CONFIG['enabled']:
+        return
+    stages = metrics.finish_stage_trace()
+    recording = g.pop('recording', None)
+    if recording is None:
+        return
+    slow = elapsed >= RECORDER_CONFIG['slow_seconds']
+    if not slow and random.random() >= RECORDER_CONFIG['sample_rate']:
+        return
+
+    recording.update({
+        'recorded_at': datetime.now().isoformat(timespec='seconds'),
+        'status': status,
+        'total_seconds': round(elapsed, 4),
+        'slow': slow,
+        'stages': {stage: round(seconds, 4) for stage, seconds in stages.items()} if slow else {}
+    })
+    try:
+        with write_lock, open(RECORDER_CONFIG['path'], 'a', encoding='utf-8') as f:
+            f.write(json.dumps(recording) + '\n')
+    except OSError as e:
+        print(f"Error writing request recording: {e}")
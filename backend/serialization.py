@@ -0,0 +1,62 @@
+import decimal
+import json
+import re
+import secrets
+from datetime import date
+
+from flask import Response
+from werkzeug.http import http_date
+
+# orjson is optional: when it is installed responses are encoded with it,
+# otherwise the standard library encoder is used
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class RawJSON:
+    """Already-serialized JSON (e.g. a MySQL JSON column) embedded as-is in a response"""
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value.encode('utf-8') if isinstance(value, str) else bytes(value)
+
+
+def encode_value(obj, raw_values, token):
+    """Encode the types the JSON encoders do not handle, matching Flask's jsonify output"""
+    if isinstance(obj, RawJSON):
+        # Replaced by the raw bytes after encoding, see dumps()
+        raw_values.append(obj.value)
+        return f"{token}{len(raw_values) - 1}"
+    if isinstance(obj, date):
+        return http_date(obj)
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    if isinstance(obj, (bytes, bytearray)):
+        return obj.decode('utf-8')
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj):
+    """Serialize obj to JSON bytes, splicing RawJSON values in without re-parsing them"""
+    raw_values = []
+    token = f"__raw_json_{secrets.token_hex(8)}_"
+
+    def default(value):
+        return encode_value(value, raw_values, token)
+
+    if orjson is not None:
+        body = orjson.dumps(obj, default=default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+    else:
+        body = json.dumps(obj, default=default, separators=(',', ':')).encode('utf-8')
+
+    if raw_values:
+        placeholder = re.compile(b'"' + re.escape(token.encode('ascii')) + rb'(\d+)"')
+        body = placeholder.sub(lambda match: raw_values[int(match.group(1))], body)
+    return body
+
+
+def json_response(obj, status=200):
+    """Drop-in replacement for jsonify() on result-heavy endpoints"""
+    return Response(dumps(obj), status=status, mimetype='application/json')
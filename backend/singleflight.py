@@ -0,0 +1,95 @@
+"""In-flight de-duplication of identical work ("singleflight").
+
+When the same image is analysed twice at the same moment (a double-click
+on Predict, a client retry), the second request waits for the first one's
+computation and gets the same result (or exception) instead of repeating
+every OCR and spell-check call. Nothing is cached once the computation has
+finished. Calls are counted in dyslexicheck_singleflight_total by outcome:
+'leader' ran the computation, 'shared' waited for a leader, 'unshared'
+waited but then ran the computation itself because the leader's outcome
+was not `shareable` (e.g. it was cut short by the leader's latency budget).
+
+A waiting caller gives up after its own `timeout` with TimeoutError
+(concurrent.futures' in SingleFlight, asyncio's in AsyncSingleFlight).
+"""
+import asyncio
+import threading
+from concurrent.futures import Future, TimeoutError
+
+from metrics import Counter
+
+singleflight_calls = Counter('dyslexicheck_singleflight_total', "De-duplicated computations by outcome",
+                             labels=('name', 'outcome'))
+
+
+class SingleFlight:
+    """Runs func once per key at a time; concurrent callers with the same key share the result"""
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args, timeout=None, shareable=None):
+        """func(*args), or the result of the same key's call in flight
+
+        `shareable(future)` decides whether a waiting caller may take the
+        leader's outcome; if not, it runs func itself.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            try:
+                future.exception(timeout)  # waits without raising the leader's exception
+            except TimeoutError:
+                singleflight_calls.inc(self.name, 'timeout')
+                raise
+            if shareable is None or shareable(future):
+                singleflight_calls.inc(self.name, 'shared')
+                return future.result()
+            singleflight_calls.inc(self.name, 'unshared')
+            return func(*args)
+
+        singleflight_calls.inc(self.name, 'leader')
+        try:
+            result = func(*args)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines (one event loop)"""
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+
+    async def do(self, key, func, *args, timeout=None, shareable=None):
+        task = self._calls.get(key)
+        if task is None:
+            singleflight_calls.inc(self.name, 'leader')
+            task = self._calls[key] = asyncio.ensure_future(func(*args))
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+            # A caller that goes away must not cancel the computation the others are waiting for
+            return await asyncio.shield(task)
+
+        try:
+            await asyncio.wait_for(asyncio.wait([task]), timeout)
+        except asyncio.TimeoutError:
+            singleflight_calls.inc(self.name, 'timeout')
+            raise
+        if shareable is None or shareable(task):
+            singleflight_calls.inc(self.name, 'shared')
+            return task.result()
+        singleflight_calls.inc(self.name, 'unshared')
+        return await func(*args)
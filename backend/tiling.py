@@ -0,0 +1,143 @@
+"""Coalescing OCR calls for batches of small images by tiling them.
+
+Most handwriting samples are short snippets, and each one costs an Azure
+Read submit plus several polls. With OCR_TILING=1 the batch analysis
+path (/api/analyze-images) stacks up to OCR_TILE_MAX_TILES small images
+(at most OCR_TILE_MAX_PIXELS pixels each) vertically into one grayscale
+composite, separated by white gutters of OCR_TILE_GUTTER pixels and at
+most OCR_COMPOSITE_MAX_HEIGHT pixels high (Azure Read accepts up to
+10000), and sends one Read request per composite. The returned lines are
+assigned back to their source image by the vertical centre of their
+bounding box.
+
+Larger images, ones that cannot be decoded and composites whose read fails
+are read one by one with ocr_client.read_text() (which keeps the Tesseract
+fallback). Images read per mode are counted in
+dyslexicheck_ocr_batch_images_total.
+"""
+import io
+import os
+
+import requests
+from PIL import Image, ImageOps
+
+from documents import PAGED_FORMATS, map_pages
+from http_client import CircuitOpenError
+from metrics import Counter
+from ocr_client import OcrError, azure_read_result, read_text
+from preprocess import PREPROCESS_CONFIG, preprocess_image
+
+TILING_CONFIG = {
+    'enabled': os.environ.get('OCR_TILING', '').lower() in ('1', 'true', 'yes'),
+    'max_tile_pixels': int(os.environ.get('OCR_TILE_MAX_PIXELS', 1000000)),
+    'max_tile_width': int(os.environ.get('OCR_TILE_MAX_WIDTH', 2000)),
+    'max_tiles': int(os.environ.get('OCR_TILE_MAX_TILES', 12)),
+    'max_height': int(os.environ.get('OCR_COMPOSITE_MAX_HEIGHT', 8000)),
+    'gutter': int(os.environ.get('OCR_TILE_GUTTER', 60))
+}
+
+batch_images = Counter('dyslexicheck_ocr_batch_images_total', "Images OCRed by the batch path, by mode",
+                       labels=('mode',))
+
+
+def load_tile(data):
+    """Upright grayscale image if it is small enough to be tiled, else None"""
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if image.format in PAGED_FORMATS and getattr(image, 'n_frames', 1) > 1:
+                return None
+            if (image.width * image.height > TILING_CONFIG['max_tile_pixels']
+                    or image.width > TILING_CONFIG['max_tile_width']):
+                return None
+            return ImageOps.exif_transpose(image).convert('L')
+    except Exception:
+        return None
+
+
+def plan_composites(tiles):
+    """Group [(index, image)] into composites within the tile count and height limits"""
+    gutter = TILING_CONFIG['gutter']
+    groups, group, height = [], [], gutter
+    for index, image in tiles:
+        if group and (len(group) >= TILING_CONFIG['max_tiles']
+                      or height + image.height + gutter > TILING_CONFIG['max_height']):
+            groups.append(group)
+            group, height = [], gutter
+        group.append((index, image))
+        height += image.height + gutter
+    if group:
+        groups.append(group)
+    return groups
+
+
+def build_composite(group):
+    """JPEG bytes of the stacked tiles and their [(index, top, bottom)] offsets"""
+    gutter = TILING_CONFIG['gutter']
+    width = max(image.width for _, image in group) + 2 * gutter
+    height = sum(image.height for _, image in group) + (len(group) + 1) * gutter
+    composite = Image.new('L', (width, height), 255)
+    offsets, top = [], gutter
+    for index, image in group:
+        composite.paste(image, (gutter, top))
+        offsets.append((index, top, top + image.height))
+        top += image.height + gutter
+    output = io.BytesIO()
+    composite.save(output, format='JPEG', quality=PREPROCESS_CONFIG['quality'])
+    return output.getvalue(), offsets
+
+
+def split_lines(read_result, offsets):
+    """{index: text} from a composite's Read result, each line going to the tile under its centre"""
+    lines = {index: [] for index, _, _ in offsets}
+    if read_result['status'] != 'succeeded':
+        return {index: "" for index in lines}
+    for page in read_result['analyzeResult']['readResults']:
+        for line in page['lines']:
+            box = line['boundingBox']
+            centre = sum(box[1::2]) / 4
+            index = min(offsets, key=lambda tile: 0 if tile[1] <= centre <= tile[2]
+                        else min(abs(centre - tile[1]), abs(centre - tile[2])))[0]
+            lines[index].append(line['text'])
+    return {index: " ".join(texts) for index, texts in lines.items()}
+
+
+def read_single(data):
+    batch_images.inc('single')
+    return read_text(preprocess_image(data))
+
+
+def read_composite(group, images):
+    data, offsets = build_composite(group)
+    try:
+        texts = split_lines(azure_read_result(data), offsets)
+    except (OcrError, CircuitOpenError, requests.RequestException) as e:
+        print(f"Tiled OCR failed ({e}), reading the {len(group)} images one by one")
+        return {index: read_single(images[index]) for index, _ in group}
+    batch_images.inc('tiled', amount=len(group))
+    return texts
+
+
+def read_texts(images):
+    """OCR text for each of the image bytes in `images`, in order
+
+    With tiling enabled, small images share Read requests (see module
+    docstring); composites and single reads run concurrently.
+    """
+    jobs, tiles = [], []
+    for index, data in enumerate(images):
+        tile = load_tile(data) if TILING_CONFIG['enabled'] else None
+        if tile is None:
+            jobs.append(lambda index=index: {index: read_single(images[index])})
+        else:
+            tiles.append((index, tile))
+    for group in plan_composites(tiles):
+        if len(group) == 1:
+            jobs.append(lambda index=group[0][0]: {index: read_single(images[index])})
+        else:
+            jobs.append(lambda group=group: read_composite(group, images))
+
+    texts = [None] * len(images)
+    for _, result in map_pages(lambda job: job(), jobs):
+        for index, text in result.items():
+            texts[index] = text
+    return texts
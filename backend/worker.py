@@ -0,0 +1,154 @@
+"""Analysis worker for the job queue in jobs.py.
+
+    cd backend && python worker.py                    # same host as the API, shares JOB_DB_PATH
+    python worker.py --api http://api-host:5000/ --token $JOB_WORKER_TOKEN   # any other host
+    python worker.py --requeue-dead                   # retry the dead-letter queue
+
+Each worker runs --concurrency threads. A thread leases a job, analyses it
+the way /api/analyze-image does, heartbeats the lease while it works, and
+completes or fails the job; a failed job is retried later or dead-lettered
+by the queue. Scale out by starting more workers, on this host or others.
+SIGTERM/SIGINT stop leasing and let the jobs in progress finish.
+"""
+import argparse
+import base64
+import os
+import signal
+import socket
+import threading
+
+import requests
+
+from jobs import JOB_CONFIG, JobQueue
+
+WORKER_CONFIG = {
+    'concurrency': int(os.environ.get('JOB_WORKER_CONCURRENCY', 2)),
+    'poll_interval': float(os.environ.get('JOB_POLL_INTERVAL', 1.0))
+}
+
+
+class RemoteQueue:
+    """The JobQueue operations a worker needs, over the API's /api/jobs worker routes"""
+
+    def __init__(self, base_url, token):
+        self.base_url = base_url.rstrip('/') + '/api/jobs'
+        self.session = requests.Session()
+        self.session.headers['X-Worker-Token'] = token
+
+    def post(self, path, payload):
+        response = self.session.post(self.base_url + path, json=payload, timeout=30)
+        if response.status_code == 409:
+            return None
+        response.raise_for_status()
+        return response
+
+    def lease(self, worker):
+        response = self.post('/lease', {'worker': worker})
+        if response.status_code == 204:
+            return None
+        job = response.json()
+        job['payload'] = base64.b64decode(job['payload'])
+        return job
+
+    def heartbeat(self, job_id, lease_id):
+        return self.post(f"/{job_id}/heartbeat", {'lease_id': lease_id}) is not None
+
+    def complete(self, job_id, lease_id, result):
+        return self.post(f"/{job_id}/complete", {'lease_id': lease_id, 'result': result}) is not None
+
+    def fail(self, job_id, lease_id, error):
+        return self.post(f"/{job_id}/fail", {'lease_id': lease_id, 'error': error}) is not None
+
+
+def analyze(job):
+    """The analyze-image result for a job's upload"""
+    # Imported here so that --requeue-dead does not load the analysis engines
+    from app import document_result
+    from documents import iter_pages
+
+    if job['kind'] != 'analyze-image':
+        raise ValueError(f"Unknown job kind {job['kind']}")
+    page_count, pages = iter_pages(job['payload'])
+    return document_result(page_count, pages)
+
+
+def keep_leased(queue, job, done):
+    """Heartbeat the job's lease until `done` is set"""
+    interval = JOB_CONFIG['visibility_timeout'] / 3
+    while not done.wait(interval):
+        try:
+            if not queue.heartbeat(job['id'], job['lease_id']):
+                print(f"Lost the lease on job {job['id']}, its result will be discarded")
+                return
+        except Exception as e:
+            print(f"Heartbeat for job {job['id']} failed: {e}")
+
+
+def process(queue, job):
+    done = threading.Event()
+    heartbeat = threading.Thread(target=keep_leased, args=(queue, job, done), daemon=True)
+    heartbeat.start()
+    result, error = None, None
+    try:
+        result = analyze(job)
+    except Exception as e:
+        print(f"Job {job['id']} failed (attempt {job['attempt']}): {e}")
+        error = str(e) or type(e).__name__
+    finally:
+        done.set()
+        heartbeat.join()
+    try:
+        if error is None:
+            queue.complete(job['id'], job['lease_id'], result)
+        else:
+            queue.fail(job['id'], job['lease_id'], error)
+    except Exception as e:
+        # The lease runs out and the job is delivered again
+        print(f"Could not record the outcome of job {job['id']}: {e}")
+
+
+def work(queue, name, stop):
+    while not stop.is_set():
+        try:
+            job = queue.lease(name)
+        except Exception as e:
+            print(f"Could not lease a job: {e}")
+            job = None
+        if job is None:
+            stop.wait(WORKER_CONFIG['poll_interval'])
+            continue
+        process(queue, job)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, default=WORKER_CONFIG['concurrency'])
+    parser.add_argument('--api', help="API base URL, for workers that do not share the job database")
+    parser.add_argument('--token', default=JOB_CONFIG['worker_token'], help="JOB_WORKER_TOKEN of the API")
+    parser.add_argument('--name', default=f"{socket.gethostname()}:{os.getpid()}")
+    parser.add_argument('--requeue-dead', action='store_true', help="queue dead-lettered jobs again and exit")
+    args = parser.parse_args()
+
+    if args.requeue_dead:
+        print(f"Requeued {JobQueue().requeue_dead()} dead jobs")
+        return
+
+    queue = RemoteQueue(args.api, args.token) if args.api else JobQueue()
+    stop = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stop.set())
+
+    threads = [threading.Thread(target=work, args=(queue, f"{args.name}/{i}", stop), daemon=True)
+               for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    print(f"Worker {args.name} running {args.concurrency} threads on "
+          f"{args.api or JOB_CONFIG['db_path']}")
+    while any(thread.is_alive() for thread in threads):
+        for thread in threads:
+            thread.join(timeout=1)
+    print(f"Worker {args.name} stopped")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""WSGI entry point for production:
+
+    gunicorn -c gunicorn.conf.py        (from backend/)
+
+gunicorn.conf.py sets preload_app, so this module is imported once in the
+master. The engines listed in WARMUP_ENGINES (default: the word lists, IPA
+lexicon, phonetic encoders and TextBlob's spelling model) are loaded here,
+synchronously, before the workers are forked; the workers then share those
+pages copy-on-write instead of each loading its own copy. The scoring model
+is a plain decision tree in features.score, so there is nothing to load.
+
+LanguageTool runs as one shared server: unless LANGUAGETOOL_SERVER already
+names one, the master starts a local LanguageTool server (a JVM) here and
+exports its URL as LANGUAGETOOL_SERVER, so each worker's client connects
+to it instead of starting a JVM of its own, and max_requests recycling
+does not restart it. gunicorn.conf.py stops it when the master exits. The
+pooled session in http_client opens no connections before fork.
+"""
+import gc
+import os
+
+os.environ.setdefault('WARMUP_ENGINES', 'vocabulary,ipa,phonetics,textblob')
+
+import engines
+
+# A background warm-up thread would not survive the fork (and could hold an engine lock while forking)
+engines.WARMUP_CONFIG['background'] = False
+
+from app import app
+from features import start_language_tool_server
+
+if not os.environ.get('LANGUAGETOOL_SERVER'):
+    try:
+        os.environ['LANGUAGETOOL_SERVER'] = start_language_tool_server()
+    except Exception as e:
+        # The workers then each try to start their own
+        print(f"Warning: Could not start a shared LanguageTool server: {e}")
+
+# Keep the preloaded objects out of the workers' garbage collector, which would
+# otherwise write to their headers and un-share the pages
+gc.freeze()
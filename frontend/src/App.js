@@ -37,7 +37,8 @@ export default function App() {
   const handleFileChange = (e) => {
     const f = e.target.files[0];
     setFile(f);
-    if (f) setPreview(URL.createObjectURL(f));
+    // Browsers cannot show TIFF or PDF in an <img>
+    if (f && ['image/jpeg', 'image/png'].includes(f.type)) setPreview(URL.createObjectURL(f));
     else setPreview(null);
   };
 
@@ -289,12 +290,12 @@ export default function App() {
               <form onSubmit={handleSubmit}>
                 <div style={{ marginBottom: 20 }}>
                   <label htmlFor="image-upload" className="streamlit-button">
-                    Choose Image File (JPG)
+                    Choose File (JPG, PNG, TIFF or PDF)
                   </label>
                   <input 
                     id="image-upload" 
                     type="file" 
-                    accept=".jpg,.jpeg" 
+                    accept=".jpg,.jpeg,.png,.tif,.tiff,.pdf" 
                     onChange={handleFileChange} 
                     style={{ display: 'none' }} 
                   />
@@ -0,0 +1,81 @@
+"""Throughput check for the classroom roster import.
+
+Generates a synthetic roster and inserts it either directly through
+backend/database.py or through a running API (POST /api/users/bulk),
+comparing against one create_user call per student. Run it against a scratch
+database: the generated users are not cleaned up.
+
+    python tools/bench_bulk_import.py --rows 10000
+    python tools/bench_bulk_import.py --rows 10000 --url http://localhost:5000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+GRADES = ["2nd-4th", "5th-7th"]
+
+
+def make_roster(rows):
+    return [{'name': f"bench-student-{i}", 'age': random.randint(6, 14), 'grade': random.choice(GRADES)}
+            for i in range(rows)]
+
+
+def report(label, rows, elapsed):
+    print(f"{label:<28} {rows:>7} rows  {elapsed:8.3f}s  {rows / elapsed:10.1f} rows/s")
+
+
+def bench_database(roster, single_rows):
+    from database import create_user, create_users_bulk
+
+    start = time.perf_counter()
+    user_ids = create_users_bulk(roster)
+    elapsed = time.perf_counter() - start
+    if not user_ids or len(user_ids) != len(roster):
+        sys.exit("Bulk import failed, check the MySQL connection in backend/database.py")
+    report("create_users_bulk", len(roster), elapsed)
+
+    sample = roster[:single_rows]
+    start = time.perf_counter()
+    for user in sample:
+        create_user(user['name'], user['age'], user['grade'])
+    report("create_user (one per row)", len(sample), time.perf_counter() - start)
+
+
+def bench_http(roster, url, single_rows):
+    import requests
+
+    session = requests.Session()
+    start = time.perf_counter()
+    response = session.post(f"{url}/api/users/bulk", json=roster)
+    elapsed = time.perf_counter() - start
+    response.raise_for_status()
+    report("POST /api/users/bulk", len(roster), elapsed)
+
+    sample = roster[:single_rows]
+    start = time.perf_counter()
+    for user in sample:
+        session.post(f"{url}/api/users", json=user).raise_for_status()
+    report("POST /api/users (per row)", len(sample), time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000, help="roster size for the bulk import")
+    parser.add_argument('--single-rows', type=int, default=200,
+                        help="rows inserted one at a time for the baseline (extrapolate for the full roster)")
+    parser.add_argument('--url', help="benchmark a running API instead of calling database.py directly")
+    args = parser.parse_args()
+
+    roster = make_roster(args.rows)
+    if args.url:
+        bench_http(roster, args.url.rstrip('/'), args.single_rows)
+    else:
+        bench_database(roster, args.single_rows)
+
+
+if __name__ == '__main__':
+    main()
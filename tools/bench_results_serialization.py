@@ -0,0 +1,98 @@
+"""Payload generation benchmark for /api/results.
+
+Builds synthetic rows shaped like get_all_results() output and compares the
+old path (json.loads every `details` column, then Flask's jsonify encoder)
+with backend/serialization.py (raw `details` pass-through, orjson when
+installed). No database is needed.
+
+    python tools/bench_results_serialization.py --rows 1000 10000 100000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from flask import Flask, json as flask_json
+
+import serialization
+from serialization import RawJSON
+
+TEST_TYPES = ['handwriting', 'pronunciation', 'dictation']
+
+
+def make_rows(count):
+    start = datetime(2024, 1, 1)
+    rows = []
+    for i in range(count):
+        details = json.dumps({
+            'extracted_text': "the quick brown fox jumps over the lazy dog " * 3,
+            'spelling_accuracy': random.uniform(60, 100),
+            'grammatical_accuracy': random.uniform(60, 100),
+            'percentage_of_corrections': random.uniform(0, 20),
+            'phonetic_accuracy': random.uniform(60, 100),
+            'word_scores': [random.random() for _ in range(10)]
+        })
+        rows.append({
+            'id': i + 1,
+            'user_id': random.randint(1, 500),
+            'test_type': random.choice(TEST_TYPES),
+            'score': random.uniform(0, 100),
+            'prediction': random.choice(['dyslexia', 'non-dyslexia']),
+            'confidence': random.random(),
+            'details': details,
+            'created_at': start + timedelta(minutes=i),
+            'name': f"student-{i % 500}",
+            'age': random.randint(6, 14),
+            'grade': "2nd-4th"
+        })
+    return rows
+
+
+def old_path(rows, app):
+    results = [dict(row) for row in rows]
+    for result in results:
+        result['details'] = json.loads(result['details'])
+    with app.app_context():
+        return flask_json.dumps({'total_results': len(results), 'results': results}).encode('utf-8')
+
+
+def new_path(rows):
+    results = [dict(row) for row in rows]
+    for result in results:
+        result['details'] = RawJSON(result['details'])
+    return serialization.dumps({'total_results': len(results), 'results': results})
+
+
+def timed(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = func()
+        best = min(best, time.perf_counter() - start)
+    return best, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3, help="best-of-N timing")
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    encoder = 'orjson' if serialization.orjson is not None else 'json (stdlib)'
+    print(f"encoder: {encoder}")
+    print(f"{'rows':>8} {'jsonify (s)':>12} {'fast path (s)':>14} {'speedup':>8} {'bytes':>12}")
+    for count in args.rows:
+        rows = make_rows(count)
+        old_time, _ = timed(lambda: old_path(rows, app), args.repeat)
+        new_time, size = timed(lambda: new_path(rows), args.repeat)
+        print(f"{count:>8} {old_time:>12.4f} {new_time:>14.4f} {old_time / new_time:>7.1f}x {size:>12}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Tail latency of OCR reads with and without hedging.
+
+Runs backend/ocr_client.py against the Azure Read stand-in from
+tools/mock_services.py with long-tailed latency (by default any call to
+it, submit or poll, takes 3 s longer with 5% probability) and compares plain reads with hedged reads:
+latency percentiles, how many extra reads were sent and how often the
+hedge won.
+
+    python tools/benchmarks/bench_hedged_ocr.py --reads 300 --concurrency 8
+    python tools/benchmarks/bench_hedged_ocr.py --tail-probability 0.1 --budget 0.2 --output hedge.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(os.path.dirname(BENCH_DIR))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'tools'))
+
+import ocr_client
+from mock_services import start_mock_services
+
+
+def percentile(ordered, pct):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def mock_calls(base_url):
+    return requests.get(base_url + 'health', timeout=5).json()['calls']
+
+
+def run_reads(image, reads, concurrency, hedge):
+    ocr_client.OCR_CONFIG['hedge'] = hedge
+    latencies = []
+    lock = threading.Lock()
+    remaining = iter(range(reads))
+
+    def worker():
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            start = time.perf_counter()
+            ocr_client.read_text(image)
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    ordered = sorted(latencies)
+    return {
+        'reads': len(ordered),
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 1),
+        'p50_ms': round(percentile(ordered, 50) * 1000, 1),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 1),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 1),
+        'max_ms': round(ordered[-1] * 1000, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reads', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--processing', type=float, default=0.3, help="normal OCR processing time (s)")
+    parser.add_argument('--tail-latency', type=float, default=3.0, help="extra seconds for a slow read")
+    parser.add_argument('--tail-probability', type=float, default=0.05)
+    parser.add_argument('--poll-interval', type=float, default=0.05)
+    parser.add_argument('--percentile', type=float, default=95, help="hedge after this latency percentile")
+    parser.add_argument('--budget', type=float, default=0.1, help="hedges allowed per read")
+    parser.add_argument('--output', help="write the results as JSON")
+    args = parser.parse_args()
+
+    server, base_url = start_mock_services(latency={'ocr_processing': args.processing,
+                                                    'tail_latency': args.tail_latency,
+                                                    'tail_probability': args.tail_probability})
+    ocr_client.OCR_CONFIG.update({'endpoint': base_url, 'poll_interval': args.poll_interval,
+                                  'hedge_percentile': args.percentile, 'hedge_min_samples': 20})
+    ocr_client.hedge_budget = ocr_client.HedgeBudget(args.budget, ocr_client.OCR_CONFIG['hedge_burst'])
+    with open(os.path.join(ROOT_DIR, 'data', 'dyslexic', '1.jpg'), 'rb') as f:
+        image = f.read()
+
+    results = {}
+    for name, hedge in (('plain', False), ('hedged', True)):
+        before = mock_calls(base_url)['ocr_submit']
+        hedges_before = dict(ocr_client.ocr_hedges.values)
+        results[name] = run_reads(image, args.reads, args.concurrency, hedge)
+        submits = mock_calls(base_url)['ocr_submit'] - before
+        outcomes = {key[0]: value - hedges_before.get(key, 0) for key, value in ocr_client.ocr_hedges.values.items()}
+        won, lost = outcomes.get('hedge_won', 0), outcomes.get('primary_won', 0)
+        results[name].update({
+            'extra_reads_pct': round((submits - args.reads) / args.reads * 100, 2),
+            'hedge_outcomes': outcomes,
+            'hedge_win_rate': round(won / (won + lost), 3) if won + lost else None
+        })
+        stats = results[name]
+        print(f"{name:<8} p50 {stats['p50_ms']:8.1f}  p95 {stats['p95_ms']:8.1f}  p99 {stats['p99_ms']:8.1f}  "
+              f"max {stats['max_ms']:8.1f} ms   extra reads {stats['extra_reads_pct']:5.1f}%   "
+              f"hedges {outcomes}")
+    server.shutdown()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'config': vars(args), 'results': results}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
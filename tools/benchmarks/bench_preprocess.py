@@ -0,0 +1,105 @@
+"""Payload size and OCR latency with and without image preprocessing.
+
+Runs backend/preprocess.py over the handwriting samples in data/dyslexic
+and data/non_dyslexic and reports, per folder, the bytes that would be
+sent to Azure Read before and after and the time the preprocessing takes:
+
+    python tools/benchmarks/bench_preprocess.py --output preprocess.json
+
+With --ocr every image is also read through ocr_client.read_text() twice,
+original and preprocessed, against AZURE_COMPUTERVISION_ENDPOINT (a real
+Azure resource: the mock in tools/mock_services.py does not model upload
+size), to compare OCR latency and check that the text is unchanged:
+
+    AZURE_COMPUTERVISION_ENDPOINT=... AZURE_COMPUTERVISION_KEY=... \\
+        python tools/benchmarks/bench_preprocess.py --ocr --output preprocess.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(os.path.dirname(BENCH_DIR))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+
+from preprocess import shrink_image
+
+FOLDERS = ('data/dyslexic', 'data/non_dyslexic')
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def bench_folder(folder, ocr):
+    from ocr_client import read_text
+
+    images = []
+    directory = os.path.join(ROOT_DIR, folder)
+    for name in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, name), 'rb') as f:
+            original = f.read()
+        shrunk, seconds = timed(shrink_image, original)
+        image = {'image': name, 'original_bytes': len(original), 'sent_bytes': len(shrunk),
+                 'preprocess_ms': round(seconds * 1000, 2)}
+        if ocr:
+            original_text, original_seconds = timed(read_text, original)
+            shrunk_text, shrunk_seconds = timed(read_text, shrunk)
+            image.update({'ocr_original_ms': round(original_seconds * 1000, 1),
+                          'ocr_sent_ms': round(shrunk_seconds * 1000, 1),
+                          'same_text': original_text == shrunk_text})
+        images.append(image)
+
+    original_total = sum(image['original_bytes'] for image in images)
+    sent_total = sum(image['sent_bytes'] for image in images)
+    summary = {
+        'images': len(images),
+        'original_bytes': original_total,
+        'sent_bytes': sent_total,
+        'saved_pct': round((original_total - sent_total) / original_total * 100, 1),
+        'largest_original_bytes': max(image['original_bytes'] for image in images),
+        'largest_sent_bytes': max(image['sent_bytes'] for image in images),
+        'preprocess_median_ms': round(statistics.median(image['preprocess_ms'] for image in images), 2),
+        'preprocess_max_ms': max(image['preprocess_ms'] for image in images)
+    }
+    if ocr:
+        summary.update({
+            'ocr_original_median_ms': statistics.median(image['ocr_original_ms'] for image in images),
+            'ocr_sent_median_ms': statistics.median(image['ocr_sent_ms'] for image in images),
+            'same_text': sum(image['same_text'] for image in images)
+        })
+    return summary, images
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ocr', action='store_true', help="also time OCR of original vs preprocessed images")
+    parser.add_argument('--output', help="write the results as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    for folder in FOLDERS:
+        summary, images = bench_folder(folder, args.ocr)
+        results[folder] = {'summary': summary, 'images': images}
+        line = (f"{folder:<18} {summary['images']:3d} images  {summary['original_bytes'] / 1e6:6.2f} MB -> "
+                f"{summary['sent_bytes'] / 1e6:6.2f} MB ({summary['saved_pct']:.1f}% saved)  "
+                f"largest {summary['largest_original_bytes'] / 1e3:.0f} -> {summary['largest_sent_bytes'] / 1e3:.0f} kB  "
+                f"preprocess median {summary['preprocess_median_ms']:.1f} ms, max {summary['preprocess_max_ms']:.1f} ms")
+        if args.ocr:
+            line += (f"  OCR median {summary['ocr_original_median_ms']:.0f} -> {summary['ocr_sent_median_ms']:.0f} ms"
+                     f"  same text {summary['same_text']}/{summary['images']}")
+        print(line)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
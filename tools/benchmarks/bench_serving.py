@@ -0,0 +1,193 @@
+"""Memory and throughput of the dev server vs the gunicorn entry point.
+
+Starts each server in turn against the stand-ins from tools/mock_services.py,
+drives it with the load generator from tools/loadtest.py and reports
+throughput, latency percentiles and per-process memory (RSS, PSS and the
+shared part, from /proc/<pid>/smaps_rollup, so Linux only). PSS is the
+number to look at: pages shared copy-on-write between the gunicorn master
+and its workers are split between them.
+
+    python tools/benchmarks/bench_serving.py --duration 30 --concurrency 16 --output serving.json
+    python tools/benchmarks/bench_serving.py --servers gunicorn --workers 4 --threads 8
+    python tools/benchmarks/bench_serving.py --languagetool local     # needs java
+
+With --languagetool local the servers start a real LanguageTool (the dev
+server in-process, gunicorn one shared server in the master, see
+backend/wsgi.py) instead of using the stand-in, and its JVM is counted in
+the memory figures as a child process of the server.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(os.path.dirname(BENCH_DIR))
+BACKEND_DIR = os.path.join(ROOT_DIR, 'backend')
+sys.path.insert(0, os.path.join(ROOT_DIR, 'tools'))
+
+from loadtest import MIXES, Recorder, Scenario, build_report, client_loop, load_images
+from mock_services import start_mock_services
+
+
+def server_command(name, args):
+    if name == 'dev':
+        return [sys.executable, 'app.py']
+    return [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+            '--workers', str(args.workers), '--threads', str(args.threads)]
+
+
+def process_tree(pid):
+    """pid and all its descendants"""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    tree, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(children.get(current, []))
+    return tree
+
+
+def process_memory(pid):
+    """RSS / PSS / shared / private memory of one process in MiB"""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return {
+        'rss_mib': round(fields.get('Rss', 0), 1),
+        'pss_mib': round(fields.get('Pss', 0), 1),
+        'shared_mib': round(fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0), 1),
+        'private_mib': round(fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0), 1)
+    }
+
+
+def memory_snapshot(pid):
+    processes = {}
+    for child in process_tree(pid):
+        try:
+            processes[str(child)] = process_memory(child)
+        except OSError:
+            continue
+    return {
+        'processes': processes,
+        'total_rss_mib': round(sum(p['rss_mib'] for p in processes.values()), 1),
+        'total_pss_mib': round(sum(p['pss_mib'] for p in processes.values()), 1)
+    }
+
+
+def wait_until_up(url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{url}/api/ready", timeout=2).ok:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    return False
+
+
+def run_load(url, mix, concurrency, duration):
+    scenario = Scenario(url, load_images(), timeout=120)
+    mix = {route: weight for route, weight in MIXES[mix].items() if route not in ('login', 'history')}
+    routes, weights = list(mix), list(mix.values())
+    recorder = Recorder()
+    start = time.monotonic()
+    threads = [threading.Thread(target=client_loop, args=(scenario, routes, weights, recorder, start + duration))
+               for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder, time.monotonic() - start
+
+
+def bench_server(name, args, base_url):
+    env = dict(os.environ, PORT=str(args.port), AZURE_COMPUTERVISION_ENDPOINT=base_url,
+               BING_SPELLCHECK_ENDPOINT=base_url + 'v7.0/SpellCheck', LANGUAGETOOL_SERVER=base_url)
+    if args.languagetool == 'local':
+        del env['LANGUAGETOOL_SERVER']
+    url = f"http://127.0.0.1:{args.port}"
+    process = subprocess.Popen(server_command(name, args), cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        # A first local LanguageTool start downloads it
+        if not wait_until_up(url, timeout=600 if args.languagetool == 'local' else 60):
+            raise RuntimeError(f"{name} server did not come up on {url}")
+        idle = memory_snapshot(process.pid)
+        recorder, elapsed = run_load(url, args.mix, args.concurrency, args.duration)
+        loaded = memory_snapshot(process.pid)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+    report = build_report(recorder, elapsed, argparse.Namespace(url=url, mix=args.mix,
+                                                                concurrency=args.concurrency))
+    print(f"\n{name}: {report['throughput_rps']} req/s over {report['duration_s']}s, "
+          f"{len(loaded['processes'])} processes, PSS {idle['total_pss_mib']} MiB idle -> "
+          f"{loaded['total_pss_mib']} MiB under load (RSS {loaded['total_rss_mib']} MiB)")
+    for pid, memory in loaded['processes'].items():
+        print(f"  pid {pid:<8} rss {memory['rss_mib']:8.1f}  pss {memory['pss_mib']:8.1f}  "
+              f"shared {memory['shared_mib']:8.1f}  private {memory['private_mib']:8.1f} MiB")
+    for route, stats in report['routes'].items():
+        print(f"  {route:<22} p50 {stats['p50_ms']:9.1f} ms  p95 {stats['p95_ms']:9.1f} ms  "
+              f"errors {stats['error_rate']:.1%}")
+    return {'memory_idle': idle, 'memory_loaded': loaded, 'load': report}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--servers', nargs='+', choices=['dev', 'gunicorn'], default=['dev', 'gunicorn'])
+    parser.add_argument('--port', type=int, default=5077)
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="gunicorn workers")
+    parser.add_argument('--threads', type=int, default=4, help="gunicorn threads per worker")
+    parser.add_argument('--mix', choices=sorted(MIXES), default='classroom')
+    parser.add_argument('--languagetool', choices=['mock', 'local'], default='mock',
+                        help="LanguageTool stand-in, or a real local server (needs java)")
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=30, help="seconds of load per server")
+    parser.add_argument('--output', help="write the results as JSON")
+    args = parser.parse_args()
+
+    server, base_url = start_mock_services()
+    results = {name: bench_server(name, args, base_url) for name in args.servers}
+    server.shutdown()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'meta': {
+                    'timestamp': datetime.now().isoformat(timespec='seconds'),
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'cpu_count': os.cpu_count(),
+                    'workers': args.workers,
+                    'threads': args.threads,
+                    'languagetool': args.languagetool
+                },
+                'servers': results
+            }, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Cold start benchmark for the Flask API.
+
+Each run starts a fresh interpreter and measures how long `import app`
+takes, how long the first /api/get-words and /api/ready requests take
+(through Flask's test client, no server), and how long each lazily loaded
+engine (see backend/engines.py) takes to warm up afterwards:
+
+    python tools/benchmarks/bench_startup.py --output startup.json
+    python tools/benchmarks/bench_startup.py --output new.json --compare startup.json
+
+LANGUAGETOOL_SERVER etc. are passed through from the environment, so the
+languagetool engine is timed against whatever it would connect to.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(os.path.dirname(BENCH_DIR))
+BACKEND_DIR = os.path.join(ROOT_DIR, 'backend')
+
+# Runs in the child interpreter, prints one JSON object on the last line
+CHILD = '''
+import json, sys, time
+start = time.perf_counter()
+import app
+timings = {'import_app': time.perf_counter() - start}
+client = app.app.test_client()
+for name, path in (('first_get_words', '/api/get-words?level=1'), ('first_ready', '/api/ready')):
+    start = time.perf_counter()
+    client.get(path)
+    timings[name] = time.perf_counter() - start
+if sys.argv[1] == '1':
+    import engines
+    for name in sorted(engines.engines):
+        if engines.engines[name].state == 'cold':
+            engines.engines[name].get()
+        timings['engine_' + name] = engines.engines[name].load_seconds or 0.0
+print(json.dumps(timings))
+'''
+
+
+def run_once(with_engines):
+    output = subprocess.run([sys.executable, '-c', CHILD, '1' if with_engines else '0'], cwd=BACKEND_DIR,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def compare(current, baseline_path):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path}, median:")
+    for name, stats in current['timings'].items():
+        old = baseline['timings'].get(name)
+        if not old:
+            continue
+        ratio = stats['median_ms'] / old['median_ms'] if old['median_ms'] else float('inf')
+        flag = "  <-- slower" if ratio > 1.1 else ""
+        print(f"  {name:<28} {old['median_ms']:10.1f} -> {stats['median_ms']:10.1f} ms  ({ratio:5.2f}x){flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help="fresh interpreters to start")
+    parser.add_argument('--no-engines', action='store_true', help="skip warming the engines")
+    parser.add_argument('--output', default='startup_output.json', help="where to write the JSON results")
+    parser.add_argument('--compare', help="previous results file to compare against")
+    args = parser.parse_args()
+
+    runs = []
+    for index in range(args.runs):
+        runs.append(run_once(not args.no_engines))
+        print(f"  run {index + 1}: import app {runs[-1]['import_app'] * 1000:.1f} ms")
+
+    timings = {}
+    for name in runs[0]:
+        values = [run[name] * 1000 for run in runs]
+        timings[name] = {'median_ms': round(statistics.median(values), 3), 'max_ms': round(max(values), 3)}
+    print(f"\nMedian over {args.runs} runs:")
+    for name, stats in timings.items():
+        print(f"  {name:<28} {stats['median_ms']:10.1f} ms")
+
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'runs': args.runs
+        },
+        'timings': timings
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
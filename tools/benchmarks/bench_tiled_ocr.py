@@ -0,0 +1,93 @@
+"""Azure Read calls and wall time for a batch of samples, with and without tiling.
+
+Reads the handwriting samples in data/dyslexic and data/non_dyslexic
+through backend/tiling.py's read_texts() (the OCR step of
+/api/analyze-images) against the Azure Read stand-in from
+tools/mock_services.py, once image by image and once with OCR_TILING, and
+reports the submit/poll calls per image, the wall time and how many images
+got the same text both ways:
+
+    python tools/benchmarks/bench_tiled_ocr.py
+    python tools/benchmarks/bench_tiled_ocr.py --processing 2 --max-tiles 8 --output tiling.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(os.path.dirname(BENCH_DIR))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'tools'))
+
+import ocr_client
+import tiling
+from mock_services import start_mock_services
+
+FOLDERS = ('data/dyslexic', 'data/non_dyslexic')
+
+
+def load_images(limit):
+    images = []
+    for folder in FOLDERS:
+        directory = os.path.join(ROOT_DIR, folder)
+        for name in sorted(os.listdir(directory)):
+            with open(os.path.join(directory, name), 'rb') as f:
+                images.append(f.read())
+    return images[:limit] if limit else images
+
+
+def run(images, base_url, tiled):
+    tiling.TILING_CONFIG['enabled'] = tiled
+    before = requests.get(base_url + 'health', timeout=5).json()['calls']
+    start = time.perf_counter()
+    texts = tiling.read_texts(images)
+    elapsed = time.perf_counter() - start
+    after = requests.get(base_url + 'health', timeout=5).json()['calls']
+    submits = after['ocr_submit'] - before['ocr_submit']
+    polls = after['ocr_poll'] - before['ocr_poll']
+    return texts, {
+        'images': len(images),
+        'wall_s': round(elapsed, 2),
+        'read_submits': submits,
+        'read_polls': polls,
+        'calls_per_image': round((submits + polls) / len(images), 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', type=int, default=0, help="only use the first N samples")
+    parser.add_argument('--processing', type=float, default=1.0, help="Azure Read processing time (s)")
+    parser.add_argument('--poll-interval', type=float, default=0.25)
+    parser.add_argument('--max-tiles', type=int, default=tiling.TILING_CONFIG['max_tiles'])
+    parser.add_argument('--output', help="write the results as JSON")
+    args = parser.parse_args()
+
+    server, base_url = start_mock_services(latency={'ocr_processing': args.processing})
+    ocr_client.OCR_CONFIG.update({'endpoint': base_url, 'poll_interval': args.poll_interval})
+    tiling.TILING_CONFIG['max_tiles'] = args.max_tiles
+    images = load_images(args.images)
+
+    single_texts, single = run(images, base_url, tiled=False)
+    tiled_texts, tiled = run(images, base_url, tiled=True)
+    tiled['same_text'] = sum(a == b for a, b in zip(single_texts, tiled_texts))
+    server.shutdown()
+
+    for name, stats in (('single', single), ('tiled', tiled)):
+        print(f"{name:<7} {stats['images']} images  {stats['wall_s']:7.2f} s  "
+              f"{stats['read_submits']:4d} submits  {stats['read_polls']:4d} polls  "
+              f"{stats['calls_per_image']:.2f} calls/image")
+    print(f"tiled text identical to single reads for {tiled['same_text']}/{tiled['images']} images")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'config': vars(args), 'single': single, 'tiled': tiled}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""Re-record the OCR fixtures in ocr_texts.json with the real Azure Read service.
+
+Needs AZURE_COMPUTERVISION_KEY / AZURE_COMPUTERVISION_ENDPOINT. Extra images
+can be added to the fixture file with --add:
+
+    python tools/benchmarks/record_ocr_texts.py
+    python tools/benchmarks/record_ocr_texts.py --add data/dyslexic/10.jpg data/non_dyslexic/10.jpg
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(os.path.dirname(BENCH_DIR))
+FIXTURES = os.path.join(BENCH_DIR, 'ocr_texts.json')
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--add', nargs='*', default=[], help="images (relative to the repo root) to add")
+    args = parser.parse_args()
+
+    from app import image_to_text
+
+    with open(FIXTURES, encoding='utf-8') as f:
+        fixtures = json.load(f)
+    known = {sample['image'] for sample in fixtures['samples']}
+    for image in args.add:
+        if image not in known:
+            fixtures['samples'].append({'image': image, 'dyslexic': '/non_dyslexic/' not in image})
+
+    for sample in fixtures['samples']:
+        path = os.path.join(ROOT_DIR, sample['image'])
+        with open(path, 'rb') as f:
+            data = f.read()
+        sample['sha256'] = hashlib.sha256(data).hexdigest()
+        sample['text'] = image_to_text(data)
+        print(f"{sample['image']}: {sample['text'][:60]}...")
+
+    with open(FIXTURES, 'w', encoding='utf-8') as f:
+        json.dump(fixtures, f, indent=2)
+        f.write('\n')
+
+
+if __name__ == '__main__':
+    main()
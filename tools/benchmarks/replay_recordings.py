@@ -0,0 +1,173 @@
+"""Replay recorded production requests through the feature functions offline.
+
+Reads the JSON lines written by backend/recorder.py (RECORD_REQUESTS=1),
+re-runs each case against backend/features.py with Bing Spell Check and
+LanguageTool served by tools/mock_services.py, and prints the replayed
+latency per stage next to what was recorded in production:
+
+    python tools/benchmarks/replay_recordings.py /tmp/dyslexicheck-recordings.jsonl
+    python tools/benchmarks/replay_recordings.py recordings.jsonl --slow-only --promote
+
+--promote appends the replayed cases to tools/benchmarks/replay_cases.json
+(deduplicated), which run_benchmarks.py benchmarks on every run, so slow
+real-world inputs stay in the benchmark suite.
+"""
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(os.path.dirname(BENCH_DIR))
+REPLAY_CASES = os.path.join(BENCH_DIR, 'replay_cases.json')
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'tools'))
+
+import features
+from mock_services import start_mock_services
+
+# Pipeline stage (as recorded by metrics.stage_timer) -> feature function
+TEXT_STAGES = {
+    'spelling_accuracy': 'spelling_accuracy',
+    'grammatical_accuracy': 'gramatical_accuracy',
+    'percentage_of_corrections': 'percentage_of_corrections',
+    'phonetic_accuracy': 'percentage_of_phonetic_accuraccy'
+}
+
+
+def load_recordings(paths):
+    recordings = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    recordings.append(json.loads(line))
+                except json.JSONDecodeError as e:
+                    print(f"Skipping {path}:{line_number}: {e}")
+    return recordings
+
+
+def load_replay_cases(path=REPLAY_CASES):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['cases']
+
+
+def case_id(case):
+    payload = json.dumps({'kind': case['kind'], 'payload': case['payload']}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def replay_case(case, repeat=1):
+    """Median replayed latency (ms) per stage of one recorded request"""
+    kind, payload = case['kind'], case['payload']
+    if kind == 'analyze-image':
+        stages = {stage: [timed(getattr(features, name), payload['text']) for _ in range(repeat)]
+                  for stage, name in TEXT_STAGES.items()}
+    elif kind == 'check-dictation':
+        stages = {'dictation_accuracy': [timed(features.dictation_accuracy, payload['words'], payload['user_input'])
+                                         for _ in range(repeat)]}
+    elif kind == 'check-pronunciation':
+        stages = {'check_pronounciation': [timed(features.check_pronounciation, payload['original'],
+                                                 payload['pronounced']) for _ in range(repeat)]}
+    else:
+        raise ValueError(f"Unknown recording kind {kind}")
+    return {stage: round(statistics.median(timings), 4) for stage, timings in stages.items()}
+
+
+def describe(case):
+    payload = case['payload']
+    if case['kind'] == 'analyze-image':
+        return f"{len(payload['text'].split())} words"
+    if case['kind'] == 'check-dictation':
+        return f"{len(payload['words'])} words"
+    return f"{payload['original']!r}"
+
+
+def promote(cases, path=REPLAY_CASES):
+    existing = load_replay_cases(path)
+    known = {case['id'] for case in existing}
+    added = 0
+    for case in cases:
+        if case['id'] in known:
+            continue
+        known.add(case['id'])
+        existing.append({key: case[key] for key in ('id', 'kind', 'payload', 'recorded_at', 'total_seconds', 'stages')
+                         if key in case})
+        added += 1
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'cases': existing}, f, indent=2)
+        f.write('\n')
+    return added
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('recordings', nargs='+', help="recording files (JSON lines)")
+    parser.add_argument('--slow-only', action='store_true', help="only replay requests recorded as slow")
+    parser.add_argument('--kind', choices=['analyze-image', 'check-dictation', 'check-pronunciation'])
+    parser.add_argument('--repeat', type=int, default=3, help="calls per case")
+    parser.add_argument('--output', help="write the replay results as JSON")
+    parser.add_argument('--promote', action='store_true', help=f"add the replayed cases to {REPLAY_CASES}")
+    args = parser.parse_args()
+
+    cases = load_recordings(args.recordings)
+    if args.slow_only:
+        cases = [case for case in cases if case.get('slow')]
+    if args.kind:
+        cases = [case for case in cases if case['kind'] == args.kind]
+    # The same input recorded several times is replayed once
+    unique = {}
+    for case in cases:
+        case['id'] = case_id(case)
+        unique.setdefault(case['id'], case)
+    cases = list(unique.values())
+    if not cases:
+        sys.exit("No recordings to replay")
+
+    server, base_url = start_mock_services()
+    features.endpoint_textcorrection = base_url + 'v7.0/SpellCheck'
+    # Every call should pay for its spelling correction, not reuse the previous one
+    features.spell_cache.max_size = 0
+    if features.init_language_tool(remote_server=base_url) is None:
+        sys.exit("Could not connect to the LanguageTool stand-in")
+    # Warm-up: TextBlob loads its spelling model on first use
+    features.spelling_accuracy("warm up")
+
+    print(f"Replaying {len(cases)} recordings ({args.repeat} calls each):\n")
+    print(f"{'id':<18}{'kind':<21}{'input':<14}{'recorded s':>11}{'replay ms':>11}  slowest stage")
+    results = []
+    for case in cases:
+        replayed = replay_case(case, args.repeat)
+        slowest = max(replayed, key=replayed.get)
+        total = round(sum(replayed.values()), 4)
+        results.append({'id': case['id'], 'kind': case['kind'], 'recorded_seconds': case.get('total_seconds'),
+                        'recorded_stages': case.get('stages', {}), 'replay_ms': total, 'replay_stages': replayed})
+        print(f"{case['id']:<18}{case['kind']:<21}{describe(case):<14}{case.get('total_seconds', 0):>11.3f}"
+              f"{total:>11.1f}  {slowest} ({replayed[slowest]:.1f} ms)")
+    server.shutdown()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'results': results}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    if args.promote:
+        added = promote(cases)
+        print(f"\nPromoted {added} new case(s) to {REPLAY_CASES}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+"""Offline benchmarks for the handwriting feature pipeline.
+
+Runs the text feature functions from backend/features.py on recorded OCR
+texts (tools/benchmarks/ocr_texts.json), with Bing Spell Check and
+LanguageTool served by the local stand-ins in tools/mock_services.py, so no
+Azure/Bing keys or LanguageTool JVM are needed.
+
+Reports per-function latency on the recorded samples and scaling curves
+over text length, and writes everything to a JSON file that can be compared
+against a previous run. Cases promoted from production recordings by
+replay_recordings.py (replay_cases.json) are benchmarked as well:
+
+    python tools/benchmarks/run_benchmarks.py --output bench_output.json
+    python tools/benchmarks/run_benchmarks.py --output new.json --compare bench_output.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(os.path.dirname(BENCH_DIR))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'tools'))
+
+import features
+from mock_services import start_mock_services
+from replay_recordings import load_replay_cases, replay_case
+
+FEATURE_FUNCTIONS = [
+    'spelling_accuracy',
+    'gramatical_accuracy',
+    'percentage_of_corrections',
+    'percentage_of_phonetic_accuraccy'
+]
+
+DEFAULT_LENGTHS = [10, 25, 50, 100, 200, 400]
+
+
+def load_samples():
+    with open(os.path.join(BENCH_DIR, 'ocr_texts.json'), encoding='utf-8') as f:
+        return json.load(f)['samples']
+
+
+def text_of_length(words, count):
+    """First `count` words of the sample corpus, repeated if needed"""
+    repeated = (words * (count // len(words) + 1))[:count]
+    return " ".join(repeated)
+
+
+def time_call(func, args, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def summarize(timings):
+    ordered = sorted(timings)
+    return {
+        'calls': len(ordered),
+        'mean_ms': round(statistics.fmean(ordered), 4),
+        'median_ms': round(statistics.median(ordered), 4),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+        'min_ms': round(ordered[0], 4)
+    }
+
+
+def bench_samples(samples, repeat):
+    """Latency of each function over the recorded OCR texts"""
+    cases = {name: [(sample['text'],) for sample in samples] for name in FEATURE_FUNCTIONS}
+    cases['levenshtein'] = [(sample['text'], sample['text'][::-1]) for sample in samples]
+    cases['score'] = [(features_of(sample['text']),) for sample in samples]
+
+    results = {}
+    for name, arg_list in cases.items():
+        func = getattr(features, name)
+        timings = []
+        for args in arg_list:
+            timings.extend(time_call(func, args, repeat))
+        results[name] = summarize(timings)
+        print(f"  {name:<36} median {results[name]['median_ms']:10.3f} ms   p95 {results[name]['p95_ms']:10.3f} ms")
+    return results
+
+
+def features_of(text):
+    return [getattr(features, name)(text) for name in FEATURE_FUNCTIONS]
+
+
+def bench_scaling(samples, lengths, repeat):
+    """Median latency of each function as the input grows"""
+    words = " ".join(sample['text'] for sample in samples).split()
+    results = {}
+    for name in FEATURE_FUNCTIONS + ['levenshtein']:
+        func = getattr(features, name)
+        curve = []
+        for count in lengths:
+            text = text_of_length(words, count)
+            args = (text, text[::-1]) if name == 'levenshtein' else (text,)
+            median = statistics.median(time_call(func, args, repeat))
+            curve.append({'words': count, 'chars': len(text), 'median_ms': round(median, 4)})
+        results[name] = curve
+        print(f"  {name:<36} " + "  ".join(f"{p['words']}w:{p['median_ms']:.1f}ms" for p in curve))
+    return results
+
+
+def bench_replay_cases(cases, repeat):
+    """Replayed latency of the production cases promoted to replay_cases.json"""
+    results = {}
+    for case in cases:
+        stages = replay_case(case, repeat)
+        results[case['id']] = {'kind': case['kind'], 'recorded_seconds': case.get('total_seconds'),
+                               'median_ms': round(sum(stages.values()), 4), 'stages': stages}
+        print(f"  {case['id']:<18} {case['kind']:<20} median {results[case['id']]['median_ms']:10.3f} ms")
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline_path):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} ({baseline['meta'].get('git_revision')}), median latency:")
+    latency = dict(current['latency'], **{f"replay:{k}": v for k, v in current.get('replay', {}).items()})
+    old_latency = dict(baseline['latency'], **{f"replay:{k}": v for k, v in baseline.get('replay', {}).items()})
+    for name, stats in latency.items():
+        old = old_latency.get(name)
+        if not old:
+            continue
+        ratio = stats['median_ms'] / old['median_ms'] if old['median_ms'] else float('inf')
+        flag = "  <-- slower" if ratio > 1.1 else ""
+        print(f"  {name:<36} {old['median_ms']:10.3f} -> {stats['median_ms']:10.3f} ms  ({ratio:5.2f}x){flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default='bench_output.json', help="where to write the JSON results")
+    parser.add_argument('--compare', help="previous results file to compare against")
+    parser.add_argument('--repeat', type=int, default=5, help="calls per input")
+    parser.add_argument('--lengths', type=int, nargs='+', default=DEFAULT_LENGTHS,
+                        help="text lengths (in words) for the scaling curves")
+    parser.add_argument('--bing-latency', type=float, default=0.0, help="added stand-in latency (s)")
+    parser.add_argument('--languagetool-latency', type=float, default=0.0, help="added stand-in latency (s)")
+    args = parser.parse_args()
+
+    server, base_url = start_mock_services(latency={'bing': args.bing_latency,
+                                                    'languagetool': args.languagetool_latency})
+    features.endpoint_textcorrection = base_url + 'v7.0/SpellCheck'
+    # Every call should pay for its spelling correction, not reuse the previous one
+    features.spell_cache.max_size = 0
+    if features.init_language_tool(remote_server=base_url) is None:
+        sys.exit("Could not connect to the LanguageTool stand-in")
+
+    samples = load_samples()
+    # Warm-up: TextBlob loads its spelling model on first use
+    features_of(samples[0]['text'])
+
+    print(f"Latency over {len(samples)} recorded samples ({args.repeat} calls each):")
+    latency = bench_samples(samples, args.repeat)
+    print("\nScaling over text length:")
+    scaling = bench_scaling(samples, args.lengths, args.repeat)
+    replay_cases = load_replay_cases()
+    replay = {}
+    if replay_cases:
+        print(f"\nReplayed production cases ({len(replay_cases)}):")
+        replay = bench_replay_cases(replay_cases, args.repeat)
+    server.shutdown()
+
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+            'samples': len(samples),
+            'replay_cases': len(replay_cases)
+        },
+        'latency': latency,
+        'scaling': scaling,
+        'replay': replay
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+"""Load generator for the Flask API.
+
+Drives a running backend with a weighted mix of routes from a pool of
+concurrent clients and reports throughput, p50/p95/p99 latency and error
+rate per route. The request shapes follow tools/DysLexiCheck.postman_collection.json.
+
+Typical setup (three terminals):
+
+    python tools/mock_services.py --port 8900 --ocr-processing-latency 1.5 --bing-latency 0.2
+    AZURE_COMPUTERVISION_ENDPOINT=http://127.0.0.1:8900/ \\
+    BING_SPELLCHECK_ENDPOINT=http://127.0.0.1:8900/v7.0/SpellCheck \\
+    LANGUAGETOOL_SERVER=http://127.0.0.1:8900/ \\
+    DB_PASSWORD=rootpassword python backend/app.py
+    python tools/loadtest.py --url http://localhost:5000 --mix classroom --concurrency 20 --duration 60
+
+The user/history routes need MySQL (e.g. docker-compose.mysql-replica.yml).
+Use --mix screening for an analysis-heavy run, or --output to keep the
+report as JSON.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict
+
+import requests
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Relative route weights for each traffic mix
+MIXES = {
+    # A class working through the tests: mostly word lists and checks, some uploads
+    'classroom': {
+        'analyze-image': 1,
+        'get-words': 4,
+        'check-pronunciation': 4,
+        'check-dictation': 3,
+        'login': 1,
+        'history': 1
+    },
+    # Screening day: handwriting uploads dominate
+    'screening': {
+        'analyze-image': 6,
+        'get-words': 1,
+        'check-pronunciation': 1,
+        'check-dictation': 1,
+        'history': 1
+    },
+    # Teachers and admins reviewing results
+    'review': {
+        'login': 2,
+        'history': 4,
+        'results': 1,
+        'stats': 2
+    }
+}
+
+SAMPLE_WORDS = ["apple", "banana", "cat", "dog", "elephant", "fish", "giraffe", "house", "ice", "jacket"]
+MISSPELLINGS = {"apple": "aple", "banana": "banan", "elephant": "elefant", "giraffe": "jiraf", "jacket": "jaket"}
+
+
+def load_images():
+    with open(os.path.join(ROOT_DIR, 'tools', 'benchmarks', 'ocr_texts.json'), encoding='utf-8') as f:
+        samples = json.load(f)['samples']
+    images = []
+    for sample in samples:
+        with open(os.path.join(ROOT_DIR, sample['image']), 'rb') as f:
+            images.append((os.path.basename(sample['image']), f.read()))
+    return images
+
+
+class Scenario:
+    """Builds one request per route name; shared by all client threads"""
+
+    def __init__(self, url, images, timeout):
+        self.url = url
+        self.images = images
+        self.timeout = timeout
+        self.user = None
+
+    def setup(self, session):
+        """Create a user for the login/history routes (skipped if MySQL is not available)"""
+        name = f"loadtest-{int(time.time())}"
+        try:
+            response = session.post(f"{self.url}/api/users", json={'name': name, 'age': 9, 'grade': '2nd-4th'},
+                                    timeout=self.timeout)
+            if response.ok:
+                self.user = {'name': name, 'id': response.json()['user_id']}
+        except requests.RequestException:
+            pass
+        return self.user is not None
+
+    def request(self, session, route):
+        url = self.url
+        if route == 'analyze-image':
+            filename, data = random.choice(self.images)
+            return session.post(f"{url}/api/analyze-image", files={'file': (filename, data, 'image/jpeg')},
+                                timeout=self.timeout)
+        if route == 'get-words':
+            return session.get(f"{url}/api/get-words", params={'level': random.choice([1, 2])},
+                               timeout=self.timeout)
+        if route == 'check-pronunciation':
+            word = random.choice(SAMPLE_WORDS)
+            return session.post(f"{url}/api/check-pronunciation",
+                                json={'original': word, 'pronounced': MISSPELLINGS.get(word, word)},
+                                timeout=self.timeout)
+        if route == 'check-dictation':
+            words = random.sample(SAMPLE_WORDS, 5)
+            return session.post(f"{url}/api/check-dictation",
+                                json={'words': words, 'user_input': [MISSPELLINGS.get(w, w) for w in words]},
+                                timeout=self.timeout)
+        if route == 'login':
+            return session.post(f"{url}/api/login", json={'name': self.user['name']}, timeout=self.timeout)
+        if route == 'history':
+            return session.get(f"{url}/api/users/{self.user['id']}/history", timeout=self.timeout)
+        if route == 'results':
+            return session.get(f"{url}/api/results", timeout=self.timeout)
+        if route == 'stats':
+            return session.get(f"{url}/api/stats", timeout=self.timeout)
+        raise ValueError(f"Unknown route {route}")
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.status_codes = defaultdict(lambda: defaultdict(int))
+
+    def record(self, route, seconds, status):
+        with self.lock:
+            self.latencies[route].append(seconds)
+            self.status_codes[route][status] += 1
+            if not isinstance(status, int) or status >= 400:
+                self.errors[route] += 1
+
+
+def percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def client_loop(scenario, routes, weights, recorder, deadline):
+    session = requests.Session()
+    while time.monotonic() < deadline:
+        route = random.choices(routes, weights)[0]
+        start = time.perf_counter()
+        try:
+            response = scenario.request(session, route)
+            status = response.status_code
+        except requests.RequestException as e:
+            status = type(e).__name__
+        recorder.record(route, time.perf_counter() - start, status)
+
+
+def build_report(recorder, elapsed, args):
+    routes = {}
+    total = 0
+    for route, latencies in sorted(recorder.latencies.items()):
+        ordered = sorted(latencies)
+        total += len(ordered)
+        routes[route] = {
+            'requests': len(ordered),
+            'throughput_rps': round(len(ordered) / elapsed, 3),
+            'p50_ms': round(percentile(ordered, 50) * 1000, 2),
+            'p95_ms': round(percentile(ordered, 95) * 1000, 2),
+            'p99_ms': round(percentile(ordered, 99) * 1000, 2),
+            'mean_ms': round(statistics.fmean(ordered) * 1000, 2),
+            'error_rate': round(recorder.errors[route] / len(ordered), 4),
+            'status_codes': {str(k): v for k, v in recorder.status_codes[route].items()}
+        }
+    return {
+        'url': args.url,
+        'mix': args.mix,
+        'concurrency': args.concurrency,
+        'duration_s': round(elapsed, 2),
+        'total_requests': total,
+        'throughput_rps': round(total / elapsed, 3),
+        'routes': routes
+    }
+
+
+def print_report(report):
+    print(f"\n{report['total_requests']} requests in {report['duration_s']}s "
+          f"({report['throughput_rps']} req/s, mix={report['mix']}, concurrency={report['concurrency']})\n")
+    print(f"{'route':<22}{'reqs':>7}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>9}")
+    for route, stats in report['routes'].items():
+        print(f"{route:<22}{stats['requests']:>7}{stats['throughput_rps']:>9.2f}{stats['p50_ms']:>10.1f}"
+              f"{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}{stats['error_rate']:>8.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--mix', choices=sorted(MIXES), default='classroom')
+    parser.add_argument('--concurrency', type=int, default=10, help="concurrent clients")
+    parser.add_argument('--duration', type=float, default=30, help="seconds")
+    parser.add_argument('--timeout', type=float, default=120, help="per-request timeout (s)")
+    parser.add_argument('--seed', type=int, help="random seed for a reproducible request sequence")
+    parser.add_argument('--output', help="write the report as JSON")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    args.url = args.url.rstrip('/')
+
+    scenario = Scenario(args.url, load_images(), args.timeout)
+    mix = dict(MIXES[args.mix])
+    if not scenario.setup(requests.Session()):
+        dropped = [route for route in ('login', 'history') if route in mix]
+        if dropped:
+            print(f"Could not create a test user (is MySQL up?), skipping {', '.join(dropped)}")
+        for route in dropped:
+            del mix[route]
+
+    routes, weights = list(mix), list(mix.values())
+    recorder = Recorder()
+    start = time.monotonic()
+    deadline = start + args.duration
+    threads = [threading.Thread(target=client_loop, args=(scenario, routes, weights, recorder, deadline))
+               for _ in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    report = build_report(recorder, time.monotonic() - start, args)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+    sys.exit(0 if report['total_requests'] else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,391 @@
+"""Local stand-ins for the external services used by the backend.
+
+Serves, on one port:
+  - Azure Read (v3.2):    POST /vision/v3.2/read/analyze, GET /vision/v3.2/read/analyzeResults/<id>
+  - Bing Spell Check:     POST /v7.0/SpellCheck
+  - LanguageTool HTTP:    GET /v2/languages, GET|POST /v2/check
+
+OCR results come from tools/benchmarks/ocr_texts.json (matched by the
+SHA-256 of the uploaded image, anything else gets a fixed default text).
+Other images get the text of the fixture they look like (average hash, so
+preprocessed fixtures are still recognised). Composites of several images
+stacked with white gutters (backend/tiling.py) get one line per tile at the
+tile's position, recognised the same way, so tiled reads can be checked
+against single ones.
+Bing flags tokens missing from TextBlob's word list. LanguageTool only
+applies two cheap rules (sentence start capitalisation and lone "i").
+
+    python tools/mock_services.py --port 8900
+
+then point the backend at it:
+
+    AZURE_COMPUTERVISION_ENDPOINT=http://127.0.0.1:8900/
+    BING_SPELLCHECK_ENDPOINT=http://127.0.0.1:8900/v7.0/SpellCheck
+    LANGUAGETOOL_SERVER=http://127.0.0.1:8900/
+"""
+import argparse
+import hashlib
+import io
+import itertools
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OCR_FIXTURES = os.path.join(ROOT_DIR, 'tools', 'benchmarks', 'ocr_texts.json')
+DEFAULT_OCR_TEXT = "the quick brown fox jumps over the lazy dog"
+# Minimum white rows above and between the tiles of a composite (backend/tiling.py uses 60)
+COMPOSITE_GUTTER = 50
+
+# Added service latency in seconds. For Azure Read, ocr_processing is how long
+# an operation reports "running" before it succeeds. With tail_probability > 0
+# a call is slowed down by an extra tail_latency seconds with that probability
+# (applied to every latency above), to model a long-tailed service.
+DEFAULT_LATENCY = {
+    'ocr_submit': 0.0,
+    'ocr_processing': 0.0,
+    'ocr_poll': 0.0,
+    'bing': 0.0,
+    'languagetool': 0.0,
+    'tail_latency': 0.0,
+    'tail_probability': 0.0
+}
+
+
+def load_ocr_fixtures(path=OCR_FIXTURES):
+    with open(path, encoding='utf-8') as f:
+        samples = json.load(f)['samples']
+    return {sample['sha256']: sample['text'] for sample in samples}
+
+
+def load_known_words():
+    """Word list for the Bing stand-in (TextBlob's spelling model, else the bundled vocabularies)"""
+    words = set()
+    try:
+        import textblob
+        path = os.path.join(os.path.dirname(textblob.__file__), 'en', 'en-spelling.txt')
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line and not line.startswith(';;;'):
+                    words.add(line.split(' ', 1)[0].lower())
+    except (ImportError, OSError):
+        for name in ('elementary_voc.csv', 'intermediate_voc.csv'):
+            with open(os.path.join(ROOT_DIR, 'data', name), encoding='utf-8-sig') as f:
+                words.update(line.strip().lower() for line in f)
+    return words
+
+
+class MockState:
+    def __init__(self, latency=None):
+        self.latency = dict(DEFAULT_LATENCY, **(latency or {}))
+        self.ocr_texts = load_ocr_fixtures()
+        self.known_words = load_known_words()
+        self.operations = {}
+        self.operation_ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.calls = {'ocr_submit': 0, 'ocr_poll': 0, 'bing': 0, 'languagetool': 0}
+        self.hashes = None
+
+    def tile_hashes(self):
+        with self.lock:
+            if self.hashes is None:
+                self.hashes = fixture_hashes()
+            return self.hashes
+
+    def count(self, name):
+        with self.lock:
+            self.calls[name] += 1
+
+    def sample_latency(self, name):
+        seconds = self.latency.get(name, 0.0)
+        if self.latency['tail_probability'] > 0 and random.random() < self.latency['tail_probability']:
+            seconds += self.latency['tail_latency']
+        return seconds
+
+    def delay(self, name):
+        seconds = self.sample_latency(name)
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+def average_hash(image):
+    """Perceptual hash of the image cropped to its ink, so a tile hashes like its source image"""
+    image = image.convert('L')
+    box = image.point(lambda pixel: 0 if pixel >= 200 else 255).getbbox()
+    if box:
+        image = image.crop(box)
+    small = image.resize((16, 16))
+    pixels = list(small.getdata())
+    mean = sum(pixels) / len(pixels)
+    return sum(1 << bit for bit, pixel in enumerate(pixels) if pixel > mean)
+
+
+def fixture_hashes():
+    """{average hash: text} of the fixture images"""
+    from PIL import Image
+
+    with open(OCR_FIXTURES, encoding='utf-8') as f:
+        samples = json.load(f)['samples']
+    hashes = {}
+    for sample in samples:
+        with Image.open(os.path.join(ROOT_DIR, sample['image'])) as image:
+            hashes[average_hash(image)] = sample['text']
+    return hashes
+
+
+def white_runs_split(values, min_gap):
+    """[(start, end)] runs of False in values separated by at least min_gap True values"""
+    runs, start, gap = [], None, 0
+    for position, white in enumerate(values):
+        if not white:
+            if start is None:
+                start = position
+            elif gap >= min_gap:
+                runs.append((start, end))
+                start = position
+            end, gap = position + 1, 0
+        else:
+            gap += 1
+    if start is not None:
+        runs.append((start, end))
+    return runs
+
+
+def composite_lines(body, hashes):
+    """[(text, bounding box)] per tile if body is a composite of stacked images, else None"""
+    try:
+        from PIL import Image
+        image = Image.open(io.BytesIO(body)).convert('L')
+    except Exception:
+        return None
+    width, height = image.size
+    # 255 for ink, 0 for (near) white
+    ink = image.point(lambda pixel: 0 if pixel >= 245 else 255)
+    data = ink.tobytes()
+    white_rows = [data.find(b'\xff', y * width, (y + 1) * width) < 0 for y in range(height)]
+    # Composites start with a white gutter and separate tiles with at least one more
+    if not all(white_rows[:COMPOSITE_GUTTER]):
+        return None
+    bands = white_runs_split(white_rows, COMPOSITE_GUTTER)
+    if len(bands) < 2:
+        return None
+    lines = []
+    for top, bottom in bands:
+        left, _, right, _ = ink.crop((0, top, width, bottom)).getbbox()
+        text = similar_fixture_text(image.crop((left, top, right, bottom)), hashes)
+        lines.append((text, [left, top, right, top, right, bottom, left, bottom]))
+    return lines
+
+
+def similar_fixture_text(image, hashes):
+    """Text of the fixture image that looks like `image` (e.g. after preprocessing), else the default"""
+    image_hash = average_hash(image)
+    nearest = min(hashes, key=lambda known: bin(known ^ image_hash).count('1'), default=None)
+    if nearest is not None and bin(nearest ^ image_hash).count('1') <= 16:
+        return hashes[nearest]
+    return DEFAULT_OCR_TEXT
+
+
+def recognise(body, hashes):
+    """OCR text (or [(text, box)] lines for a composite) for an uploaded image that is not a fixture"""
+    lines = composite_lines(body, hashes)
+    if lines is not None:
+        return lines
+    try:
+        from PIL import Image
+        with Image.open(io.BytesIO(body)) as image:
+            return similar_fixture_text(image, hashes)
+    except Exception:
+        return DEFAULT_OCR_TEXT
+
+
+def read_result(text, width=1000, height=200, tile_lines=None):
+    """Azure Read analyzeResult with one line per sentence (or the given (text, box) lines)"""
+    if tile_lines is not None:
+        lines = [{'boundingBox': box, 'text': line, 'words': [{'boundingBox': box, 'text': word, 'confidence': 0.9}
+                                                             for word in line.split()]}
+                 for line, box in tile_lines]
+        return {'version': '3.2.0', 'modelVersion': '2021-04-12',
+                'readResults': [{'page': 1, 'angle': 0, 'width': width, 'height': height, 'unit': 'pixel',
+                                 'lines': lines}]}
+    lines = []
+    for index, sentence in enumerate(s for s in re.split(r'(?<=[.!?])\s+', text) if s):
+        top = 10 + index * 40
+        box = [10, top, width - 10, top, width - 10, top + 30, 10, top + 30]
+        lines.append({
+            'boundingBox': box,
+            'text': sentence,
+            'words': [{'boundingBox': box, 'text': word, 'confidence': 0.9} for word in sentence.split()]
+        })
+    return {
+        'version': '3.2.0',
+        'modelVersion': '2021-04-12',
+        'readResults': [{'page': 1, 'angle': 0, 'width': width, 'height': height, 'unit': 'pixel', 'lines': lines}]
+    }
+
+
+def languagetool_matches(text):
+    matches = []
+    rules = [
+        (re.compile(r'(?:^|[.!?]\s+)([a-z])'), 'UPPERCASE_SENTENCE_START', lambda m: m.group(1).upper()),
+        (re.compile(r'\b(i)\b'), 'I_LOWERCASE', lambda m: 'I')
+    ]
+    for pattern, rule_id, fix in rules:
+        for match in pattern.finditer(text):
+            offset = match.start(1)
+            matches.append({
+                'message': 'Possible typo',
+                'shortMessage': '',
+                'replacements': [{'value': fix(match)}],
+                'offset': offset,
+                'length': 1,
+                'context': {'text': text, 'offset': offset, 'length': 1},
+                'sentence': text,
+                'rule': {'id': rule_id, 'description': rule_id, 'issueType': 'typographical',
+                         'category': {'id': 'CASING', 'name': 'Capitalization'}}
+            })
+    return sorted(matches, key=lambda m: m['offset'])
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, payload, status=200, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_body(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            # The Azure SDK streams uploads with chunked encoding
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b';', 1)[0], 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return b''.join(chunks)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.startswith('/vision/v3.2/read/analyzeResults/'):
+            return self.ocr_poll(url.path.rsplit('/', 1)[-1])
+        if url.path == '/v2/languages':
+            return self.send_json([{'name': 'English (US)', 'code': 'en', 'longCode': 'en-US'}])
+        if url.path == '/v2/check':
+            return self.languagetool_check(parse_qs(url.query))
+        if url.path == '/health':
+            return self.send_json({'status': 'ok', 'calls': self.state.calls})
+        self.send_json({'error': 'not found'}, 404)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = self.read_body()
+        if url.path == '/vision/v3.2/read/analyze':
+            return self.ocr_submit(body)
+        if url.path == '/v7.0/SpellCheck':
+            return self.bing_spellcheck(body)
+        if url.path == '/v2/check':
+            return self.languagetool_check(parse_qs(body.decode('utf-8')))
+        self.send_json({'error': 'not found'}, 404)
+
+    def ocr_submit(self, body):
+        state = self.state
+        state.count('ocr_submit')
+        state.delay('ocr_submit')
+        text = state.ocr_texts.get(hashlib.sha256(body).hexdigest())
+        if text is None:
+            text = recognise(body, state.tile_hashes())
+        with state.lock:
+            operation_id = f"mock-{next(state.operation_ids)}"
+            state.operations[operation_id] = (time.monotonic() + state.sample_latency('ocr_processing'), text)
+        location = f"http://{self.headers.get('Host')}/vision/v3.2/read/analyzeResults/{operation_id}"
+        self.send_response(202)
+        self.send_header('Operation-Location', location)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def ocr_poll(self, operation_id):
+        state = self.state
+        state.count('ocr_poll')
+        state.delay('ocr_poll')
+        operation = state.operations.get(operation_id)
+        if operation is None:
+            return self.send_json({'error': {'code': 'NotFound', 'message': 'Operation not found'}}, 404)
+        ready_at, text = operation
+        now = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+        if time.monotonic() < ready_at:
+            return self.send_json({'status': 'running', 'createdDateTime': now, 'lastUpdatedDateTime': now})
+        result = read_result(text) if isinstance(text, str) else read_result(None, tile_lines=text)
+        self.send_json({'status': 'succeeded', 'createdDateTime': now, 'lastUpdatedDateTime': now,
+                        'analyzeResult': result})
+
+    def bing_spellcheck(self, body):
+        state = self.state
+        state.count('bing')
+        state.delay('bing')
+        text = parse_qs(body.decode('utf-8')).get('text', [''])[0]
+        flagged = []
+        for match in re.finditer(r"[A-Za-z']+", text):
+            token = match.group(0)
+            if token.lower() not in state.known_words:
+                flagged.append({'offset': match.start(), 'token': token, 'type': 'UnknownToken',
+                                'suggestions': []})
+        self.send_json({'_type': 'SpellCheck', 'flaggedTokens': flagged})
+
+    def languagetool_check(self, params):
+        state = self.state
+        state.count('languagetool')
+        state.delay('languagetool')
+        text = params.get('text', [''])[0]
+        self.send_json({'matches': languagetool_matches(text)})
+
+
+def start_mock_services(host='127.0.0.1', port=0, latency=None):
+    """Start the stand-ins on a background thread, returning (server, base_url)"""
+    handler = type('BoundMockHandler', (MockHandler,), {'state': MockState(latency)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}/"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    for name, default in DEFAULT_LATENCY.items():
+        flag = name.replace('_', '-') if name.startswith('tail_') else f"{name.replace('_', '-')}-latency"
+        parser.add_argument(f"--{flag}", type=float, default=default, dest=name)
+    args = parser.parse_args()
+
+    latency = {name: getattr(args, name) for name in DEFAULT_LATENCY}
+    server, base_url = start_mock_services(args.host, args.port, latency)
+    print(f"Mock services listening on {base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+-- Replication account (not replicated itself)
+SET SESSION sql_log_bin = 0;
+CREATE USER 'repl'@'%' IDENTIFIED WITH mysql_native_password BY 'repl';
+GRANT REPLICATION SLAVE ON *.* TO 'repl'@'%';
+SET SESSION sql_log_bin = 1;
+
+-- Schema from backend/database.py init_database(), replicated to the replica
+CREATE DATABASE IF NOT EXISTS dyslexia_db;
+USE dyslexia_db;
+
+CREATE TABLE IF NOT EXISTS users (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    name VARCHAR(255),
+    age INT,
+    grade VARCHAR(50),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS test_results (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT,
+    test_type ENUM('handwriting', 'pronunciation', 'dictation'),
+    score FLOAT,
+    prediction VARCHAR(100),
+    confidence FLOAT,
+    details JSON,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
@@ -0,0 +1,10 @@
+-- Follow the primary using GTID auto-positioning; the IO thread keeps
+-- retrying until mysql-primary accepts connections
+CHANGE REPLICATION SOURCE TO
+    SOURCE_HOST = 'mysql-primary',
+    SOURCE_PORT = 3306,
+    SOURCE_USER = 'repl',
+    SOURCE_PASSWORD = 'repl',
+    SOURCE_AUTO_POSITION = 1,
+    SOURCE_CONNECT_RETRY = 5;
+START REPLICA;
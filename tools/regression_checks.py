@@ -0,0 +1,686 @@
+"""Regression checks for bugs fixed in the backend, run offline.
+
+Each check exercises one fixed behaviour against local stand-ins (no Azure,
+Bing or MySQL needed) and fails with an AssertionError if it regressed:
+
+    python tools/regression_checks.py                 # all checks
+    python tools/regression_checks.py budget_cut_call_spares_breaker
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(TOOLS_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+sys.path.insert(0, TOOLS_DIR)
+
+CHECKS = {}
+
+
+def check(func):
+    CHECKS[func.__name__] = func
+    return func
+
+
+class StalledBodyHandler(BaseHTTPRequestHandler):
+    """Sends the status line and headers at once, then the body after a second"""
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.flush()
+        time.sleep(1)
+        self.wfile.write(b'{}')
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(handler):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+@check
+def budget_cut_call_spares_breaker():
+    """A read cut short by the latency budget (even mid-body) raises BudgetExceeded, not a breaker failure"""
+    import budget
+    import http_client
+
+    server, url = start_server(StalledBodyHandler)
+    breaker = http_client.get_breaker('regression_stalled')
+    try:
+        for seconds in (0.05, 0.2):
+            calls = list(breaker.calls)
+            try:
+                with budget.deadline(seconds):
+                    http_client.request('regression_stalled', 'GET', url)
+            except budget.BudgetExceeded:
+                pass
+            else:
+                raise AssertionError("the stalled call finished within its budget")
+            assert list(breaker.calls) == calls, f"breaker recorded {breaker.calls}"
+            assert breaker.state == 'closed'
+    finally:
+        server.shutdown()
+
+
+class BadEncodingHandler(BaseHTTPRequestHandler):
+    """Answers 200 with a body that claims to be gzip but is not"""
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', '9')
+        self.end_headers()
+        self.wfile.write(b'not gzip!')
+
+    def log_message(self, *args):
+        pass
+
+
+@check
+def half_open_breaker_recovers_from_any_error():
+    """A half-open trial that fails with a non-transport error (bad body encoding) does not wedge the breaker"""
+    import asyncio
+
+    import http_client
+
+    async def request_async(service, url):
+        try:
+            await http_client.request_async(service, 'GET', url)
+        finally:
+            await http_client.close_async_client()
+
+    server, url = start_server(BadEncodingHandler)
+    cooldown = http_client.BREAKER_CONFIG['cooldown']
+    http_client.BREAKER_CONFIG['cooldown'] = 0
+    try:
+        for variant in ('sync', 'async'):
+            service = f'regression_encoding_{variant}'
+            http_client.breakers.pop(service, None)
+            http_client.get_breaker(service).trip(time.monotonic())
+            for _ in range(2):
+                try:
+                    if variant == 'sync':
+                        http_client.request(service, 'GET', url)
+                    else:
+                        asyncio.run(request_async(service, url))
+                except http_client.CircuitOpenError:
+                    raise AssertionError(f"{variant}: the breaker stayed stuck after a failed trial")
+                except Exception:
+                    pass
+            assert not http_client.get_breaker(service).trial_in_flight
+    finally:
+        http_client.BREAKER_CONFIG['cooldown'] = cooldown
+        server.shutdown()
+
+
+def use_mock_services(**latency):
+    """Point the OCR and spell-check clients at fresh stand-ins; returns the server"""
+    import features
+    import ocr_client
+    from mock_services import start_mock_services
+
+    server, url = start_mock_services(latency=latency)
+    ocr_client.OCR_CONFIG.update({'endpoint': url, 'poll_interval': 0.1, 'hedge': False})
+    features.endpoint_textcorrection = url + 'v7.0/SpellCheck'
+    features.init_language_tool(remote_server=url)
+    return server
+
+
+def sample_image(name='dyslexic/1.jpg'):
+    with open(os.path.join(ROOT_DIR, 'data', name), 'rb') as f:
+        return f.read()
+
+
+@check
+def shared_analysis_respects_each_budget():
+    """Requests sharing an in-flight analysis wait only for their own budget and get no cut-short result"""
+    import app
+    import budget
+
+    server = use_mock_services(ocr_processing=1.5)
+    data = sample_image()
+
+    def analyse(seconds, outcomes, delay=0):
+        time.sleep(delay)
+        start = time.monotonic()
+        try:
+            with budget.deadline(seconds):
+                outcome = app.get_feature_array(data)[2]  # degraded stages
+        except budget.BudgetExceeded:
+            outcome = 'budget exceeded'
+        outcomes.append((seconds, outcome, time.monotonic() - start))
+
+    try:
+        # A short budget does not wait for a long one's analysis...
+        outcomes = []
+        threads = [threading.Thread(target=analyse, args=(20, outcomes)),
+                   threading.Thread(target=analyse, args=(0.5, outcomes, 0.1))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        short = next(outcome for outcome in outcomes if outcome[0] == 0.5)
+        assert short[1] == 'budget exceeded' and short[2] < 1.0, outcomes
+
+        # ...and a long budget does not inherit a short one's cut-short analysis
+        outcomes = []
+        threads = [threading.Thread(target=analyse, args=(0.5, outcomes)),
+                   threading.Thread(target=analyse, args=(20, outcomes, 0.1))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        long = next(outcome for outcome in outcomes if outcome[0] == 20)
+        assert long[1] == [], outcomes
+    finally:
+        server.shutdown()
+
+
+@check
+def profile_includes_stage_threads():
+    """A profiled analyze-image request shows the feature stages that ran on the stage thread pool"""
+    import io
+    import pstats
+
+    import app
+    import features
+    import profiler
+
+    server = use_mock_services()
+    profiler.PROFILER_CONFIG['enabled'] = True
+    features.spell_cache.clear()
+    client = app.app.test_client()
+    try:
+        for mode in profiler.PROFILE_MODES:
+            response = client.post('/api/analyze-image', headers={'X-Profile': mode},
+                                   data={'file': (io.BytesIO(sample_image('dyslexic/2.jpg')), 'sample.jpg')})
+            assert response.status_code == 200, response.get_json()
+            path = profiler.profile_path(response.headers['X-Profile-Id'])
+            if mode == 'cprofile':
+                functions = {name for _, _, name in pstats.Stats(path).stats}
+            else:
+                with open(path, encoding='utf-8') as f:
+                    functions = {frame.split(' ')[0] for line in f for frame in line.rsplit(' ', 1)[0].split(';')}
+            missing = {'percentage_of_phonetic_accuraccy', 'gramatical_accuracy'} - functions
+            assert not missing, f"{mode} profile lacks {missing}"
+            features.spell_cache.clear()
+    finally:
+        profiler.PROFILER_CONFIG['enabled'] = False
+        server.shutdown()
+
+
+@check
+def mpo_jpeg_is_one_page():
+    """A camera MPO JPEG (image plus preview frame) is one page; GIF frames are still pages"""
+    import io
+
+    from PIL import Image
+
+    import tiling
+    from documents import iter_pages
+
+    with Image.open(io.BytesIO(sample_image())) as image:
+        photo = image.convert('RGB')
+    preview = photo.resize((photo.width // 4, photo.height // 4))
+
+    mpo = io.BytesIO()
+    photo.save(mpo, format='MPO', save_all=True, append_images=[preview])
+    with Image.open(io.BytesIO(mpo.getvalue())) as image:
+        assert (image.format, image.n_frames) == ('MPO', 2)
+    count, pages = iter_pages(mpo.getvalue())
+    assert count == 1 and len(list(pages)) == 1, f"MPO split into {count} pages"
+    small = io.BytesIO()
+    preview.save(small, format='MPO', save_all=True, append_images=[preview.resize((40, 30))])
+    assert tiling.load_tile(small.getvalue()) is not None, "small MPO not tiled"
+
+    gif = io.BytesIO()
+    photo.convert('L').save(gif, format='GIF', save_all=True, append_images=[preview.convert('L').resize(photo.size)])
+    count, pages = iter_pages(gif.getvalue())
+    assert count == 2 and len(list(pages)) == 2, f"GIF gave {count} pages"
+
+
+class UnavailableHandler(BaseHTTPRequestHandler):
+    """Answers every request with 503 Service Unavailable"""
+
+    def do_POST(self):
+        self.send_response(503)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    do_GET = do_POST
+
+    def log_message(self, *args):
+        pass
+
+
+@check
+def asgi_outbound_calls_share_breakers_and_fallbacks():
+    """The ASGI routes call Azure Read and Bing through http_client (breakers, retries) and fall back like Flask"""
+    import asyncio
+
+    import asgi
+    import features
+    import http_client
+    import ocr_client
+
+    mock = use_mock_services()
+    bing, url = start_server(UnavailableHandler)
+    features.endpoint_textcorrection = url + 'v7.0/SpellCheck'
+    text = 'Ths sentense has sum mistakes in it'
+
+    async def run():
+        try:
+            corrections = await asgi.percentage_of_corrections(text)
+            extracted_text = await asgi.image_to_text(sample_image())
+            read_breaker.trip(time.monotonic())
+            try:
+                await asgi.image_to_text(sample_image())
+            except http_client.CircuitOpenError:
+                pass
+            else:
+                assert ocr_client.load_tesseract.get() is not None, "Azure Read bypassed its open breaker"
+        finally:
+            http_client.breakers.pop('azure_read', None)
+            await http_client.close_async_client()
+        return corrections, extracted_text
+
+    for service in ('azure_read', 'bing_spellcheck'):
+        http_client.breakers.pop(service, None)
+    read_breaker = http_client.get_breaker('azure_read')
+    try:
+        retried = http_client.retries.values.get(('bing_spellcheck',), 0)
+        corrections, extracted_text = asyncio.run(run())
+        assert extracted_text, "no text read"
+        assert http_client.retries.values.get(('bing_spellcheck',), 0) > retried, "Bing was not retried"
+        expected = features.local_percentage_of_corrections(text)
+        assert corrections == expected == features.percentage_of_corrections(text), (corrections, expected)
+    finally:
+        bing.shutdown()
+        mock.shutdown()
+
+
+@check
+def shared_language_tool_outlives_workers():
+    """The LanguageTool server the gunicorn master shares survives its client object and exiting workers"""
+    import atexit
+    import gc
+    import subprocess
+
+    from language_tool_python import server
+
+    import features
+
+    def start_local_server(tool):
+        # A stand-in for the JVM (no java needed)
+        tool._server = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(600)'])
+        server.RUNNING_SERVER_PROCESSES.append(tool._server)
+
+    patched = {'_start_local_server': start_local_server, '_get_languages': lambda tool: {'en-US'}}
+    originals = {name: getattr(server.LanguageTool, name) for name in patched}
+    for name, replacement in patched.items():
+        setattr(server.LanguageTool, name, replacement)
+    try:
+        url = features.start_language_tool_server()
+        process = features.language_tool_server
+        assert url.startswith('http://'), url
+        gc.collect()
+        assert process.poll() is None, "closing the master's client stopped the shared LanguageTool server"
+        pid = os.fork()
+        if pid == 0:
+            # A worker exiting, e.g. recycled after max_requests
+            atexit._run_exitfuncs()
+            os._exit(0)
+        os.waitpid(pid, 0)
+        time.sleep(0.2)
+        assert process.poll() is None, "a worker's exit stopped the shared LanguageTool server"
+        features.stop_language_tool_server()
+        assert process.poll() is not None
+    finally:
+        for name, original in originals.items():
+            setattr(server.LanguageTool, name, original)
+        features.stop_language_tool_server()
+
+
+@check
+def failed_export_is_not_a_complete_file():
+    """A results export that loses the database fails loudly instead of producing a short, valid file"""
+    import contextlib
+    import tempfile
+
+    import pyarrow as pa
+    import pyarrow.parquet
+    from mysql.connector import Error
+
+    import app
+    import database
+    import export_results
+
+    @contextlib.contextmanager
+    def unreachable_database():
+        saved = dict(database.DB_CONFIG)
+        database.DB_CONFIG.update({'host': '127.0.0.1', 'port': 1, 'connection_timeout': 2})
+        try:
+            yield
+        finally:
+            database.DB_CONFIG.clear()
+            database.DB_CONFIG.update(saved)
+
+    # Database unreachable: the CLI exits non-zero and writes no file; the route answers 500
+    output = os.path.join(tempfile.mkdtemp(), 'results.parquet')
+    argv, sys.argv = sys.argv, ['export_results.py', '--output', output]
+    try:
+        with unreachable_database():
+            export_results.main()
+    except SystemExit as e:
+        assert e.code not in (None, 0), e.code
+    else:
+        raise AssertionError("export of an unreachable database reported success")
+    finally:
+        sys.argv = argv
+    assert not os.path.exists(output), "a partial export file was left behind"
+    with unreachable_database():
+        response = app.app.test_client().get('/api/results/export')
+    assert response.status_code == 500, response.status_code
+
+    # Stream broken off after a chunk: the error propagates (the server aborts the response) and
+    # no Parquet footer is written. An Arrow IPC stream has no footer; the abort is the signal
+    row = {'id': 1, 'user_id': 1, 'test_type': 'handwriting', 'score': 0.5, 'prediction': 'normal',
+           'confidence': 0.9, 'created_at': None, 'name': 'a', 'age': 9, 'grade': '3', 'details': {}}
+
+    def broken_results(chunk_size):
+        yield [row]
+        raise Error(msg="Lost connection to MySQL server during query")
+
+    original = export_results.iter_results
+    export_results.iter_results = broken_results
+    received = {}
+    try:
+        for fmt in export_results.EXPORT_FORMATS:
+            response = app.app.test_client().get(f'/api/results/export?format={fmt}', buffered=False)
+            assert response.status_code == 200, response.status_code
+            data = b''
+            try:
+                for chunk in response.response:
+                    data += chunk
+            except Error:
+                pass
+            else:
+                raise AssertionError(f"the {fmt} response ended normally")
+            finally:
+                response.close()
+            received[fmt] = data
+        try:
+            pa.parquet.read_table(pa.BufferReader(received['parquet']))
+        except (pa.ArrowInvalid, OSError):
+            pass
+        else:
+            raise AssertionError("the cut-short Parquet stream reads as a complete file")
+        try:
+            export_results.export_results(output)
+        except Error:
+            pass
+        else:
+            raise AssertionError("a cut-short export reported success")
+        assert not os.path.exists(output), "a partial export file was left behind"
+    finally:
+        export_results.iter_results = original
+
+    # A file that cannot be created: open()'s own error, not one from removing the file it never made
+    try:
+        export_results.export_results(os.path.join(os.path.dirname(output), 'missing', 'results.parquet'))
+    except FileNotFoundError as e:
+        assert e.__context__ is None, f"the cleanup raised {e!r} over {e.__context__!r}"
+    else:
+        raise AssertionError("export to a missing directory reported success")
+
+
+@check
+def hedge_delay_excludes_pool_wait():
+    """With the OCR hedge pool busy, a fast read neither queues behind it nor gets hedged"""
+    import ocr_client
+
+    server = use_mock_services(ocr_processing=0.2)
+    saved = dict(ocr_client.OCR_CONFIG)
+    ocr_client.OCR_CONFIG.update({'hedge': True, 'hedge_delay': 0.5, 'hedge_min_samples': 10 ** 6})
+    busy = threading.Event()
+    for _ in range(ocr_client.hedge_executor._max_workers):
+        ocr_client.hedge_executor.submit(busy.wait, 2)
+    try:
+        outcomes = dict(ocr_client.ocr_hedges.values)
+        start = time.monotonic()
+        text = ocr_client.read_text(sample_image())
+        elapsed = time.monotonic() - start
+        assert text, "no text read"
+        assert elapsed < 1.0, f"the read took {elapsed:.2f} s behind a busy pool"
+        assert ocr_client.ocr_hedges.values == outcomes, f"hedged a fast read: {ocr_client.ocr_hedges.values}"
+    finally:
+        busy.set()
+        ocr_client.OCR_CONFIG.update(saved)
+        server.shutdown()
+
+
+class FakeUsersTable:
+    """Just enough of a mysql.connector connection to the users table: INT age, VARCHAR grade and
+    the case-insensitive, trailing-space-insensitive name comparison of the default collation"""
+
+    def __init__(self):
+        self.rows = []
+        self.result = None
+
+    def __call__(self, read_only=False):
+        return self
+
+    def cursor(self, *args, **kwargs):
+        return self
+
+    def execute(self, query, params=()):
+        if query.startswith('INSERT'):
+            name, age, grade = params
+            self.lastrowid = len(self.rows) + 1
+            self.rows.append({'id': self.lastrowid, 'name': name, 'age': int(age), 'grade': str(grade)})
+        else:
+            matches = [row for row in self.rows
+                       if row['name'].rstrip(' ').lower() == params[0].rstrip(' ').lower()]
+            self.result = dict(matches[-1]) if matches else None
+
+    def fetchone(self):
+        return self.result
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+    def is_connected(self):
+        return True
+
+
+@check
+def login_cache_matches_database():
+    """Logins see a new signup whatever the name's case/trailing spaces, with the row as stored, and
+    replica rows are cached no longer than the replica may lag"""
+    import database
+
+    table = FakeUsersTable()
+    original = database.get_connection, database.REPLICA_CONFIG
+    database.get_connection = table
+    database.user_cache.clear()
+    try:
+        database.create_user('alice', 8, 2)
+        assert database.get_user_by_name('alice')['id'] == 1
+
+        user_id = database.create_user('ALICE ', '9', 3)
+        user = database.get_user_by_name('alice')
+        assert user['id'] == user_id, f"login found {user}"
+        assert (user['age'], user['grade']) == (9, '3'), f"cached {user}"
+
+        database.REPLICA_CONFIG = {'host': 'replica'}
+        database.user_cache.clear()
+        database.get_user_by_name('alice')
+        expires_at, _ = database.user_cache._data[database.user_cache_key('alice')]
+        max_lag = database.READ_ROUTING_CONFIG['max_lag_seconds']
+        assert expires_at - time.monotonic() <= max_lag, "replica row cached beyond the lag tolerance"
+    finally:
+        database.get_connection, database.REPLICA_CONFIG = original
+        database.user_cache.clear()
+
+
+@check
+def roster_ages_are_whole_numbers():
+    """Roster ages are not rounded (9.7), taken from booleans (true), or reported missing when 0"""
+    from api_routes import validate_roster
+
+    rows = [{'name': 'a', 'age': 9}, {'name': 'b', 'age': '10'}, {'name': 'c', 'age': 9.7},
+            {'name': 'd', 'age': True}, {'name': 'e', 'age': '9.5'}, {'name': 'f', 'age': 0}, {'name': 'g'}]
+    users, errors = validate_roster(rows)
+    assert [user['age'] for user in users] == [9, 10], users
+    assert [(error['row'], error['error']) for error in errors] == [
+        (2, 'Age must be a whole number'), (3, 'Age must be a whole number'), (4, 'Age must be a whole number'),
+        (5, 'Age must be a positive number'), (6, 'Name and age are required')], errors
+
+
+@check
+def asgi_upload_limit_covers_chunked_bodies():
+    """The ASGI upload cap applies to chunked bodies (no Content-Length), and a bad Content-Length is a 400"""
+    import asyncio
+
+    from starlette.requests import Request
+    from starlette.testclient import TestClient
+
+    import asgi
+
+    boundary = 'regression'
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="a.jpg"\r\n'
+            f'Content-Type: image/jpeg\r\n\r\n').encode() + sample_image() + f'\r\n--{boundary}--\r\n'.encode()
+
+    def chunked():
+        for start in range(0, len(body), 4096):
+            yield body[start:start + 4096]
+
+    max_bytes = asgi.UPLOAD_CONFIG['max_bytes']
+    asgi.UPLOAD_CONFIG['max_bytes'] = len(body) // 2
+    try:
+        response = TestClient(asgi.app).post('/api/analyze-image', content=chunked(),
+                                              headers={'content-type': f'multipart/form-data; boundary={boundary}'})
+    finally:
+        asgi.UPLOAD_CONFIG['max_bytes'] = max_bytes
+    assert response.status_code == 413, (response.status_code, response.text[:200])
+
+    async def bad_content_length():
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        scope = {'type': 'http', 'method': 'POST', 'path': '/api/analyze-image', 'query_string': b'',
+                 'headers': [(b'content-length', b'ten')]}
+        return await asgi.read_document(Request(scope, receive))
+
+    response = asyncio.run(bad_content_length())
+    assert response.status_code == 400, response.status_code
+
+
+@check
+def empty_document_is_a_bad_request():
+    """A document with no pages is a 400 on the Flask, ASGI and job routes, not an IndexError"""
+    import io
+    import tempfile
+
+    from starlette.testclient import TestClient
+
+    import app
+    import asgi
+    import documents
+    import jobs
+
+    def no_pages(data):
+        # The PDFium build used here refuses 0-page PDFs itself; other builds and engines load them
+        yield 0
+
+    original_pdf_pages, original_config = documents.pdf_pages, dict(jobs.JOB_CONFIG)
+    documents.pdf_pages = no_pages
+    jobs.JOB_CONFIG['db_path'] = os.path.join(tempfile.mkdtemp(), 'jobs.sqlite3')
+    data = b'%PDF-1.4\n'
+    try:
+        client = app.app.test_client()
+        for path in ('/api/analyze-image', '/api/analyze-document', '/api/jobs'):
+            response = client.post(path, data={'file': (io.BytesIO(data), 'empty.pdf')})
+            assert response.status_code == 400, (path, response.status_code, response.get_json())
+        with TestClient(asgi.app) as asgi_client:
+            for path in ('/api/analyze-image', '/api/analyze-document'):
+                response = asgi_client.post(path, files={'file': ('empty.pdf', data, 'application/pdf')})
+                assert response.status_code == 400, (path, response.status_code, response.text[:200])
+    finally:
+        documents.pdf_pages = original_pdf_pages
+        jobs.JOB_CONFIG.update(original_config)
+
+
+@check
+def job_submit_releases_the_document():
+    """Validating an upload for the job queue closes the opened document instead of leaving it to the collector"""
+    import io
+    import tempfile
+
+    import app
+    import documents
+    import jobs
+
+    opened = []
+
+    def one_page(data):
+        yield 1
+        yield b'page'
+
+    def tracked_pdf_pages(data):
+        pages = one_page(data)
+        opened.append(pages)  # a live reference, so only an explicit close() finishes the generator
+        return pages
+
+    original_pdf_pages, original_config, original_queue = documents.pdf_pages, dict(jobs.JOB_CONFIG), jobs._queue
+    documents.pdf_pages = tracked_pdf_pages
+    jobs.JOB_CONFIG['db_path'] = os.path.join(tempfile.mkdtemp(), 'jobs.sqlite3')
+    jobs._queue = None
+    try:
+        response = app.app.test_client().post('/api/jobs', data={'file': (io.BytesIO(b'%PDF-1.4\n'), 'doc.pdf')})
+        assert response.status_code == 202, (response.status_code, response.get_json())
+        assert len(opened) == 1, opened
+        assert opened[0].gi_frame is None, "the validated document was left open"
+    finally:
+        documents.pdf_pages = original_pdf_pages
+        jobs.JOB_CONFIG.update(original_config)
+        jobs._queue = original_queue
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('checks', nargs='*', help=f"checks to run (default: all): {', '.join(CHECKS)}")
+    args = parser.parse_args()
+    unknown = set(args.checks) - set(CHECKS)
+    if unknown:
+        parser.error(f"unknown checks: {', '.join(sorted(unknown))}")
+
+    failed = 0
+    for name in args.checks or CHECKS:
+        start = time.perf_counter()
+        try:
+            CHECKS[name]()
+        except Exception:
+            failed += 1
+            print(f"FAIL {name}")
+            traceback.print_exc()
+        else:
+            print(f"ok   {name} ({time.perf_counter() - start:.2f} s)")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()